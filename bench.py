@@ -0,0 +1,468 @@
+#!/usr/bin/env python3
+"""
+Handler benchmarks for the Pokemon Battle Bot.
+
+Drives the real slash command and view handlers through fake Discord
+interactions against the SQLite backend (in a temporary file unless
+--database is given), so no gateway connection or database server is needed. For every handler
+it reports p50/p99 latency, queries per interaction (on the response path
+and in background jobs) and the peak memory allocated per call.
+
+Usage:
+    python bench.py                      # default run
+    python bench.py --iterations 500 --cold
+    python bench.py --db-latency 0.5 --http-latency 40
+
+Run it before and after a performance change and compare the tables.
+"""
+
+import argparse
+import asyncio
+import atexit
+import contextlib
+import io
+import os
+import shutil
+import tempfile
+import time
+import tracemalloc
+from types import SimpleNamespace
+
+import discord
+
+import pokemon_bot as pb
+
+
+class BenchBackend(pb.SQLiteBackend):
+    """The SQLite backend with a simulated per-statement round trip and busy-time accounting"""
+
+    def __init__(self, path: str, latency: float = 0.0):
+        super().__init__(path)
+        self.latency = latency
+        self.busy = 0.0  # seconds spent executing statements
+
+    def _run(self, connection, statement, params, fetch):
+        started = time.perf_counter()
+        try:
+            if self.latency:
+                time.sleep(self.latency)  # a networked database blocks the loop the same way
+            return super()._run(connection, statement, params, fetch)
+        finally:
+            self.busy += time.perf_counter() - started
+
+
+# =====================================================
+# FAKE DISCORD OBJECTS
+# =====================================================
+
+class FakeMessage:
+    def __init__(self, message_id: int, channel: 'FakeChannel', **kwargs):
+        self.id = message_id
+        self.channel = channel
+        self.kwargs = kwargs
+
+
+class FakeChannel:
+    """Text channel that records what is sent and answers fetch_message after a simulated round trip"""
+
+    def __init__(self, channel_id: int, gateway: 'FakeGateway'):
+        self.id = channel_id
+        self.gateway = gateway
+        self.sent = 0
+
+    async def send(self, **kwargs):
+        await self.gateway.round_trip()
+        self.sent += 1
+        return FakeMessage(self.gateway.next_id(), self, **kwargs)
+
+    async def fetch_message(self, message_id: int):
+        await self.gateway.round_trip()
+        return FakeMessage(message_id, self)
+
+
+class FakeGuild:
+    def __init__(self, guild_id: int, name: str, channels: list):
+        self.id = guild_id
+        self.name = name
+        self.channels = {channel.id: channel for channel in channels}
+
+    def get_channel(self, channel_id: int):
+        return self.channels.get(channel_id)
+
+
+class FakeUser:
+    def __init__(self, user_id: int, admin: bool = False):
+        self.id = user_id
+        self.name = f"trainer{user_id}"
+        self.discriminator = '0001'
+        self.display_name = self.name
+        self.mention = f"<@{user_id}>"
+        self.bot = False
+        self.display_avatar = SimpleNamespace(url=f"https://cdn.example/avatars/{user_id}.png")
+        self.guild_permissions = discord.Permissions(administrator=admin)
+
+
+class FakeResponse:
+    """InteractionResponse that records replies instead of calling the API"""
+
+    def __init__(self, interaction: 'FakeInteraction'):
+        self.interaction = interaction
+        self.done = False
+
+    def is_done(self) -> bool:
+        return self.done
+
+    async def _respond(self, kind: str, **kwargs):
+        if self.done:
+            raise discord.InteractionResponded(self.interaction)
+        await self.interaction.gateway.round_trip()
+        self.done = True
+        self.interaction.replies.append((kind, kwargs))
+
+    async def send_message(self, content=None, **kwargs):
+        await self._respond('send_message', content=content, **kwargs)
+
+    async def defer(self, **kwargs):
+        await self._respond('defer', **kwargs)
+
+    async def edit_message(self, **kwargs):
+        await self._respond('edit_message', **kwargs)
+
+    async def send_modal(self, modal):
+        await self._respond('send_modal', modal=modal)
+
+
+class FakeFollowup:
+    def __init__(self, interaction: 'FakeInteraction'):
+        self.interaction = interaction
+
+    async def send(self, content=None, **kwargs):
+        await self.interaction.gateway.round_trip()
+        self.interaction.replies.append(('followup', dict(kwargs, content=content)))
+
+
+class FakeInteraction(discord.Interaction):
+    """discord.Interaction as the handlers see it, without a gateway or HTTP session"""
+
+    def __init__(self, gateway: 'FakeGateway', user: FakeUser, guild: FakeGuild, channel: FakeChannel,
+                 type: discord.InteractionType = discord.InteractionType.application_command):
+        self.id = gateway.next_id()
+        self.type = type
+        self.user = user
+        self.channel = channel
+        self.guild_id = guild.id
+        self.message = None
+        self.data = {}
+        self.gateway = gateway
+        self.fake_guild = guild
+        self.replies = []
+        self.fake_response = FakeResponse(self)
+        self.fake_followup = FakeFollowup(self)
+
+    @property
+    def client(self):
+        return self.gateway.bot
+
+    @property
+    def guild(self):
+        return self.fake_guild
+
+    @property
+    def channel_id(self):
+        return self.channel.id
+
+    @property
+    def response(self):
+        return self.fake_response
+
+    @property
+    def followup(self):
+        return self.fake_followup
+
+    async def edit_original_response(self, **kwargs):
+        await self.gateway.round_trip()
+        self.replies.append(('edit_original_response', kwargs))
+
+    def sent(self, key: str):
+        """The most recent reply argument with this name (e.g. the view or modal sent)"""
+        for _, kwargs in reversed(self.replies):
+            if kwargs.get(key) is not None:
+                return kwargs[key]
+        return None
+
+
+class FakeGateway:
+    """Guilds, channels and users standing in for Discord's side of the connection"""
+
+    def __init__(self, bot: pb.PokemonBot, guild_count: int, http_latency: float = 0.0):
+        self.bot = bot
+        self.http_latency = http_latency
+        self.ids = 10 ** 17
+        self.channels = {}
+        self.guilds = []
+        for _ in range(guild_count):
+            channels = [FakeChannel(self.next_id(), self), FakeChannel(self.next_id(), self)]
+            self.channels.update((channel.id, channel) for channel in channels)
+            self.guilds.append(FakeGuild(self.next_id(), f"Guild {len(self.guilds) + 1}", channels))
+
+    def next_id(self) -> int:
+        self.ids += 1
+        return self.ids
+
+    def get_channel(self, channel_id: int):
+        return self.channels.get(channel_id)
+
+    async def round_trip(self):
+        if self.http_latency:
+            await asyncio.sleep(self.http_latency)
+
+    def interaction(self, user: FakeUser, guild: FakeGuild, component: bool = False) -> FakeInteraction:
+        kind = discord.InteractionType.component if component else discord.InteractionType.application_command
+        return FakeInteraction(self, user, guild, list(guild.channels.values())[0], kind)
+
+    def seed(self, db: pb.DatabaseManager):
+        """One configured server row and starter button per guild"""
+        for guild in self.guilds:
+            starter, updates = guild.channels
+            db.execute_query("""
+            INSERT INTO servers (id, name, language, starter_channel_id, updates_channel_id)
+            VALUES (%s, %s, 'en', %s, %s)
+            """, (str(guild.id), guild.name, str(starter), str(updates)))
+            db.execute_query("""
+            INSERT INTO persistent_buttons (server_id, channel_id, message_id, button_type)
+            VALUES (%s, %s, %s, 'STARTER_SELECTION')
+            """, (str(guild.id), str(starter), str(self.next_id())))
+
+
+# =====================================================
+# MEASUREMENT
+# =====================================================
+
+def percentile(values: list, fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class HandlerStats:
+    def __init__(self):
+        self.latencies = []
+        self.queries = []
+        self.background_queries = []
+        self.allocations = []
+
+
+class Bench:
+    """Runs each scenario through the bot's handlers and collects per-call numbers"""
+
+    def __init__(self, bot: pb.PokemonBot, gateway: FakeGateway, cold: bool = False):
+        self.bot = bot
+        self.gateway = gateway
+        self.cold = cold
+        self.tracing = False
+        self.stats = {}
+        self.starter_view = pb.PersistentStarterView(bot.db, bot.translations)
+        self.trainers = []  # (user, guild) with a complete team
+
+    async def measure(self, name: str, call) -> tuple:
+        """Time one handler call; returns (seconds, queries on the response path)"""
+        bot = self.bot
+        await bot.work_queue.queue.join()
+        if self.cold:
+            bot.context_loader.server_cache.clear()
+            bot.context_loader.user_cache.clear()
+            bot.inventory.cache.clear()
+
+        queries = bot.db.query_count
+        if self.tracing:
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+        started = time.perf_counter()
+        await call()
+        elapsed = time.perf_counter() - started
+        handler_queries = bot.db.query_count - queries
+        if self.tracing:
+            allocated = tracemalloc.get_traced_memory()[1] - baseline
+
+        await bot.work_queue.queue.join()
+        stats = self.stats.setdefault(name, HandlerStats())
+        if self.tracing:
+            stats.allocations.append(allocated)
+        else:
+            stats.latencies.append(elapsed)
+            stats.queries.append(handler_queries)
+            stats.background_queries.append(bot.db.query_count - queries - handler_queries)
+        return elapsed, handler_queries
+
+    async def starter_chain(self, user: FakeUser, guild: FakeGuild):
+        """Button -> species -> name button -> modal -> confirm, as one trainer clicks through"""
+        gateway = self.gateway
+        steps = []
+
+        interaction = gateway.interaction(user, guild, component=True)
+        steps.append(await self.measure('start_journey',
+                                        lambda: self.starter_view.start_journey.callback(interaction)))
+        selection = interaction.sent('view')
+
+        interaction = gateway.interaction(user, guild, component=True)
+        steps.append(await self.measure('starter_selection',
+                                        lambda: selection.charmander_button.callback(interaction)))
+        naming = interaction.sent('view')
+
+        interaction = gateway.interaction(user, guild, component=True)
+        steps.append(await self.measure('name_button', lambda: naming.name_pokemon.callback(interaction)))
+        modal = interaction.sent('modal')
+
+        interaction = gateway.interaction(user, guild)
+        interaction.type = discord.InteractionType.modal_submit
+        steps.append(await self.measure('name_modal_submit', lambda: modal.on_submit(interaction)))
+        confirmation = interaction.sent('view')
+
+        interaction = gateway.interaction(user, guild, component=True)
+        steps.append(await self.measure('confirm_choice',
+                                        lambda: confirmation.confirm_choice.callback(interaction)))
+
+        if not self.tracing:
+            chain = self.stats.setdefault('starter chain (total)', HandlerStats())
+            chain.latencies.append(sum(seconds for seconds, _ in steps))
+            chain.queries.append(sum(queries for _, queries in steps))
+        self.trainers.append((user, guild))
+
+    async def click(self, view: discord.ui.View, action: str, interaction: FakeInteraction):
+        """Route a dynamic button click by its custom_id alone, as discord.py's view store does"""
+        custom_id = next(item.custom_id for item in view.children if item.custom_id.startswith(f'challenge:{action}:'))
+        match = pb.ChallengeButton.__discord_ui_compiled_template__.fullmatch(custom_id)
+        item = await pb.ChallengeButton.from_custom_id(interaction, None, match)
+        await item.callback(interaction)
+
+    def damage_team(self, user: FakeUser):
+        """Knock the lead Pokemon down and restock Potions, outside the measured call"""
+        user_id = str(user.id)
+        db = self.bot.db
+        db.execute_query("UPDATE pokemon SET current_hp = 1 WHERE user_id = %s AND team_slot = 1", (user_id,))
+        db.execute_query("UPDATE user_items SET quantity = 10 WHERE user_id = %s AND item_id = 'POTION'", (user_id,))
+        self.bot.context_loader.invalidate_user(user_id)
+        self.bot.inventory.invalidate(user_id)
+
+    async def run(self, iterations: int):
+        gateway = self.gateway
+        guilds = gateway.guilds
+        first = len(self.trainers)
+
+        for n in range(iterations):
+            await self.starter_chain(FakeUser(gateway.next_id()), guilds[n % len(guilds)])
+
+        trainers = self.trainers[first:]
+        for n in range(iterations):
+            user, guild = trainers[n]
+            opponent = trainers[(n + 1) % len(trainers)][0]
+
+            interaction = gateway.interaction(user, guild)
+            await self.measure('mkp-battle (practice)', lambda: pb.battle_command.callback(interaction))
+
+            interaction = gateway.interaction(user, guild)
+            await self.measure('mkp-battle (challenge)',
+                               lambda: pb.battle_command.callback(interaction, opponent))
+
+            challenge = interaction.sent('view')
+            interaction = gateway.interaction(opponent, guild, component=True)
+            await self.measure('challenge_button', lambda: self.click(challenge, 'accept', interaction))
+            battle_id = self.bot.battle_manager.battle_for(str(user.id))
+            if battle_id:
+                await self.bot.battle_manager.finish_battle(battle_id, status='ABANDONED')
+
+            interaction = gateway.interaction(user, guild)
+            await self.measure('monkepo list', lambda: pb.pokemon_command.callback(interaction, 'list'))
+
+            self.damage_team(user)
+            interaction = gateway.interaction(user, guild)
+            await self.measure('monkepo heal', lambda: pb.pokemon_command.callback(interaction, 'heal'))
+
+        for _ in range(max(1, iterations // 10)):
+            await self.measure('restore_buttons_on_startup', self.bot.button_manager.restore_buttons_on_startup)
+
+    def report(self) -> str:
+        lines = [
+            f"{'handler':<28}{'calls':>7}{'p50 ms':>10}{'p99 ms':>10}{'queries':>9}{'bg q':>7}{'peak KiB':>10}",
+            "-" * 81
+        ]
+        for name, stats in self.stats.items():
+            if not stats.latencies:
+                continue
+            queries = sum(stats.queries) / len(stats.queries)
+            background = sum(stats.background_queries) / len(stats.background_queries) if stats.background_queries else 0
+            peak = f"{percentile(stats.allocations, 0.5) / 1024:.1f}" if stats.allocations else "-"
+            lines.append(
+                f"{name:<28}{len(stats.latencies):>7}"
+                f"{percentile(stats.latencies, 0.5) * 1000:>10.2f}{percentile(stats.latencies, 0.99) * 1000:>10.2f}"
+                f"{queries:>9.1f}{background:>7.1f}{peak:>10}"
+            )
+        return "\n".join(lines)
+
+
+async def start_bot(database: str, guilds: int, db_latency: float, http_latency: float) -> tuple:
+    """Point the bot at a fresh SQLite database and a fake gateway (latencies in ms)"""
+    if not database:
+        workdir = tempfile.mkdtemp(prefix='monkepo-bench-')
+        atexit.register(shutil.rmtree, workdir, ignore_errors=True)
+        database = os.path.join(workdir, 'bench.db')
+
+    bot = pb.bot
+    bot.db.backend = BenchBackend(database, db_latency / 1000)
+    await bot.db.connect()
+
+    gateway = FakeGateway(bot, guilds, http_latency / 1000)
+    gateway.seed(bot.db)
+    bot.get_channel = gateway.get_channel
+
+    bot.translations.load_translations()
+    await bot._warm_catalogs()
+    bot.work_queue.start()
+    return bot, gateway
+
+
+async def main(args):
+    bot, gateway = await start_bot(args.database, args.guilds, args.db_latency, args.http_latency)
+    bench = Bench(bot, gateway, cold=args.cold)
+    output = io.StringIO()
+    started = time.perf_counter()
+    quiet = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(output)
+    with quiet:
+        await bench.run(args.iterations)
+
+        # Allocations are measured in a separate pass so tracing doesn't skew the latencies
+        tracemalloc.start()
+        bench.tracing = True
+        await bench.run(args.alloc_iterations)
+        tracemalloc.stop()
+
+        bot.achievements.flush()
+        bot.counters.flush()
+        await bot.outbound.flush()
+        await bot.work_queue.stop()
+
+    print(f"Benchmark: {args.iterations} iteration(s), {args.guilds} guild(s), "
+          f"{'cold' if args.cold else 'warm'} caches, db latency {args.db_latency} ms, "
+          f"http latency {args.http_latency} ms")
+    print(bench.report())
+    print(f"\nTotal queries: {bot.db.query_count} • wall time {time.perf_counter() - started:.1f} s")
+
+    errors = [line for line in output.getvalue().splitlines() if '❌' in line or 'error' in line.lower()]
+    if errors:
+        print(f"\n⚠️ {len(errors)} error line(s) logged by handlers, first: {errors[0]}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the bot's interaction handlers")
+    parser.add_argument('--iterations', type=int, default=200, help='trainers onboarded and commands run per handler')
+    parser.add_argument('--alloc-iterations', type=int, default=20, help='calls per handler in the tracemalloc pass')
+    parser.add_argument('--guilds', type=int, default=10, help='guilds (and starter buttons) to spread trainers over')
+    parser.add_argument('--cold', action='store_true', help='clear context/inventory caches before every call')
+    parser.add_argument('--db-latency', type=float, default=0.0, help='simulated round trip per query, in ms')
+    parser.add_argument('--http-latency', type=float, default=0.0, help='simulated Discord API round trip, in ms')
+    parser.add_argument('--database', default=None, help='SQLite file to use (default: a fresh temporary one)')
+    parser.add_argument('--verbose', action='store_true', help="show the bot's own log output")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
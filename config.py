@@ -14,6 +14,11 @@ DB_CONFIG = {
     'autocommit': True
 }
 
+# Storage backend: 'mysql' (DB_CONFIG above) or 'sqlite' (one file, for single-box deployments)
+DB_BACKEND = os.getenv('DB_BACKEND', 'mysql')
+SQLITE_PATH = os.getenv('SQLITE_PATH', 'monkepo.db')
+SQLITE_READERS = int(os.getenv('SQLITE_READERS', '4'))  # Pooled read connections
+
 
 # Discord Bot Token
 DISCORD_BOT_TOKEN = os.getenv('DISCORD_BOT_TOKEN')
@@ -22,13 +27,63 @@ ACTIVITY_URL = os.getenv('ACTIVITY_URL')
 # Bot Settings
 BOT_PREFIX = '!'
 MAX_TEAM_SIZE = 3  # MVP: 3v3 battles
+PC_PAGE_SIZE = 10  # Stored Pokemon per /mkp-pc page
 STARTER_IV_RANGE = (20, 31)  # High quality IVs for starters
 COMMON_IV_RANGE = (10, 25)   # Standard IVs for common Pokemon
 
 # Session Timeouts (in minutes)
 STARTER_SELECTION_TIMEOUT = 10
 BATTLE_TIMEOUT = 30
+TURN_TIMEOUT = 60            # Seconds a trainer has to act before a move is made for them
+TURN_MISS_LIMIT = 3          # Automatic moves in a row before the trainer forfeits
+TIMER_TICK = 1.0             # Seconds per slot of the battle timer wheel
 MODAL_TIMEOUT = 5
+PENDING_SWEEP_INTERVAL = 60  # Seconds between expired onboarding session sweeps
+TRADE_OFFER_TIMEOUT = 300    # Seconds before an unanswered trade offer lapses
+CHALLENGE_TIMEOUT = 600      # Seconds a /mkp-battle challenge can still be accepted
+
+# Cache lifetimes (in seconds)
+SERVER_CACHE_TTL = 300  # Server language/channel config
+TEAM_CACHE_TTL = 60     # Active team per trainer
+
+# Interaction pipeline
+INTERACTION_DEFER_BUDGET = 1.5  # Seconds of expected work before we defer (Discord allows 3)
+WORK_QUEUE_SIZE = 1000          # Max pending background jobs
+WORK_QUEUE_WORKERS = 4
+WORK_QUEUE_MAX_ATTEMPTS = 3
+WORK_QUEUE_RETRY_DELAY = 2      # Seconds, doubled on every retry
+OUTBOUND_COALESCE_WINDOW = 2.0  # Seconds to gather channel updates into one message
+BUTTON_RESTORE_CONCURRENCY = 10  # Persistent button messages checked at once on startup
+
+# Event-loop health monitor (can be switched on and off at runtime with /mkp-loop)
+LOOP_MONITOR_ENABLED = os.getenv('LOOP_MONITOR', 'on') == 'on'
+LOOP_LAG_INTERVAL = 0.1         # Seconds between loop lag samples
+SLOW_CALLBACK_THRESHOLD = 0.25  # Seconds the loop may be blocked before the stall is logged with a stack
+SLOW_CALLBACK_KEEP = 10         # Slowest stalls kept for /mkp-loop
+
+# Write-behind flush intervals (in seconds)
+ACHIEVEMENT_FLUSH_INTERVAL = 10
+ACHIEVEMENT_IDLE_TTL = 1800  # Trainers idle this long are dropped from memory once flushed
+COUNTER_FLUSH_INTERVAL = 5  # Trainer counters on users (wins, streaks, XP, coins...)
+
+# What a crash can cost the trainer counters:
+# 'buffered'  = up to COUNTER_FLUSH_INTERVAL seconds of changes (a clean shutdown flushes them)
+# 'immediate' = nothing; every change is its own UPDATE
+COUNTER_DURABILITY = os.getenv('COUNTER_DURABILITY', 'buffered')
+
+# Battle history archive
+ARCHIVE_AFTER_DAYS = 30    # Finished battles older than this move to battle_archive
+ARCHIVE_INTERVAL = 3600    # Seconds between archive runs
+ARCHIVE_CHUNK_SIZE = 200   # Battles moved per transaction
+ARCHIVE_CHUNK_PAUSE = 0.5  # Seconds between chunks, so gameplay writes get the locks
+
+# Sharding
+# 'single' = one gateway connection, 'auto' = AutoShardedBot in one process,
+# 'process' = one shard per process (started with `python pokemon_bot.py --shards N`)
+SHARD_MODE = os.getenv('SHARD_MODE', 'single')
+SHARD_COUNT = int(os.getenv('SHARD_COUNT', '1'))
+SHARD_ID = int(os.getenv('SHARD_ID', '0'))
+BROKER_SOCKET = os.getenv('BROKER_SOCKET', '/tmp/monkepo-broker.sock')
 
 # Supported Languages
 SUPPORTED_LANGUAGES = ['en', 'es']
@@ -51,6 +106,20 @@ TYPE_EFFECTIVENESS_MULTIPLIERS = {
     'NORMAL': 1.0
 }
 
+HP_REGEN_PER_HOUR = 1  # Passive healing outside battle
+
+# Trainer rewards per battle between two trainers
+BATTLE_REWARDS = {
+    'win': {'trainer_xp': 50, 'coins': 100, 'battle_points': 10},
+    'loss': {'trainer_xp': 20, 'coins': 25, 'battle_points': 0},
+}
+
+# Wild encounters
+WILD_SPAWN_INTERVAL = 300     # Seconds between spawn ticks
+WILD_ENCOUNTER_TIMEOUT = 120  # Seconds a wild Pokemon stays catchable
+WILD_LEVEL_RANGE = (2, 8)
+WILD_RARITY_WEIGHTS = {'COMMON': 80, 'UNCOMMON': 18, 'RARE': 2}  # Default per-guild weights
+
 CRITICAL_HIT_CHANCE = 0.0625  # 6.25% chance
 CRITICAL_HIT_MULTIPLIER = 2.0
 
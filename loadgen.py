@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+Load generator for the Pokemon Battle Bot.
+
+Simulates launch-day traffic on one machine with no network: N guilds and
+M trainers who click the persistent "Start Your Pokemon Journey" button,
+click through the starter chain, then keep issuing commands from a
+configurable mix. Every trainer is its own task, so interactions overlap
+the way they do behind a real gateway. Uses bench.py's fake gateway and
+the SQLite backend.
+
+Prints one line per reporting interval (throughput, latency percentiles,
+event-loop lag, DB saturation, interactions in flight) and a per-command
+summary at the end, with whatever blocked the loop (from the bot's LoopMonitor):
+
+    python loadgen.py --guilds 300 --users 3000 --burst 1000 --arrival-rate 100
+    python loadgen.py --mix arena=6,list=3,heal=1 --duration 60 --db-latency 0.5
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import random
+import sys
+import time
+
+import discord
+
+import pokemon_bot as pb
+from bench import FakeUser, percentile, start_bot
+
+COMMANDS = {
+    'arena': lambda interaction, opponent: pb.arena_command.callback(interaction),
+    'challenge': lambda interaction, opponent: pb.battle_command.callback(interaction, opponent),
+    'list': lambda interaction, opponent: pb.pokemon_command.callback(interaction, 'list'),
+    'heal': lambda interaction, opponent: pb.pokemon_command.callback(interaction, 'heal'),
+    'pc': lambda interaction, opponent: pb.pc_command.callback(interaction),
+}
+
+
+class RunOver(Exception):
+    """Raised in a trainer task once the run's duration has passed"""
+
+
+class Window:
+    """Everything observed during one reporting interval"""
+
+    def __init__(self):
+        self.latencies = []
+        self.errors = 0
+        self.lag = []
+        self.peak_in_flight = 0
+
+
+class LoadGenerator:
+    def __init__(self, bot: pb.PokemonBot, gateway, args):
+        self.bot = bot
+        self.gateway = gateway
+        self.args = args
+        self.mix = parse_mix(args.mix)
+        self.window = Window()
+        self.by_command = {}  # name -> ([latencies], errors)
+        self.in_flight = 0
+        self.arrived = 0
+        self.onboarded = []  # trainers who can be challenged
+        self.deadline = 0.0
+        self.out = sys.stdout  # reports bypass the redirect that silences the bot
+
+    async def interact(self, name: str, call):
+        """Run one handler call, recording its latency and any exception"""
+        self.in_flight += 1
+        self.window.peak_in_flight = max(self.window.peak_in_flight, self.in_flight)
+        latencies, errors = self.by_command.setdefault(name, ([], [0]))
+        started = time.perf_counter()
+        try:
+            await call()
+        except Exception:
+            self.window.errors += 1
+            errors[0] += 1
+        finally:
+            elapsed = time.perf_counter() - started
+            self.in_flight -= 1
+            self.window.latencies.append(elapsed)
+            latencies.append(elapsed)
+
+    async def pause(self, seconds: float):
+        """Idle between interactions; nothing new starts after the deadline"""
+        await asyncio.sleep(seconds)
+        if asyncio.get_running_loop().time() >= self.deadline:
+            raise RunOver()
+
+    async def think(self):
+        await self.pause(random.expovariate(1 / self.args.think))
+
+    async def trainer(self, user: FakeUser, guild):
+        """One trainer: onboarding, then commands from the mix until the run ends"""
+        try:
+            await self.onboard(user, guild)
+            await self.play(user, guild)
+        except RunOver:
+            pass
+
+    async def onboard(self, user: FakeUser, guild):
+        gateway = self.gateway
+        view = self.starter_view
+
+        interaction = gateway.interaction(user, guild, component=True)
+        await self.interact('start_journey', lambda: view.start_journey.callback(interaction))
+        selection = interaction.sent('view')
+        if not isinstance(selection, pb.StarterSelectionView):
+            return
+
+        await self.think()
+        interaction = gateway.interaction(user, guild, component=True)
+        button = random.choice([selection.charmander_button, selection.squirtle_button, selection.bulbasaur_button])
+        await self.interact('starter_selection', lambda: button.callback(interaction))
+        naming = interaction.sent('view')
+
+        await self.think()
+        interaction = gateway.interaction(user, guild, component=True)
+        await self.interact('name_button', lambda: naming.name_pokemon.callback(interaction))
+        modal = interaction.sent('modal')
+
+        await self.think()
+        interaction = gateway.interaction(user, guild)
+        interaction.type = discord.InteractionType.modal_submit
+        await self.interact('name_modal_submit', lambda: modal.on_submit(interaction))
+        confirmation = interaction.sent('view')
+
+        await self.think()
+        interaction = gateway.interaction(user, guild, component=True)
+        await self.interact('confirm_choice', lambda: confirmation.confirm_choice.callback(interaction))
+        self.onboarded.append(user)
+
+    async def play(self, user: FakeUser, guild):
+        if user not in self.onboarded:
+            return
+        names, weights = zip(*self.mix.items())
+        while True:
+            await self.pause(random.expovariate(self.args.command_rate))
+            name = random.choices(names, weights)[0]
+            opponent = random.choice(self.onboarded)
+            interaction = self.gateway.interaction(user, guild)
+            await self.interact(name, lambda: COMMANDS[name](interaction, opponent))
+
+    async def arrivals(self, tasks: list):
+        """Start the burst at once, then the rest as a Poisson process"""
+        loop = asyncio.get_running_loop()
+        guilds = self.gateway.guilds
+        for n in range(self.args.users):
+            if n >= self.args.burst:
+                await asyncio.sleep(random.expovariate(self.args.arrival_rate))
+                if loop.time() >= self.deadline:
+                    return
+            self.arrived += 1
+            user = FakeUser(self.gateway.next_id())
+            tasks.append(asyncio.create_task(self.trainer(user, random.choice(guilds))))
+
+    async def sample_lag(self, period: float = 0.05):
+        """How late the loop wakes a sleeping task: time it spent blocked"""
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(period)
+            self.window.lag.append(max(0.0, loop.time() - started - period))
+
+    async def report(self):
+        interval = self.args.interval
+        backend = self.bot.db.backend
+        last_queries = self.bot.db.query_count
+        last_busy = backend.busy
+        started = last = time.perf_counter()
+        print(f"{'t s':>6}{'trainers':>10}{'ok/s':>8}{'err':>6}{'p50 ms':>9}{'p99 ms':>9}"
+              f"{'lag p99':>9}{'lag max':>9}{'db busy':>9}{'q/s':>8}{'in flight':>11}{'queue':>7}", file=self.out)
+        while True:
+            await asyncio.sleep(interval)
+            window, self.window = self.window, Window()
+            # A blocked loop wakes us late, so rates use the real elapsed time
+            now = time.perf_counter()
+            elapsed, last = now - last, now
+            window_queries = self.bot.db.query_count - last_queries
+            busy = (backend.busy - last_busy) / elapsed
+            last_queries, last_busy = self.bot.db.query_count, backend.busy
+
+            latencies = window.latencies or [0.0]
+            lag = window.lag or [0.0]
+            print(f"{now - started:>6.1f}{self.arrived:>10}"
+                  f"{(len(window.latencies) - window.errors) / elapsed:>8.0f}{window.errors:>6}"
+                  f"{percentile(latencies, 0.5) * 1000:>9.1f}{percentile(latencies, 0.99) * 1000:>9.1f}"
+                  f"{percentile(lag, 0.99) * 1000:>9.1f}{max(lag) * 1000:>9.1f}"
+                  f"{busy:>9.0%}{window_queries / elapsed:>8.0f}"
+                  f"{window.peak_in_flight:>11}{self.bot.work_queue.queue.qsize():>7}", file=self.out, flush=True)
+
+    async def run(self):
+        self.starter_view = pb.PersistentStarterView(self.bot.db, self.bot.translations)
+        self.deadline = asyncio.get_running_loop().time() + self.args.duration
+        tasks = []
+        monitors = [asyncio.create_task(self.sample_lag()), asyncio.create_task(self.report())]
+        self.bot.loop_monitor.start()
+
+        await self.arrivals(tasks)
+        await asyncio.sleep(max(0.0, self.deadline - asyncio.get_running_loop().time()))
+        # Let interactions already in flight finish; idle trainers are just cancelled
+        loop = asyncio.get_running_loop()
+        grace = loop.time() + 5.0
+        while self.in_flight and loop.time() < grace:
+            await asyncio.sleep(0.05)
+        for task in tasks + monitors:
+            task.cancel()
+        await asyncio.gather(*tasks, *monitors, return_exceptions=True)
+        await self.bot.loop_monitor.stop()
+
+    def summary(self) -> str:
+        lines = [f"\n{'command':<20}{'calls':>8}{'errors':>8}{'p50 ms':>9}{'p99 ms':>9}{'max ms':>9}", "-" * 63]
+        for name, (latencies, errors) in sorted(self.by_command.items()):
+            lines.append(f"{name:<20}{len(latencies):>8}{errors[0]:>8}"
+                         f"{percentile(latencies, 0.5) * 1000:>9.1f}{percentile(latencies, 0.99) * 1000:>9.1f}"
+                         f"{max(latencies) * 1000:>9.1f}")
+        culprits = self.bot.loop_monitor.stats()['culprits']
+        if culprits:
+            lines += [f"\n{'loop blocked in':<36}{'stalls':>8}{'total ms':>10}", "-" * 54]
+            lines += [f"{name[:35]:<36}{count:>8}{total_ms:>10}" for name, count, total_ms in culprits]
+        return "\n".join(lines)
+
+
+def parse_mix(text: str) -> dict:
+    """'arena=6,list=3' -> {'arena': 6.0, 'list': 3.0}"""
+    mix = {}
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in COMMANDS:
+            raise SystemExit(f"Unknown command '{name}' in --mix (choose from {', '.join(COMMANDS)})")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+async def main(args):
+    random.seed(args.seed)
+    bot, gateway = await start_bot(args.database, args.guilds, args.db_latency, args.http_latency)
+    generator = LoadGenerator(bot, gateway, args)
+
+    print(f"Load: {args.users} trainer(s) over {args.guilds} guild(s), burst {args.burst}, "
+          f"{args.arrival_rate}/s arrivals, {args.command_rate} command(s)/s per trainer, "
+          f"{args.duration:.0f} s, db latency {args.db_latency} ms, http latency {args.http_latency} ms")
+
+    # The bot's own logging goes to a buffer so the report stays readable
+    quiet = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+    with quiet:
+        await generator.run()
+        bot.achievements.flush()
+        bot.counters.flush()
+        await bot.outbound.flush()
+        await bot.work_queue.stop()
+
+    print(generator.summary())
+    print(f"\nTotal queries: {bot.db.query_count} • trainers onboarded: {len(generator.onboarded)}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Replay simulated launch-day load against the bot's handlers")
+    parser.add_argument('--guilds', type=int, default=100, help='simulated guilds')
+    parser.add_argument('--users', type=int, default=1000, help='trainers who will show up')
+    parser.add_argument('--burst', type=int, default=200, help='trainers who click the start button at t=0')
+    parser.add_argument('--arrival-rate', type=float, default=50.0, help='further trainers arriving per second')
+    parser.add_argument('--command-rate', type=float, default=0.5, help='commands per second per onboarded trainer')
+    parser.add_argument('--mix', default='arena=5,list=3,heal=1,challenge=1,pc=1',
+                        help=f"weighted command mix ({', '.join(COMMANDS)})")
+    parser.add_argument('--think', type=float, default=1.0, help='mean seconds between starter chain clicks')
+    parser.add_argument('--duration', type=float, default=30.0, help='seconds to generate load for')
+    parser.add_argument('--interval', type=float, default=1.0, help='seconds per report line')
+    parser.add_argument('--db-latency', type=float, default=0.2, help='simulated round trip per query, in ms')
+    parser.add_argument('--http-latency', type=float, default=30.0, help='simulated Discord API round trip, in ms')
+    parser.add_argument('--database', default=None, help='SQLite file to use (default: a fresh temporary one)')
+    parser.add_argument('--seed', type=int, default=None, help='random seed, for repeatable runs')
+    parser.add_argument('--verbose', action='store_true', help="show the bot's own log output")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Migrate an existing MySQL database to binary UUID keys.
+
+pokemon.id, battles.id, pending_starters.id, pending_choices.id and the
+columns that reference them (pokemon_moves.pokemon_id,
+battle_participants.battle_id, pending_choices.pokemon_id) go from
+CHAR(36) to BINARY(16). Existing IDs keep their value, just packed into
+16 bytes, so the JSON snapshots and logs that mention them still match;
+new rows get time-ordered IDs from the bot and append to the end of each
+index. Prints table and index sizes before and after.
+
+Stop the bot and take a backup first: the ALTERs are not transactional.
+
+    python migrate_uuid_keys.py
+    python migrate_uuid_keys.py --dry-run
+"""
+
+import argparse
+import sys
+
+import mysql.connector
+from mysql.connector import Error
+
+from config import DB_CONFIG
+
+# table -> key columns (all NOT NULL)
+KEY_COLUMNS = {
+    'pokemon': ['id'],
+    'pokemon_moves': ['pokemon_id'],
+    'battles': ['id'],
+    'battle_participants': ['battle_id'],
+    'pending_choices': ['id', 'pokemon_id'],
+    'pending_starters': ['id'],
+}
+
+CHILD_KEYS = [
+    ('pokemon_moves', 'pokemon_id', 'pokemon'),
+    ('battle_participants', 'battle_id', 'battles'),
+    ('pending_choices', 'pokemon_id', 'pokemon'),
+]
+
+CALCULATE_STATS_PROCEDURE = """
+CREATE PROCEDURE CalculatePokemonStats(
+    IN pokemon_uuid CHAR(36)  -- the string form; packed below
+)
+BEGIN
+    DECLARE poke_level INT;
+    DECLARE species_hp, species_att, species_def, species_spa, species_spd, species_spe INT;
+    DECLARE iv_hp, iv_att, iv_def, iv_spa, iv_spd, iv_spe INT;
+    DECLARE calc_hp, calc_att, calc_def, calc_spa, calc_spd, calc_spe INT;
+    
+    SELECT p.level, s.base_hp, s.base_attack, s.base_defense, s.base_sp_attack, s.base_sp_defense, s.base_speed,
+           p.hp_iv, p.attack_iv, p.defense_iv, p.sp_attack_iv, p.sp_defense_iv, p.speed_iv
+    INTO poke_level, species_hp, species_att, species_def, species_spa, species_spd, species_spe,
+         iv_hp, iv_att, iv_def, iv_spa, iv_spd, iv_spe
+    FROM pokemon p
+    JOIN pokemon_species s ON p.species_id = s.id
+    WHERE p.id = UUID_TO_BIN(pokemon_uuid);
+    
+    SET calc_hp = FLOOR(((2 * species_hp + iv_hp) * poke_level / 100) + poke_level + 10);
+    SET calc_att = FLOOR(((2 * species_att + iv_att) * poke_level / 100) + 5);
+    SET calc_def = FLOOR(((2 * species_def + iv_def) * poke_level / 100) + 5);
+    SET calc_spa = FLOOR(((2 * species_spa + iv_spa) * poke_level / 100) + 5);
+    SET calc_spd = FLOOR(((2 * species_spd + iv_spd) * poke_level / 100) + 5);
+    SET calc_spe = FLOOR(((2 * species_spe + iv_spe) * poke_level / 100) + 5);
+    
+    SELECT calc_hp as hp, calc_att as attack, calc_def as defense, 
+           calc_spa as sp_attack, calc_spd as sp_defense, calc_spe as speed;
+END
+"""
+
+
+def column_type(cursor, table: str, column: str) -> str:
+    cursor.execute("""
+    SELECT COLUMN_TYPE FROM information_schema.COLUMNS
+    WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND COLUMN_NAME = %s
+    """, (table, column))
+    row = cursor.fetchone()
+    return row[0].decode() if isinstance(row[0], (bytes, bytearray)) else row[0]
+
+
+def table_sizes(cursor) -> dict:
+    """table -> (rows, data bytes, index bytes), after refreshing the statistics"""
+    cursor.execute(f"ANALYZE TABLE {', '.join(KEY_COLUMNS)}")
+    cursor.fetchall()
+    cursor.execute(f"""
+    SELECT TABLE_NAME, TABLE_ROWS, DATA_LENGTH, INDEX_LENGTH FROM information_schema.TABLES
+    WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME IN ({', '.join(['%s'] * len(KEY_COLUMNS))})
+    """, tuple(KEY_COLUMNS))
+    return {name: (rows, data, index) for name, rows, data, index in cursor.fetchall()}
+
+
+def print_sizes(title: str, sizes: dict):
+    print(f"\n{title}")
+    print(f"{'table':<22}{'rows':>10}{'data KB':>10}{'index KB':>10}")
+    for table in KEY_COLUMNS:
+        rows, data, index = sizes.get(table, (0, 0, 0))
+        print(f"{table:<22}{rows:>10}{data // 1024:>10}{index // 1024:>10}")
+
+
+def check_ids(cursor) -> bool:
+    """Every stored key must be a well-formed UUID before it can be packed"""
+    ok = True
+    for table, columns in KEY_COLUMNS.items():
+        for column in columns:
+            cursor.execute(f"SELECT COUNT(*) FROM {table} WHERE NOT IS_UUID({column})")
+            bad = cursor.fetchone()[0]
+            if bad:
+                print(f"❌ {table}.{column}: {bad} value(s) are not UUIDs")
+                ok = False
+    return ok
+
+
+def convert(cursor):
+    cursor.execute("SET FOREIGN_KEY_CHECKS = 0")
+    try:
+        for table, columns in KEY_COLUMNS.items():
+            print(f"🔄 Converting {table} ({', '.join(columns)})...")
+            # Widen to bytes first so the text survives, pack in place, then narrow
+            cursor.execute(f"ALTER TABLE {table} " + ", ".join(
+                f"MODIFY {column} VARBINARY(36) NOT NULL" for column in columns))
+            cursor.execute(f"UPDATE {table} SET " + ", ".join(
+                f"{column} = UUID_TO_BIN({column})" for column in columns))
+            cursor.execute(f"ALTER TABLE {table} " + ", ".join(
+                f"MODIFY {column} BINARY(16) NOT NULL" for column in columns))
+        
+        cursor.execute("DROP PROCEDURE IF EXISTS CalculatePokemonStats")
+        cursor.execute(CALCULATE_STATS_PROCEDURE)
+    finally:
+        cursor.execute("SET FOREIGN_KEY_CHECKS = 1")
+
+
+def check_references(cursor) -> bool:
+    ok = True
+    for child, column, parent in CHILD_KEYS:
+        cursor.execute(f"""
+        SELECT COUNT(*) FROM {child} c LEFT JOIN {parent} p ON p.id = c.{column}
+        WHERE p.id IS NULL
+        """)
+        orphans = cursor.fetchone()[0]
+        if orphans:
+            print(f"❌ {child}.{column}: {orphans} row(s) no longer match {parent}.id")
+            ok = False
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert UUID key columns from CHAR(36) to BINARY(16)")
+    parser.add_argument('--dry-run', action='store_true', help='check the data and print sizes without converting')
+    args = parser.parse_args()
+    
+    try:
+        connection = mysql.connector.connect(**DB_CONFIG)
+    except Error as e:
+        print(f"❌ Database connection failed: {e}")
+        sys.exit(1)
+    
+    connection.autocommit = True
+    cursor = connection.cursor()
+    try:
+        if column_type(cursor, 'pokemon', 'id').lower() == 'binary(16)':
+            print("✅ Keys are already BINARY(16), nothing to do")
+            return
+        
+        print("🔍 Checking existing keys...")
+        if not check_ids(cursor):
+            sys.exit(1)
+        print_sizes("Before:", table_sizes(cursor))
+        if args.dry_run:
+            return
+        
+        convert(cursor)
+        if not check_references(cursor):
+            sys.exit(1)
+        print_sizes("After:", table_sizes(cursor))
+        print("\n🎉 Keys migrated to BINARY(16)")
+    except Error as e:
+        print(f"❌ Migration failed: {e}")
+        sys.exit(1)
+    finally:
+        cursor.close()
+        connection.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -6,40 +6,82 @@ Now includes basic activity launcher for battle interface
 
 import discord
 from discord.ext import commands
+from discord import app_commands
+import aiohttp
 import mysql.connector
 from mysql.connector import Error
+import sqlite3
 import asyncio
 import json
 import random
 import os
 from datetime import datetime, timedelta
-from typing import Optional, List, Dict, Any, Tuple
+from typing import Optional, List, Dict, Any, Tuple, Set, Callable, Awaitable
+from dataclasses import dataclass, field
+import bisect
+import functools
+import hashlib
+from contextlib import contextmanager
+import re
+import time
 import uuid
+import sys
+import queue
+import threading
+import zlib
+import math
+import inspect
+import urllib.parse
+import heapq
+import traceback
+from collections import deque
 
 # Configuration
-from config import DB_CONFIG, DISCORD_BOT_TOKEN
+from config import (
+    DB_CONFIG, DISCORD_BOT_TOKEN, FEATURES,
+    DB_BACKEND, SQLITE_PATH, SQLITE_READERS,
+    STARTER_SELECTION_TIMEOUT, PENDING_SWEEP_INTERVAL,
+    PC_PAGE_SIZE, HP_REGEN_PER_HOUR,
+    TRADE_OFFER_TIMEOUT, CHALLENGE_TIMEOUT,
+    BUTTON_RESTORE_CONCURRENCY,
+    WILD_SPAWN_INTERVAL, WILD_ENCOUNTER_TIMEOUT, WILD_LEVEL_RANGE, WILD_RARITY_WEIGHTS,
+    BATTLE_TIMEOUT, TURN_TIMEOUT, TURN_MISS_LIMIT, TIMER_TICK,
+    ACHIEVEMENT_FLUSH_INTERVAL, ACHIEVEMENT_IDLE_TTL,
+    COUNTER_FLUSH_INTERVAL, COUNTER_DURABILITY, BATTLE_REWARDS,
+    ARCHIVE_AFTER_DAYS, ARCHIVE_INTERVAL, ARCHIVE_CHUNK_SIZE, ARCHIVE_CHUNK_PAUSE,
+    SERVER_CACHE_TTL, TEAM_CACHE_TTL,
+    LOOP_MONITOR_ENABLED, LOOP_LAG_INTERVAL, SLOW_CALLBACK_THRESHOLD, SLOW_CALLBACK_KEEP,
+    INTERACTION_DEFER_BUDGET, WORK_QUEUE_SIZE, WORK_QUEUE_WORKERS,
+    WORK_QUEUE_MAX_ATTEMPTS, WORK_QUEUE_RETRY_DELAY, OUTBOUND_COALESCE_WINDOW,
+    SHARD_MODE, SHARD_COUNT, SHARD_ID, BROKER_SOCKET
+)
 
 class TranslationManager:
-    """Handles multi-language support"""
+    """Handles multi-language support (files are read on first use or during startup warm-up)"""
     
     def __init__(self):
         self.translations = {}
-        self.load_translations()
+        self.loaded = False
     
     def load_translations(self):
         """Load translation files"""
+        translations = {}
         for lang in ['en', 'es']:
             try:
                 with open(f'translations/{lang}.json', 'r', encoding='utf-8') as f:
-                    self.translations[lang] = json.load(f)
+                    translations[lang] = json.load(f)
                 print(f"✅ Loaded {lang} translations")
             except FileNotFoundError:
                 print(f"❌ Translation file translations/{lang}.json not found")
                 if lang == 'en':  # English is required
                     raise
+        self.translations = translations
+        self.loaded = True
     
     def get(self, key: str, lang: str = 'en', **kwargs) -> str:
         """Get translated text with formatting"""
+        if not self.loaded:
+            self.load_translations()
         keys = key.split('.')
         text = self.translations.get(lang, self.translations['en'])
         
@@ -52,54 +94,311 @@ class TranslationManager:
             return text.format(**kwargs)
         return text if isinstance(text, str) else key
 
-class DatabaseManager:
-    """Enhanced database manager with server config support"""
+class TransactionAborted(Exception):
+    """Raised inside DatabaseManager.transaction() to roll the block back"""
+
+class MySQLBackend:
+    """MySQL over mysql.connector (the default backend)"""
     
-    def __init__(self):
+    name = 'MySQL'
+    errors = (Error,)
+    partitions = True  # battle_archive is range-partitioned by month
+    
+    def __init__(self, config: Dict = None):
+        self.config = config or DB_CONFIG
         self.connection = None
     
+    def connect(self):
+        self.connection = mysql.connector.connect(**self.config)
+    
+    def close(self):
+        if self.connection and self.connection.is_connected():
+            self.connection.close()
+    
+    def execute(self, query: str, params: tuple, fetch: Optional[str]):
+        """Run one statement; fetch is 'all', 'one' or None (return the row count)"""
+        cursor = self.connection.cursor(dictionary=True)
+        try:
+            cursor.execute(query, params)
+            if fetch == 'all':
+                return cursor.fetchall()
+            if fetch == 'one':
+                return cursor.fetchone()
+            return cursor.rowcount
+        finally:
+            cursor.close()
+    
+    def begin(self):
+        self.connection.start_transaction()
+    
+    def commit(self):
+        self.connection.commit()
+    
+    def rollback(self):
+        self.connection.rollback()
+
+class SQLiteDialect:
+    """Rewrites the MySQL the bot's queries are written in for SQLite.
+    
+    Upserts (ON DUPLICATE KEY UPDATE ... VALUES(col)) become ON CONFLICT DO
+    UPDATE ... excluded.col with no conflict target, which like MySQL fires
+    on any unique key. Row locks are dropped since the single writer already
+    serializes transactions, and DELETE ... LIMIT goes through rowid.
+    GREATEST/LEAST are SQLite's multi-argument MAX/MIN.
+    """
+    
+    READ = re.compile(r'\s*(SELECT|WITH)\b', re.I)
+    LOCKING = re.compile(r'\s+FOR\s+UPDATE(\s+OF\s+\w+)?(\s+NOWAIT|\s+SKIP\s+LOCKED)?', re.I)
+    INSERTED_VALUE = re.compile(r'\bVALUES\((\w+)\)')
+    DELETE_LIMIT = re.compile(r'^\s*DELETE\s+FROM\s+(\w+)\s+WHERE\s+(.*?)\s+LIMIT\s+(\S+)\s*$', re.I | re.S)
+    EXTREMES = re.compile(r'\b(GREATEST|LEAST)\(', re.I)
+    
+    @classmethod
+    @functools.lru_cache(maxsize=2048)
+    def translate(cls, query: str) -> Tuple[str, bool]:
+        """Return (SQLite statement, whether it only reads)"""
+        reads = bool(cls.READ.match(query)) and not cls.LOCKING.search(query)
+        query = query.replace('%s', '?')
+        query = cls.LOCKING.sub('', query)
+        if 'ON DUPLICATE KEY UPDATE' in query:
+            query = query.replace('ON DUPLICATE KEY UPDATE', 'ON CONFLICT DO UPDATE SET')
+            query = cls.INSERTED_VALUE.sub(r'excluded.\1', query)
+        query = cls.EXTREMES.sub(lambda m: 'MAX(' if m.group(1).upper() == 'GREATEST' else 'MIN(', query)
+        match = cls.DELETE_LIMIT.match(query)
+        if match:
+            table, condition, limit = match.groups()
+            query = f"DELETE FROM {table} WHERE rowid IN (SELECT rowid FROM {table} WHERE {condition} LIMIT {limit})"
+        return query, reads
+
+class SQLiteBackend:
+    """Single-file SQLite storage for one-box deployments.
+    
+    The database runs in WAL mode so reads never wait for the writer. Every
+    write, and every statement inside a transaction, goes through one writer
+    connection guarded by a lock (SQLite allows a single writer anyway);
+    other reads use a small pool of read-only connections. An empty database
+    file is initialized from schemas/db_sqlite.sql.
+    """
+    
+    name = 'SQLite'
+    errors = (sqlite3.Error,)
+    partitions = False
+    SCHEMA = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'schemas', 'db_sqlite.sql')
+    
+    def __init__(self, path: str = None, readers: int = None):
+        self.path = path or SQLITE_PATH
+        # In-memory databases are private to their connection
+        self.reader_limit = 0 if self.path == ':memory:' else (SQLITE_READERS if readers is None else readers)
+        self.writer = None
+        self.write_lock = threading.RLock()
+        self.transaction_thread = None
+        self.idle_readers = queue.Queue()
+        self.readers_opened = 0
+        self.pool_lock = threading.Lock()
+    
+    def connect(self):
+        sqlite3.register_adapter(datetime, lambda value: value.isoformat(' '))
+        sqlite3.register_converter('TIMESTAMP', lambda value: datetime.fromisoformat(value.decode()))
+        self.writer = self._open()
+        self.writer.execute("PRAGMA journal_mode = WAL")
+        if not self.writer.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' LIMIT 1").fetchone():
+            with open(self.SCHEMA, encoding='utf-8') as f:
+                self.writer.executescript(f.read())
+            print(f"🗄️ Created SQLite database at {self.path}")
+    
+    def _open(self, read_only: bool = False) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, detect_types=sqlite3.PARSE_DECLTYPES,
+                                     isolation_level=None, check_same_thread=False)
+        connection.row_factory = lambda cursor, row: {
+            column[0]: value for column, value in zip(cursor.description, row)
+        }
+        connection.execute("PRAGMA foreign_keys = ON")
+        connection.execute("PRAGMA synchronous = NORMAL")  # durable at checkpoints, safe in WAL mode
+        connection.execute("PRAGMA busy_timeout = 5000")
+        if read_only:
+            connection.execute("PRAGMA query_only = ON")
+        return connection
+    
+    def close(self):
+        while not self.idle_readers.empty():
+            self.idle_readers.get_nowait().close()
+        if self.writer:
+            self.writer.close()
+            self.writer = None
+    
+    @contextmanager
+    def _reader(self):
+        try:
+            connection = self.idle_readers.get_nowait()
+        except queue.Empty:
+            with self.pool_lock:
+                opening = self.readers_opened < self.reader_limit
+                if opening:
+                    self.readers_opened += 1
+            connection = self._open(read_only=True) if opening else self.idle_readers.get()
+        try:
+            yield connection
+        finally:
+            self.idle_readers.put(connection)
+    
+    def execute(self, query: str, params: tuple, fetch: Optional[str]):
+        """Run one statement; fetch is 'all', 'one' or None (return the row count)"""
+        statement, reads = SQLiteDialect.translate(query)
+        if self.transaction_thread == threading.get_ident():
+            return self._run(self.writer, statement, params, fetch)
+        if reads and self.reader_limit:
+            with self._reader() as connection:
+                return self._run(connection, statement, params, fetch)
+        with self.write_lock:
+            return self._run(self.writer, statement, params, fetch)
+    
+    def _run(self, connection: sqlite3.Connection, statement: str, params: tuple, fetch: Optional[str]):
+        cursor = connection.execute(statement, params)
+        try:
+            if fetch == 'all':
+                return cursor.fetchall()
+            if fetch == 'one':
+                return cursor.fetchone()
+            return cursor.rowcount
+        finally:
+            cursor.close()
+    
+    def begin(self):
+        self.write_lock.acquire()
+        try:
+            self.writer.execute("BEGIN IMMEDIATE")
+        except BaseException:
+            self.write_lock.release()
+            raise
+        self.transaction_thread = threading.get_ident()
+    
+    def _finish(self, statement: str):
+        try:
+            self.writer.execute(statement)
+        finally:
+            self.transaction_thread = None
+            self.write_lock.release()
+    
+    def commit(self):
+        self._finish("COMMIT")
+    
+    def rollback(self):
+        self._finish("ROLLBACK")
+
+UUID_TEXT = re.compile(r'[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}')
+_uuid7_last = [0, 0]  # millisecond and counter of the last ID handed out
+
+def uuid7() -> str:
+    """Time-ordered UUID (version 7) for pokemon, battle and pending starter keys.
+    
+    The leading 48 bits are Unix milliseconds, so new rows land at the end of
+    the primary key index instead of on a random page; a 12-bit counter keeps
+    IDs from the same millisecond in creation order.
+    """
+    now = time.time_ns() // 1_000_000
+    last, counter = _uuid7_last
+    if now > last:
+        counter = random.getrandbits(11)  # leaves headroom before the counter wraps
+    else:
+        now, counter = last, counter + 1
+        if counter > 0xFFF:
+            now, counter = last + 1, 0
+    _uuid7_last[:] = now, counter
+    rand = int.from_bytes(os.urandom(8), 'big') & ((1 << 62) - 1)
+    return str(uuid.UUID(int=(now << 80) | (0x7 << 76) | (counter << 64) | (0b10 << 62) | rand))
+
+def uuid_to_bin(value: str) -> bytes:
+    """'0190...-...' -> the 16 bytes stored in BINARY(16) key columns"""
+    return uuid.UUID(value).bytes
+
+def bin_to_uuid(value: bytes) -> str:
+    return str(uuid.UUID(bytes=bytes(value)))
+
+def short_id(value: str) -> str:
+    """The short form of a UUID key shown to trainers.
+    
+    A uuid7 starts with its timestamp, so everything created in the same
+    minute shares a prefix; the last 8 hex digits are random instead.
+    """
+    return str(value)[-8:]
+
+class DatabaseManager:
+    """Enhanced database manager with server config support.
+    
+    Statements are written in MySQL's dialect; the backend (DB_BACKEND)
+    decides where they run. UUID keys are BINARY(16) in the database but
+    strings everywhere else: callers pack the keys they bind with
+    uuid_to_bin, and 16-byte id columns are unpacked on the way out.
+    """
+    
+    def __init__(self, backend=None):
+        self.backend = backend or (SQLiteBackend() if DB_BACKEND == 'sqlite' else MySQLBackend())
+        self.transaction_failed = False
+        self.query_count = 0  # statements issued, for benchmarks and metrics
+    
     async def connect(self):
         """Establish database connection"""
         try:
-            self.connection = mysql.connector.connect(**DB_CONFIG)
-            print("✅ Connected to Pokemon database")
+            self.backend.connect()
+            print(f"✅ Connected to Pokemon database ({self.backend.name})")
             return True
-        except Error as e:
+        except self.backend.errors as e:
             print(f"❌ Database connection failed: {e}")
             return False
     
     async def disconnect(self):
         """Close database connection"""
-        if self.connection and self.connection.is_connected():
-            self.connection.close()
+        self.backend.close()
     
     def execute_query(self, query: str, params: tuple = None, fetch: bool = False):
         """Execute SQL query with error handling"""
+        self.query_count += 1
         try:
-            cursor = self.connection.cursor(dictionary=True)
-            cursor.execute(query, params or ())
-            
-            if fetch:
-                result = cursor.fetchall()
-            else:
-                result = cursor.rowcount
-                
-            cursor.close()
-            return result
-        except Error as e:
+            result = self.backend.execute(query, params or (), 'all' if fetch else None)
+            return [self.from_db(row) for row in result] if fetch else result
+        except self.backend.errors as e:
             print(f"Database error: {e}")
+            self.transaction_failed = True
             return None
     
+    @staticmethod
+    def from_db(row: Dict) -> Dict:
+        """Unpack BINARY(16) keys (id, pokemon_id, battle_id, ...) back into strings"""
+        for key, value in row.items():
+            if isinstance(value, (bytes, bytearray)) and len(value) == 16 and (key == 'id' or key.endswith('_id')):
+                row[key] = bin_to_uuid(value)
+        return row
+    
+    @contextmanager
+    def transaction(self):
+        """Run the block's statements atomically.
+        
+        Rolls back (raising TransactionAborted) if any statement fails or the
+        block raises TransactionAborted itself.
+        """
+        self.backend.begin()
+        self.transaction_failed = False
+        try:
+            yield self
+            if self.transaction_failed:
+                raise TransactionAborted("a statement failed")
+        except BaseException:
+            self.backend.rollback()
+            raise
+        else:
+            self.backend.commit()
+        finally:
+            self.transaction_failed = False
+    
     def execute_fetchone(self, query: str, params: tuple = None):
         """Execute query and fetch single result"""
+        self.query_count += 1
         try:
-            cursor = self.connection.cursor(dictionary=True)
-            cursor.execute(query, params or ())
-            result = cursor.fetchone()
-            cursor.close()
-            return result
-        except Error as e:
+            row = self.backend.execute(query, params or (), 'one')
+            return row and self.from_db(row)
+        except self.backend.errors as e:
             print(f"Database error: {e}")
+            self.transaction_failed = True
             return None
 
 class PersistentButtonManager:
@@ -139,29 +438,40 @@ class PersistentButtonManager:
         return self.db.execute_query(query, (server_id,), fetch=True) or []
     
     async def restore_buttons_on_startup(self):
-        """Restore all persistent buttons after bot restart"""
+        """Restore all persistent buttons after bot restart (needs the guild cache, so run after ready)"""
         query = "SELECT * FROM persistent_buttons WHERE is_active = TRUE"
         buttons = self.db.execute_query(query, fetch=True) or []
         
-        restored = 0
-        failed = 0
+        # Message checks are independent HTTP calls, so run them side by side
+        limit = asyncio.Semaphore(BUTTON_RESTORE_CONCURRENCY)
         
-        for button in buttons:
-            try:
-                channel = self.bot.get_channel(int(button['channel_id']))
-                if channel:
-                    message = await channel.fetch_message(int(button['message_id']))
-                    if message:
-                        restored += 1
-                        continue
-            except:
-                pass
-            
-            # Button/message no longer exists, mark as inactive
-            await self.deactivate_button(button['id'])
-            failed += 1
+        async def still_exists(button) -> bool:
+            async with limit:
+                try:
+                    channel = self.bot.get_channel(int(button['channel_id']))
+                    if channel:
+                        await self.bot.outbound.wait_for_route('GET', channel.id)
+                        message = await channel.fetch_message(int(button['message_id']))
+                        return message is not None
+                except Exception:
+                    pass
+                return False
+        
+        results = await asyncio.gather(*(still_exists(button) for button in buttons))
         
-        print(f"🔄 Restored {restored} persistent buttons, {failed} need recreation")
+        # Button/message no longer exists, mark as inactive
+        stale = [button['id'] for button, exists in zip(buttons, results) if not exists]
+        self.deactivate_buttons(stale)
+        
+        print(f"🔄 Restored {len(buttons) - len(stale)} persistent buttons, {len(stale)} need recreation")
+    
+    def deactivate_buttons(self, button_ids: List[int]):
+        """Mark several buttons inactive in one statement"""
+        if not button_ids:
+            return
+        placeholders = ", ".join(["%s"] * len(button_ids))
+        query = f"UPDATE persistent_buttons SET is_active = FALSE WHERE id IN ({placeholders})"
+        self.db.execute_query(query, tuple(button_ids))
 
     async def deactivate_button(self, button_id: int):
         """Mark button as inactive"""
@@ -195,6 +505,13 @@ class IVGenerator:
             'speed': random.randint(10, 25)
         }
     
+    @staticmethod
+    def generate_common_ivs_batch(count: int) -> List[Dict[str, int]]:
+        """generate_common_ivs for many Pokemon at once (one draw for every stat)"""
+        rolls = random.choices(range(10, 26), k=count * 6)
+        stats = ('hp', 'attack', 'defense', 'sp_attack', 'sp_defense', 'speed')
+        return [dict(zip(stats, rolls[i:i + 6])) for i in range(0, count * 6, 6)]
+    
     @staticmethod
     def calculate_stats(base_stats: Dict, ivs: Dict, level: int) -> Dict[str, int]:
         """Calculate final Pokemon stats using official formula"""
@@ -226,6 +543,585 @@ class IVGenerator:
         else:
             return "terrible"
 
+class HPRegeneration:
+    """Passive healing (HP_REGEN_PER_HOUR), computed from elapsed time instead of by a job.
+    
+    pokemon.current_hp holds the HP as of pokemon.updated_at (NULL = full).
+    Reads add one regen step per whole hour since then. Nothing is written
+    back on read; any code that updates a pokemon row must store the
+    regenerated value, since the update moves updated_at forward.
+    """
+    
+    @staticmethod
+    def regenerate(stored_hp: Optional[int], max_hp: int, updated_at: Optional[datetime],
+                   now: datetime = None) -> Tuple[int, Optional[datetime]]:
+        """Return (current HP, timestamp the healed value is valid from)"""
+        if stored_hp is None or updated_at is None:
+            return max_hp if stored_hp is None else stored_hp, updated_at
+        
+        now = now or datetime.now()
+        hours = max(0, int((now - updated_at).total_seconds() // 3600))
+        healed = min(max_hp, stored_hp + hours * HP_REGEN_PER_HOUR)
+        return healed, updated_at + timedelta(hours=hours)
+    
+    @staticmethod
+    def stored_value(hp: int, max_hp: int) -> Optional[int]:
+        """Value to write to current_hp (NULL means full HP)"""
+        return None if hp >= max_hp else hp
+    
+    @classmethod
+    def materialize(cls, db: DatabaseManager, batch_size: int = 500) -> int:
+        """Write regenerated HP for every damaged Pokemon, in id-ordered chunks (for analytics)"""
+        query = f"""
+        SELECT {BattleManager.TEAM_COLUMNS}
+        FROM pokemon p
+        JOIN pokemon_species s ON p.species_id = s.id
+        WHERE p.current_hp IS NOT NULL AND p.id > %s
+        ORDER BY p.id
+        LIMIT %s
+        """
+        last_id = b''  # sorts before every packed key
+        updated = 0
+        
+        while True:
+            rows = db.execute_query(query, (last_id, batch_size), fetch=True) or []
+            if not rows:
+                break
+            last_id = uuid_to_bin(rows[-1]['id'])
+            
+            changes = []
+            for row in rows:
+                # Same stats (and so max HP) as every team read
+                member = BattleManager.build_team_member(row)
+                if member['current_hp'] != row['current_hp']:
+                    changes.append((uuid_to_bin(row['id']),
+                                    cls.stored_value(member['current_hp'], member['max_hp']),
+                                    member['hp_as_of']))
+            
+            if changes:
+                # Keep updated_at on the last whole hour so partial progress isn't lost
+                hp_cases = " ".join(["WHEN %s THEN %s"] * len(changes))
+                time_cases = " ".join(["WHEN %s THEN %s"] * len(changes))
+                placeholders = ", ".join(["%s"] * len(changes))
+                params = []
+                for pokemon_id, hp, _ in changes:
+                    params += [pokemon_id, hp]
+                for pokemon_id, _, anchor in changes:
+                    params += [pokemon_id, anchor]
+                params += [pokemon_id for pokemon_id, _, _ in changes]
+                db.execute_query(f"""
+                UPDATE pokemon
+                SET current_hp = CASE id {hp_cases} END,
+                    updated_at = CASE id {time_cases} END
+                WHERE id IN ({placeholders})
+                """, tuple(params))
+                updated += len(changes)
+            
+            if len(rows) < batch_size:
+                break
+        
+        return updated
+
+class InventoryService:
+    """Trainer inventory (user_items) with atomic, batched writes.
+    
+    Consumption is a conditional decrement (quantity >= n) so concurrent
+    interactions can never overspend, grants are a single multi-row upsert,
+    and reads come from a per-user cache that every write invalidates.
+    """
+    
+    # item_id -> (item_type, effect)
+    ITEMS = {
+        'POTION': ('HEALING', {'heal': 20}),
+        'SUPER_POTION': ('HEALING', {'heal': 50}),
+        'ANTIDOTE': ('HEALING', {'cure': 'POISON'}),
+        'POKEBALL': ('POKEBALL', {})
+    }
+    
+    def __init__(self, db: DatabaseManager):
+        self.db = db
+        self.cache = {}  # user_id -> {item_id: quantity}
+        self.broker = None  # BrokerClient in multi-process mode
+    
+    def attach_broker(self, broker: 'BrokerClient'):
+        """Share invalidations with the other shard processes"""
+        self.broker = broker
+        broker.subscribe('invalidate.inventory', lambda user_id: self.cache.pop(user_id, None))
+    
+    def get_inventory(self, user_id: str) -> Dict[str, int]:
+        if user_id not in self.cache:
+            rows = self.db.execute_query(
+                "SELECT item_id, quantity FROM user_items WHERE user_id = %s", (user_id,), fetch=True
+            )
+            if rows is None:
+                return {}
+            self.cache[user_id] = {row['item_id']: row['quantity'] for row in rows}
+        return self.cache[user_id]
+    
+    def invalidate(self, user_id: str):
+        self.cache.pop(user_id, None)
+        if self.broker:
+            self.broker.publish('invalidate.inventory', user_id)
+    
+    def grant(self, user_id: str, items: List[Tuple[str, int]]) -> bool:
+        """Add several (item_id, quantity) stacks in one upsert"""
+        if not items:
+            return True
+        values = ", ".join(["(%s, %s, %s, %s)"] * len(items))
+        params = []
+        for item_id, quantity in items:
+            params += [user_id, self.ITEMS[item_id][0], item_id, quantity]
+        
+        result = self.db.execute_query(f"""
+        INSERT INTO user_items (user_id, item_type, item_id, quantity)
+        VALUES {values}
+        ON DUPLICATE KEY UPDATE quantity = quantity + VALUES(quantity)
+        """, tuple(params))
+        self.invalidate(user_id)
+        return result is not None
+    
+    def consume(self, user_id: str, item_id: str, quantity: int = 1) -> bool:
+        """Spend items only if the trainer has enough, in a single statement"""
+        return self._consume_many(user_id, {item_id: quantity})
+    
+    def _consume_many(self, user_id: str, counts: Dict[str, int]) -> bool:
+        cases = " ".join(["WHEN %s THEN %s"] * len(counts))
+        case_params = []
+        for item_id, quantity in counts.items():
+            case_params += [item_id, quantity]
+        placeholders = ", ".join(["%s"] * len(counts))
+        
+        updated = self.db.execute_query(f"""
+        UPDATE user_items
+        SET quantity = quantity - CASE item_id {cases} END
+        WHERE user_id = %s AND item_id IN ({placeholders})
+          AND quantity >= CASE item_id {cases} END
+        """, tuple(case_params + [user_id] + list(counts) + case_params))
+        self.invalidate(user_id)
+        return updated == len(counts)
+    
+    def apply_items(self, user_id: str, uses: List[Tuple[str, Dict]]) -> Optional[List[Dict]]:
+        """Use items on team members: [(item_id, team_member), ...].
+        
+        Spends every item and writes every target in one transaction with
+        two statements, however many items are used. Returns the updated
+        targets, or None if the trainer is short on any item.
+        """
+        counts = {}
+        targets = {}
+        for item_id, pokemon in uses:
+            effect = self.ITEMS[item_id][1]
+            target = targets.setdefault(pokemon['id'], dict(pokemon))
+            if 'heal' in effect:
+                target['current_hp'] = min(target['max_hp'], target['current_hp'] + effect['heal'])
+            if effect.get('cure') and target['status'] == effect['cure']:
+                target['status'] = 'HEALTHY'
+            counts[item_id] = counts.get(item_id, 0) + 1
+        
+        if not targets:
+            return []
+        
+        hp_cases = " ".join(["WHEN %s THEN %s"] * len(targets))
+        status_cases = " ".join(["WHEN %s THEN %s"] * len(targets))
+        time_cases = " ".join(["WHEN %s THEN %s"] * len(targets))
+        placeholders = ", ".join(["%s"] * len(targets))
+        params = []
+        keys = {pokemon_id: uuid_to_bin(pokemon_id) for pokemon_id in targets}
+        for target in targets.values():
+            params += [keys[target['id']], HPRegeneration.stored_value(target['current_hp'], target['max_hp'])]
+        for target in targets.values():
+            params += [keys[target['id']], target['status']]
+        # Keep updated_at on the last whole regen hour so a partial hour isn't lost
+        now = datetime.now()
+        for target in targets.values():
+            params += [keys[target['id']], target.get('hp_as_of') or now]
+        params += list(keys.values()) + [user_id]
+        
+        try:
+            with self.db.transaction():
+                if not self._consume_many(user_id, counts):
+                    raise TransactionAborted("not enough items")
+                self.db.execute_query(f"""
+                UPDATE pokemon
+                SET current_hp = CASE id {hp_cases} END,
+                    status_condition = CASE id {status_cases} END,
+                    updated_at = CASE id {time_cases} END
+                WHERE id IN ({placeholders}) AND user_id = %s
+                """, tuple(params))
+        except TransactionAborted:
+            self.invalidate(user_id)
+            return None
+        
+        return list(targets.values())
+
+class CounterBuffer:
+    """Write-behind buffer for the hot counters on users rows.
+    
+    Battle results and rewards become per-trainer deltas in memory; every
+    COUNTER_FLUSH_INTERVAL seconds all pending trainers are written with one
+    multi-row UPDATE, so a busy trainer's row takes one write per interval no
+    matter how many battles they finish. Reads go through merge(), which
+    applies the pending deltas (read-your-writes).
+    
+    Crash semantics follow COUNTER_DURABILITY: 'buffered' can lose up to one
+    interval of changes if the process dies (stop() flushes on a clean
+    shutdown); 'immediate' writes every change as it is recorded.
+    """
+    
+    ADDITIVE = ('battles_won', 'battles_lost', 'trainer_xp', 'coins', 'battle_points')
+    COLUMNS = ADDITIVE + ('current_streak', 'best_streak', 'last_battle')
+    FLUSH_BATCH = 500  # trainers per UPDATE
+    
+    def __init__(self, db: DatabaseManager, durability: str = None):
+        self.db = db
+        self.durability = durability or COUNTER_DURABILITY
+        # user_id -> {'add': {column: delta}, 'streak': {...} or None, 'last_battle': datetime or None}
+        # streak: wins on top of the stored streak ('lead'), whether a loss reset it,
+        # the run since the last reset and the best run since the first reset
+        self.pending = {}
+        self.flusher = None
+    
+    def _entry(self, user_id: str) -> Dict:
+        entry = self.pending.get(user_id)
+        if entry is None:
+            entry = self.pending[user_id] = {'add': {}, 'streak': None, 'last_battle': None}
+        return entry
+    
+    def _recorded(self):
+        if self.durability == 'immediate':
+            self.flush()
+    
+    def add(self, user_id: str, **deltas: int):
+        """Queue increments, e.g. add(user_id, coins=100)"""
+        entry = self._entry(user_id)
+        for column, delta in deltas.items():
+            entry['add'][column] = entry['add'].get(column, 0) + delta
+        self._recorded()
+    
+    def record_battle(self, user_id: str, won: bool, at: datetime):
+        """Queue a ranked battle result with its BATTLE_REWARDS"""
+        entry = self._entry(user_id)
+        streak = entry['streak'] or {'lead': 0, 'reset': False, 'run': 0, 'best': 0}
+        if not won:
+            streak['reset'], streak['run'] = True, 0
+        elif streak['reset']:
+            streak['run'] += 1
+            streak['best'] = max(streak['best'], streak['run'])
+        else:
+            streak['lead'] += 1
+        entry['streak'] = streak
+        entry['last_battle'] = at
+        self.add(user_id, **{'battles_won' if won else 'battles_lost': 1},
+                 **BATTLE_REWARDS['win' if won else 'loss'])
+    
+    def on_battle_event(self, event_type: str, battle: Dict):
+        """BattleManager listener: results of finished battles between two trainers"""
+        if event_type != 'battle_completed' or not battle.get('player2_id') or not battle.get('winner_id'):
+            return
+        for player_id in (battle['player1_id'], battle['player2_id']):
+            self.record_battle(player_id, player_id == battle['winner_id'], battle['ended_at'])
+    
+    def merge(self, user_id: str, row: Optional[Dict]) -> Optional[Dict]:
+        """Apply pending changes to a users row holding any of the counter columns"""
+        entry = self.pending.get(user_id)
+        if not entry or not row:
+            return row
+        for column, delta in entry['add'].items():
+            if column in row:
+                row[column] = (row[column] or 0) + delta
+        streak = entry['streak']
+        if streak and 'current_streak' in row:
+            current = row['current_streak'] or 0
+            if 'best_streak' in row:
+                row['best_streak'] = max(row['best_streak'] or 0, current + streak['lead'], streak['best'])
+            row['current_streak'] = streak['run'] if streak['reset'] else current + streak['lead']
+        if entry['last_battle'] and 'last_battle' in row:
+            row['last_battle'] = entry['last_battle']
+        return row
+    
+    def read(self, user_id: str) -> Optional[Dict]:
+        """A trainer's counters as they will be once pending changes are written"""
+        row = self.db.execute_fetchone(
+            f"SELECT {', '.join(self.COLUMNS)} FROM users WHERE id = %s", (user_id,)
+        )
+        return self.merge(user_id, row)
+    
+    def flush(self):
+        """Write every pending trainer, FLUSH_BATCH per statement"""
+        if not self.pending:
+            return
+        pending, self.pending = self.pending, {}
+        user_ids = list(pending)
+        for start in range(0, len(user_ids), self.FLUSH_BATCH):
+            batch = user_ids[start:start + self.FLUSH_BATCH]
+            if self._write(batch, pending) is None:
+                # flush never yields, so nothing new was recorded meanwhile
+                self.pending.update({user_id: pending[user_id] for user_id in user_ids[start:]})
+                return
+    
+    def _write(self, user_ids: List[str], pending: Dict):
+        sets = []
+        params = []
+        
+        streaks = [(user_id, pending[user_id]['streak']) for user_id in user_ids if pending[user_id]['streak']]
+        if streaks:
+            # best_streak first: MySQL assigns left to right, so current_streak is still the stored value
+            sets.append("best_streak = CASE id "
+                        + " ".join(["WHEN %s THEN GREATEST(best_streak, current_streak + %s, %s)"] * len(streaks))
+                        + " ELSE best_streak END")
+            for user_id, streak in streaks:
+                params += [user_id, streak['lead'], streak['best']]
+            cases = []
+            for user_id, streak in streaks:
+                if streak['reset']:
+                    cases.append("WHEN %s THEN %s")
+                    params += [user_id, streak['run']]
+                else:
+                    cases.append("WHEN %s THEN current_streak + %s")
+                    params += [user_id, streak['lead']]
+            sets.append(f"current_streak = CASE id {' '.join(cases)} ELSE current_streak END")
+        
+        for column in self.ADDITIVE:
+            deltas = [(user_id, pending[user_id]['add'][column])
+                      for user_id in user_ids if pending[user_id]['add'].get(column)]
+            if deltas:
+                sets.append(f"{column} = {column} + CASE id {' '.join(['WHEN %s THEN %s'] * len(deltas))} ELSE 0 END")
+                params += [value for delta in deltas for value in delta]
+        
+        last = [(user_id, pending[user_id]['last_battle']) for user_id in user_ids if pending[user_id]['last_battle']]
+        if last:
+            sets.append(f"last_battle = CASE id {' '.join(['WHEN %s THEN %s'] * len(last))} ELSE last_battle END")
+            params += [value for entry in last for value in entry]
+        
+        if not sets:
+            return 0
+        placeholders = ", ".join(["%s"] * len(user_ids))
+        return self.db.execute_query(f"""
+        UPDATE users SET {', '.join(sets)}
+        WHERE id IN ({placeholders})
+        """, tuple(params + user_ids))
+    
+    def start(self):
+        if not self.flusher and self.durability != 'immediate':
+            self.flusher = asyncio.create_task(self._flush_forever())
+    
+    async def stop(self):
+        if self.flusher:
+            self.flusher.cancel()
+            self.flusher = None
+        self.flush()
+    
+    async def _flush_forever(self):
+        while True:
+            await asyncio.sleep(COUNTER_FLUSH_INTERVAL)
+            self.flush()
+
+class AchievementEngine:
+    """Unlocks achievements from battle and onboarding events.
+    
+    Events bump per-user counters; rules are indexed by counter and sorted
+    by threshold, so an event only looks at the thresholds its counters just
+    crossed, no matter how many achievements exist. Counters and unlocks
+    live in memory and are written behind every ACHIEVEMENT_FLUSH_INTERVAL
+    seconds: progress is upserted as deltas (resets as absolute values), so
+    shard processes sharing a trainer add up, and re-read after each flush;
+    unlocks are one insert per flush and their coin rewards go through the
+    trainer CounterBuffer. Trainers with nothing
+    left to write are evicted after ACHIEVEMENT_IDLE_TTL and reloaded from
+    achievement_progress on their next event.
+    """
+    
+    ACHIEVEMENTS = [
+        # (id, name, counter, threshold, coin reward)
+        ('first_steps', 'First Steps', 'starters', 1, 100),
+        ('first_battle', 'Into the Arena', 'battles', 1, 50),
+        ('battles_10', 'Regular Challenger', 'battles', 10, 100),
+        ('battles_100', 'Arena Veteran', 'battles', 100, 500),
+        ('first_win', 'First Victory', 'wins', 1, 100),
+        ('wins_10', 'Rising Star', 'wins', 10, 250),
+        ('wins_50', 'Ace Trainer', 'wins', 50, 750),
+        ('wins_100', 'Champion Material', 'wins', 100, 1500),
+        ('streak_3', 'On a Roll', 'streak', 3, 150),
+        ('streak_5', 'Unstoppable', 'streak', 5, 300),
+        ('streak_10', 'Legendary Run', 'streak', 10, 1000),
+    ]
+    
+    # event type -> [(counter, operation)] ('inc' adds one, 'reset' sets to zero)
+    EVENT_COUNTERS = {
+        'starter_chosen': [('starters', 'inc')],
+        'battle_won': [('battles', 'inc'), ('wins', 'inc'), ('streak', 'inc')],
+        'battle_lost': [('battles', 'inc'), ('streak', 'reset')],
+    }
+    
+    def __init__(self, db: DatabaseManager, counters: CounterBuffer):
+        self.db = db
+        self.counters = counters
+        self.by_id = {a[0]: a for a in self.ACHIEVEMENTS}
+        
+        # counter -> (sorted thresholds, achievement ids in the same order)
+        self.rules = {}
+        for achievement in sorted(self.ACHIEVEMENTS, key=lambda a: a[3]):
+            thresholds, ids = self.rules.setdefault(achievement[2], ([], []))
+            thresholds.append(achievement[3])
+            ids.append(achievement[0])
+        
+        self.progress = {}  # user_id -> {counter: value}
+        self.unlocked = {}  # user_id -> set of achievement ids
+        self.dirty = {}  # (user_id, counter) -> ('add', delta) or ('set', value) still to write
+        self.pending_unlocks = []  # (user_id, achievement_id, unlocked_at)
+        self.last_seen = {}  # user_id -> monotonic time of their last event, oldest first
+        self.flusher = None
+    
+    def _load_user(self, user_id: str):
+        """Pull a trainer's counters and unlocks into memory on their first event"""
+        if user_id in self.progress:
+            return
+        rows = self.db.execute_query(
+            "SELECT counter, value FROM achievement_progress WHERE user_id = %s", (user_id,), fetch=True
+        ) or []
+        progress = {row['counter']: row['value'] for row in rows}
+        if not progress:
+            # First event for this trainer: start from the battle record kept on users
+            user = self.counters.merge(user_id, self.db.execute_fetchone(
+                "SELECT battles_won, battles_lost, current_streak FROM users WHERE id = %s", (user_id,)
+            ))
+            if user:
+                progress = {
+                    'wins': user['battles_won'] or 0,
+                    'battles': (user['battles_won'] or 0) + (user['battles_lost'] or 0),
+                    'streak': user['current_streak'] or 0,
+                }
+                # Written right away (keeping any row another shard wrote first) so later changes are deltas
+                values = ", ".join(["(%s, %s, %s)"] * len(progress))
+                params = [value for counter, count in progress.items() for value in (user_id, counter, count)]
+                self.db.execute_query(f"""
+                INSERT INTO achievement_progress (user_id, counter, value) VALUES {values}
+                ON DUPLICATE KEY UPDATE value = value
+                """, tuple(params))
+        self.progress[user_id] = progress
+        rows = self.db.execute_query(
+            "SELECT achievement_id FROM user_achievements WHERE user_id = %s", (user_id,), fetch=True
+        ) or []
+        self.unlocked[user_id] = {row['achievement_id'] for row in rows}
+    
+    def record(self, event_type: str, user_id: str) -> List[str]:
+        """Apply an event for one trainer; returns newly unlocked achievement names"""
+        operations = self.EVENT_COUNTERS.get(event_type)
+        if not operations:
+            return []
+        
+        self._load_user(user_id)
+        self.last_seen.pop(user_id, None)
+        self.last_seen[user_id] = time.monotonic()
+        counters = self.progress[user_id]
+        unlocked = []
+        
+        for counter, operation in operations:
+            before = counters.get(counter, 0)
+            after = before + 1 if operation == 'inc' else 0
+            counters[counter] = after
+            # Increments go out as deltas so shard processes sharing a trainer add up; a reset is absolute
+            kind, amount = self.dirty.get((user_id, counter), ('add', 0))
+            self.dirty[(user_id, counter)] = (kind, amount + 1) if operation == 'inc' else ('set', 0)
+            
+            if after <= before or counter not in self.rules:
+                continue
+            thresholds, ids = self.rules[counter]
+            start = bisect.bisect_right(thresholds, before)
+            end = bisect.bisect_right(thresholds, after)
+            for achievement_id in ids[start:end]:
+                if achievement_id not in self.unlocked[user_id]:
+                    self.unlocked[user_id].add(achievement_id)
+                    self.pending_unlocks.append((user_id, achievement_id, datetime.now()))
+                    unlocked.append(self.by_id[achievement_id][1])
+        
+        return unlocked
+    
+    def on_battle_event(self, event_type: str, battle: Dict):
+        """BattleManager listener: turn a finished battle into per-trainer events"""
+        if event_type != 'battle_completed' or not battle.get('player2_id') or not battle.get('winner_id'):
+            return
+        for player_id in (battle['player1_id'], battle['player2_id']):
+            self.record('battle_won' if player_id == battle['winner_id'] else 'battle_lost', player_id)
+    
+    def flush(self):
+        """Write dirty counters (deltas and resets), new unlocks and their rewards"""
+        if self.dirty:
+            dirty, self.dirty = self.dirty, {}
+            for kind, update in (('set', 'VALUES(value)'), ('add', 'value + VALUES(value)')):
+                batch = [(key, amount) for key, (entry_kind, amount) in dirty.items() if entry_kind == kind]
+                if not batch:
+                    continue
+                values = ", ".join(["(%s, %s, %s)"] * len(batch))
+                params = [value for (user_id, counter), amount in batch for value in (user_id, counter, amount)]
+                result = self.db.execute_query(f"""
+                INSERT INTO achievement_progress (user_id, counter, value) VALUES {values}
+                ON DUPLICATE KEY UPDATE value = {update}
+                """, tuple(params))
+                if result is None:
+                    self.dirty.update((key, (kind, amount)) for key, amount in batch)
+            self._refresh({user_id for user_id, _ in dirty})
+        
+        if self.pending_unlocks:
+            unlocks = self.pending_unlocks
+            self.pending_unlocks = []
+            values = ", ".join(["(%s, %s, %s)"] * len(unlocks))
+            params = [value for unlock in unlocks for value in unlock]
+            result = self.db.execute_query(f"""
+            INSERT INTO user_achievements (user_id, achievement_id, unlocked_at) VALUES {values}
+            ON DUPLICATE KEY UPDATE achievement_id = achievement_id
+            """, tuple(params))
+            if result is None:
+                self.pending_unlocks = unlocks + self.pending_unlocks
+                return
+            
+            for user_id, achievement_id, _ in unlocks:
+                self.counters.add(user_id, coins=self.by_id[achievement_id][4])
+        
+        self.evict_idle()
+    
+    def _refresh(self, user_ids: Set[str]):
+        """Re-read flushed counters so increments made by other shard processes show up here"""
+        user_ids = [user_id for user_id in user_ids if user_id in self.progress]
+        if not user_ids:
+            return
+        placeholders = ", ".join(["%s"] * len(user_ids))
+        rows = self.db.execute_query(f"""
+        SELECT user_id, counter, value FROM achievement_progress WHERE user_id IN ({placeholders})
+        """, tuple(user_ids), fetch=True) or []
+        for row in rows:
+            if (row['user_id'], row['counter']) not in self.dirty:
+                self.progress[row['user_id']][row['counter']] = row['value']
+    
+    def evict_idle(self, ttl: float = ACHIEVEMENT_IDLE_TTL):
+        """Drop trainers who have been quiet for `ttl` seconds and have nothing left to write"""
+        cutoff = time.monotonic() - ttl
+        unwritten = {user_id for user_id, _ in self.dirty}
+        unwritten.update(user_id for user_id, _, _ in self.pending_unlocks)
+        for user_id, seen in list(self.last_seen.items()):
+            if seen > cutoff:
+                break
+            if user_id in unwritten:
+                continue
+            del self.last_seen[user_id]
+            self.progress.pop(user_id, None)
+            self.unlocked.pop(user_id, None)
+    
+    def start(self):
+        if not self.flusher:
+            self.flusher = asyncio.create_task(self._flush_forever())
+    
+    async def stop(self):
+        if self.flusher:
+            self.flusher.cancel()
+            self.flusher = None
+        self.flush()
+    
+    async def _flush_forever(self):
+        while True:
+            await asyncio.sleep(ACHIEVEMENT_FLUSH_INTERVAL)
+            self.flush()
+
 class TypeEffectiveness:
     """Pokemon type effectiveness system"""
     
@@ -271,125 +1167,2530 @@ class TypeEffectiveness:
             'weak': ['GROUND', 'ROCK', 'GHOST'],
             'immune': ['STEEL']
         }
-    }
+    }
+    
+    TYPE_EMOJIS = {
+        'FIRE': '🔥', 'WATER': '💧', 'GRASS': '🌿', 'ELECTRIC': '⚡',
+        'NORMAL': '⭐', 'BUG': '🐛', 'FLYING': '💨', 'POISON': '☠️',
+        'GROUND': '🌍', 'ROCK': '🗿', 'ICE': '❄️', 'STEEL': '⚙️',
+        'PSYCHIC': '🔮', 'FIGHTING': '👊', 'GHOST': '👻', 'DRAGON': '🐉'
+    }
+    
+    @classmethod
+    def get_effectiveness_text(cls, attacking_type: str, lang: str = 'en', 
+                             translations: TranslationManager = None) -> str:
+        """Get formatted effectiveness text for a type"""
+        if attacking_type not in cls.EFFECTIVENESS:
+            return ""
+        
+        eff = cls.EFFECTIVENESS[attacking_type]
+        lines = []
+        
+        if eff['strong']:
+            strong_types = [f"{cls.TYPE_EMOJIS.get(t, '❓')} {t}" for t in eff['strong']]
+            strong_text = translations.get('pokemon.type_chart.strong_vs', lang) if translations else "Strong vs:"
+            lines.append(f"{strong_text} {', '.join(strong_types)}")
+        
+        if eff['weak']:
+            weak_types = [f"{cls.TYPE_EMOJIS.get(t, '❓')} {t}" for t in eff['weak']]
+            weak_text = translations.get('pokemon.type_chart.weak_vs', lang) if translations else "Weak vs:"
+            lines.append(f"{weak_text} {', '.join(weak_types)}")
+        
+        return "\n".join(lines)
+
+class SpeciesCatalog:
+    """In-memory copy of pokemon_species, loaded once on first use"""
+    
+    def __init__(self, db: DatabaseManager):
+        self.db = db
+        self.species = {}  # species_id -> row
+        self.loaded = False
+    
+    def ensure_loaded(self):
+        if not self.loaded:
+            rows = self.db.execute_query("SELECT * FROM pokemon_species", fetch=True)
+            if rows is not None:
+                self.species = {row['id']: row for row in rows}
+                self.loaded = True
+    
+    def get(self, species_id: int) -> Optional[Dict]:
+        self.ensure_loaded()
+        return self.species.get(species_id)
+    
+    def ids_for_type(self, pokemon_type: str) -> List[int]:
+        self.ensure_loaded()
+        pokemon_type = pokemon_type.upper()
+        return [sid for sid, row in self.species.items() if pokemon_type in (row['type1'], row['type2'])]
+    
+    def ids_matching_name(self, name: str) -> List[int]:
+        self.ensure_loaded()
+        name = name.lower()
+        return [sid for sid, row in self.species.items() if row['name'].lower().startswith(name)]
+    
+    def base_form_ids(self, rarity: str) -> List[int]:
+        """Species of a rarity that nothing evolves into"""
+        self.ensure_loaded()
+        evolved = {row['evolution_into'] for row in self.species.values() if row.get('evolution_into')}
+        return [sid for sid, row in self.species.items() if row['rarity'] == rarity and sid not in evolved]
+
+class MoveCatalog:
+    """In-memory copy of moves and level-up learnsets, loaded once on first use"""
+    
+    MAX_MOVES = 4
+    
+    def __init__(self, db: DatabaseManager):
+        self.db = db
+        self.moves = {}  # move_id -> row
+        self.learnsets = {}  # species_id -> [(learn_level, move_id)] sorted by level
+        self.loaded = False
+    
+    def ensure_loaded(self):
+        if self.loaded:
+            return
+        moves = self.db.execute_query("SELECT * FROM moves", fetch=True)
+        learnsets = self.db.execute_query(
+            "SELECT species_id, move_id, learn_level FROM pokemon_movesets WHERE learn_method = 'LEVEL'",
+            fetch=True
+        )
+        if moves is None or learnsets is None:
+            return
+        self.moves = {row['id']: row for row in moves}
+        self.learnsets = {}
+        for row in learnsets:
+            self.learnsets.setdefault(row['species_id'], []).append((row['learn_level'] or 1, row['move_id']))
+        for entries in self.learnsets.values():
+            entries.sort()
+        self.loaded = True
+    
+    def get(self, move_id: int) -> Optional[Dict]:
+        self.ensure_loaded()
+        return self.moves.get(move_id)
+    
+    def default_moveset(self, species_id: int, level: int) -> List[int]:
+        """The latest moves a species knows by this level, as in the games"""
+        self.ensure_loaded()
+        learned = [move_id for learn_level, move_id in self.learnsets.get(species_id, ()) if learn_level <= level]
+        return learned[-self.MAX_MOVES:]
+    
+    def attach(self, members: List[Dict]):
+        """Give team members their moves from pokemon_moves, all in one IN query"""
+        by_id = {member['id']: member for member in members}
+        for member in by_id.values():
+            member['moves'] = []
+        if not by_id:
+            return
+        placeholders = ", ".join(["%s"] * len(by_id))
+        move_rows = self.db.execute_query(f"""
+        SELECT pokemon_id, move_id, slot, current_pp, max_pp FROM pokemon_moves
+        WHERE pokemon_id IN ({placeholders})
+        ORDER BY pokemon_id, slot
+        """, tuple(uuid_to_bin(pokemon_id) for pokemon_id in by_id), fetch=True) or []
+        for row in move_rows:
+            by_id[row['pokemon_id']]['moves'].append(self.battle_move(
+                row['move_id'], row['slot'], row['current_pp'], row['max_pp']
+            ))
+    
+    def battle_move(self, move_id: int, slot: int, pp: int, max_pp: int) -> Dict:
+        """A move as carried in battle state"""
+        move = self.get(move_id) or {}
+        return {
+            'slot': slot,
+            'move_id': move_id,
+            'name': move.get('name', '???'),
+            'type': move.get('type'),
+            'category': move.get('category'),
+            'power': move.get('power'),
+            'accuracy': move.get('accuracy'),
+            'priority': move.get('priority', 0),
+            'pp': pp,
+            'max_pp': max_pp
+        }
+    
+    def insert_movesets(self, pokemon: List[Tuple[str, int, int]]):
+        """Give new Pokemon [(pokemon_id, species_id, level)] their default moves in one insert"""
+        rows = []
+        for pokemon_id, species_id, level in pokemon:
+            for slot, move_id in enumerate(self.default_moveset(species_id, level), 1):
+                base_pp = self.moves[move_id]['base_pp']
+                rows += [uuid_to_bin(pokemon_id), move_id, slot, base_pp, base_pp]
+        if not rows:
+            return
+        values = ", ".join(["(%s, %s, %s, %s, %s)"] * (len(rows) // 5))
+        self.db.execute_query(f"""
+        INSERT INTO pokemon_moves (pokemon_id, move_id, slot, current_pp, max_pp)
+        VALUES {values}
+        """, tuple(rows))
+
+class AliasTable:
+    """Walker's alias method: O(n) to build, O(1) per weighted draw"""
+    
+    def __init__(self, items: List, weights: List[float]):
+        count = len(items)
+        total = float(sum(weights))
+        scaled = [weight * count / total for weight in weights]
+        self.items = list(items)
+        self.prob = [1.0] * count
+        self.alias = list(range(count))
+        
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            low, high = small.pop(), large.pop()
+            self.prob[low] = scaled[low]
+            self.alias[low] = high
+            scaled[high] -= 1.0 - scaled[low]
+            (small if scaled[high] < 1.0 else large).append(high)
+    
+    def sample(self):
+        i = random.randrange(len(self.items))
+        return self.items[i] if random.random() < self.prob[i] else self.items[self.alias[i]]
+
+class PCStorage:
+    """Pages through a trainer's stored Pokemon (is_active = FALSE) newest first.
+    
+    Uses keyset pagination on (caught_at, id) so every page is an index seek,
+    however deep the trainer has scrolled. Type and species-name filters are
+    resolved to species IDs through the catalog and become one UNION ALL
+    branch per species, each served in order by idx_pc_species.
+    """
+    
+    COLUMNS = "p.id, p.species_id, p.nickname, p.level, p.caught_at"
+    
+    def __init__(self, db: DatabaseManager, catalog: SpeciesCatalog, page_size: int = PC_PAGE_SIZE):
+        self.db = db
+        self.catalog = catalog
+        self.page_size = page_size
+    
+    def fetch_page(self, user_id: str, filters: Dict, cursor: Optional[Tuple] = None) -> Tuple[List[Dict], Optional[Tuple]]:
+        """Return one page of stored Pokemon and the cursor for the next page (None at the end)"""
+        limit = self.page_size + 1
+        branches = []
+        params = []
+        
+        seek_sql = ""
+        seek_params = []
+        if cursor:
+            seek_sql = "AND (p.caught_at < %s OR (p.caught_at = %s AND p.id < %s))"
+            seek_params = [cursor[0], cursor[0], uuid_to_bin(cursor[1])]
+        
+        level_sql = "AND p.level = %s" if filters.get('level') else ""
+        level_params = [filters['level']] if filters.get('level') else []
+        
+        species_ids = None
+        if filters.get('type'):
+            species_ids = set(self.catalog.ids_for_type(filters['type']))
+        if filters.get('name'):
+            named = set(self.catalog.ids_matching_name(filters['name']))
+            species_ids = named if species_ids is None else species_ids & named
+        
+        def branch(condition: str, condition_params: List):
+            branches.append(f"""
+            SELECT * FROM (
+                SELECT {self.COLUMNS} FROM pokemon p
+                WHERE p.user_id = %s AND p.is_active = FALSE {condition} {level_sql} {seek_sql}
+                ORDER BY p.caught_at DESC, p.id DESC LIMIT {limit}
+            ) branch_{len(branches)}
+            """)
+            params.extend([user_id] + condition_params + level_params + seek_params)
+        
+        if species_ids is None:
+            branch("", [])
+        else:
+            for species_id in sorted(species_ids):
+                branch("AND p.species_id = %s", [species_id])
+        
+        if filters.get('name') and not filters.get('type'):
+            # Exact nickname matches, served by idx_pc_nickname
+            if species_ids:
+                placeholders = ", ".join(["%s"] * len(species_ids))
+                branch(f"AND p.nickname = %s AND p.species_id NOT IN ({placeholders})",
+                       [filters['name']] + sorted(species_ids))
+            else:
+                branch("AND p.nickname = %s", [filters['name']])
+        
+        if not branches:
+            return [], None
+        
+        # The outer ORDER BY is what guarantees the order (and so the cursor), even for one branch
+        query = " UNION ALL ".join(branches)
+        query = f"SELECT * FROM ({query}) pc ORDER BY caught_at DESC, id DESC LIMIT {limit}"
+        
+        rows = self.db.execute_query(query, tuple(params), fetch=True) or []
+        
+        next_cursor = None
+        if len(rows) > self.page_size:
+            rows = rows[:self.page_size]
+            next_cursor = (rows[-1]['caught_at'], rows[-1]['id'])
+        return rows, next_cursor
+
+class WildSpawner:
+    """Spawns wild encounters into each guild's spawn channel.
+    
+    Sampling is two alias-table draws: a rarity from the guild's weights,
+    then a base-form species of that rarity. Guilds with the same weights
+    share one table, and spawn channels are held in memory, so a tick over
+    thousands of guilds costs no queries until someone catches something.
+    """
+    
+    CATCH_RATES = {'COMMON': 0.8, 'UNCOMMON': 0.5, 'RARE': 0.3, 'LEGENDARY': 0.05}
+    
+    def __init__(self, db: DatabaseManager, catalog: SpeciesCatalog, moves: MoveCatalog,
+                 outbound: 'OutboundScheduler', get_channel: Callable[[int], Any] = None):
+        self.db = db
+        self.catalog = catalog
+        self.moves = moves
+        self.outbound = outbound
+        self.get_channel = get_channel
+        self.species_tables: Dict[str, AliasTable] = {}  # rarity -> base forms
+        self.rarity_tables: Dict[Tuple, AliasTable] = {}  # weight signature -> rarities
+        self.guilds: Dict[str, Tuple[str, Tuple]] = {}  # server_id -> (channel_id, weight signature)
+        self.encounters: Dict[str, Dict] = {}  # channel_id -> live encounter
+        self.spawner = None
+        self.spawned = 0
+    
+    def species_table(self, rarity: str) -> Optional[AliasTable]:
+        if rarity not in self.species_tables:
+            ids = self.catalog.base_form_ids(rarity)
+            if not ids:
+                return None
+            self.species_tables[rarity] = AliasTable(ids, [1] * len(ids))
+        return self.species_tables[rarity]
+    
+    @staticmethod
+    def signature(weights: Optional[Dict[str, int]]) -> Tuple:
+        weights = weights or WILD_RARITY_WEIGHTS
+        return tuple(sorted((rarity, weight) for rarity, weight in weights.items() if weight > 0))
+    
+    def rarity_table(self, signature: Tuple) -> Optional[AliasTable]:
+        if signature not in self.rarity_tables:
+            # Rarities without any species in the catalog can't be drawn
+            usable = [(rarity, weight) for rarity, weight in signature if self.species_table(rarity)]
+            if not usable:
+                return None
+            self.rarity_tables[signature] = AliasTable([r for r, _ in usable], [w for _, w in usable])
+        return self.rarity_tables[signature]
+    
+    def sample_species(self, rarity: str = None, signature: Tuple = None) -> Optional[int]:
+        """Draw a base-form species, from one rarity or across a weight signature"""
+        if rarity is None:
+            table = self.rarity_table(signature or self.signature(None))
+            if not table:
+                return None
+            rarity = table.sample()
+        table = self.species_table(rarity)
+        return table.sample() if table else None
+    
+    def load_guilds(self):
+        """Read every guild's spawn settings in one query"""
+        rows = self.db.execute_query(
+            "SELECT id, spawn_channel_id, spawn_weights FROM servers WHERE spawn_channel_id IS NOT NULL",
+            fetch=True
+        ) or []
+        for row in rows:
+            weights = row['spawn_weights']
+            if isinstance(weights, str):
+                weights = json.loads(weights)
+            self.guilds[row['id']] = (row['spawn_channel_id'], self.signature(weights))
+    
+    def configure(self, server_id: str, channel_id: Optional[str], weights: Optional[Dict[str, int]] = None):
+        self.db.execute_query(
+            "UPDATE servers SET spawn_channel_id = %s, spawn_weights = %s WHERE id = %s",
+            (channel_id, json.dumps(weights) if weights else None, server_id)
+        )
+        if channel_id:
+            self.guilds[server_id] = (channel_id, self.signature(weights))
+        else:
+            self.guilds.pop(server_id, None)
+    
+    def tick(self) -> int:
+        """Spawn one encounter per enabled guild whose channel this process can see"""
+        targets = []
+        for server_id, (channel_id, signature) in self.guilds.items():
+            channel = self.get_channel(int(channel_id)) if self.get_channel else None
+            if channel:
+                targets.append((channel, signature))
+        if not targets:
+            return 0
+        
+        expires_at = datetime.now() + timedelta(seconds=WILD_ENCOUNTER_TIMEOUT)
+        all_ivs = IVGenerator.generate_common_ivs_batch(len(targets))
+        spawned = 0
+        for (channel, signature), ivs in zip(targets, all_ivs):
+            species_id = self.sample_species(signature=signature)
+            if species_id is None:
+                continue
+            species = self.catalog.get(species_id)
+            level = random.randint(*WILD_LEVEL_RANGE)
+            self.encounters[str(channel.id)] = {
+                'species_id': species_id, 'level': level, 'ivs': ivs, 'expires_at': expires_at
+            }
+            
+            type_emoji = TypeEffectiveness.TYPE_EMOJIS.get(species['type1'], '❓')
+            self.outbound.enqueue(channel, discord.Embed(
+                title=f"🌿 A wild {species['name']} appeared!",
+                description=f"{type_emoji} Lv.{level} • Use `/mkp-catch` to throw a Pokeball!",
+                color=0x27ae60
+            ))
+            spawned += 1
+        
+        self.spawned += spawned
+        return spawned
+    
+    def claim(self, channel_id: str) -> Optional[Dict]:
+        """Take the channel's encounter; only the first thrower gets it"""
+        encounter = self.encounters.pop(channel_id, None)
+        if encounter and encounter['expires_at'] < datetime.now():
+            return None
+        return encounter
+    
+    def catch(self, user_id: str, encounter: Dict) -> bool:
+        """Roll the catch and store the Pokemon in the trainer's PC on success"""
+        species = self.catalog.get(encounter['species_id'])
+        if random.random() >= self.CATCH_RATES.get(species['rarity'], 0.5):
+            return False
+        ivs = encounter['ivs']
+        pokemon_id = uuid7()
+        result = self.db.execute_query("""
+        INSERT INTO pokemon (
+            id, user_id, species_id, level, experience, is_starter, is_active,
+            hp_iv, attack_iv, defense_iv, sp_attack_iv, sp_defense_iv, speed_iv,
+            original_trainer, caught_location
+        ) VALUES (%s, %s, %s, %s, 0, FALSE, FALSE, %s, %s, %s, %s, %s, %s, %s, 'WILD')
+        """, (
+            uuid_to_bin(pokemon_id), user_id, encounter['species_id'], encounter['level'],
+            ivs['hp'], ivs['attack'], ivs['defense'], ivs['sp_attack'], ivs['sp_defense'], ivs['speed'],
+            user_id
+        ))
+        if result is None:
+            return False
+        self.moves.insert_movesets([(pokemon_id, encounter['species_id'], encounter['level'])])
+        return True
+    
+    def start(self):
+        if not self.spawner:
+            self.load_guilds()
+            self.spawner = asyncio.create_task(self._spawn_forever())
+    
+    async def stop(self):
+        if self.spawner:
+            self.spawner.cancel()
+            self.spawner = None
+    
+    async def _spawn_forever(self):
+        while True:
+            await asyncio.sleep(WILD_SPAWN_INTERVAL)
+            try:
+                self.tick()
+            except Exception as e:
+                print(f"❌ Wild spawn tick failed: {e}")
+
+class TimerWheel:
+    """Hierarchical timing wheel for the deadlines of every active battle.
+    
+    LEVELS wheels of 2**BITS slots: level 0 moves one slot per tick and each
+    level above spans 2**BITS times the one below. A timer is filed in the
+    coarsest level that can still tell its expiry apart from now, and is
+    cascaded down when that level's slot comes round. Scheduling, cancelling
+    and resetting are a dict insert/delete; a tick only touches the slot that
+    is due. One task drives the wheel instead of one sleeping task per timer.
+    """
+    
+    BITS = 6
+    LEVELS = 4  # 64 ticks, ~68 minutes, ~3 days, ~194 days at 1 s per tick
+    
+    def __init__(self, tick: float = None):
+        self.tick = tick or TIMER_TICK
+        self.mask = (1 << self.BITS) - 1
+        self.now = 0  # next tick to process
+        self.wheels = [[{} for _ in range(1 << self.BITS)] for _ in range(self.LEVELS)]
+        self.timers = {}  # key -> (level, slot, expires tick, callback)
+        self.fired = 0
+        self.driver = None
+    
+    def __len__(self):
+        return len(self.timers)
+    
+    def _file(self, key, expires: int, callback):
+        delay = expires - self.now
+        level = 0
+        while level < self.LEVELS - 1 and delay >= 1 << (self.BITS * (level + 1)):
+            level += 1
+        if delay >= 1 << (self.BITS * self.LEVELS):
+            # Beyond the top wheel: park at its far end and re-file on the way down
+            delay = (1 << (self.BITS * self.LEVELS)) - 1
+        slot = ((self.now + max(delay, 0)) >> (self.BITS * level)) & self.mask
+        self.wheels[level][slot][key] = expires
+        self.timers[key] = (level, slot, expires, callback)
+    
+    def schedule(self, key, delay: float, callback: Callable[[Any], Any]):
+        """Call callback(key) after delay seconds, replacing any timer with that key"""
+        self.cancel(key)
+        self._file(key, self.now + max(0, math.ceil(delay / self.tick)), callback)
+    
+    def reset(self, key, delay: float) -> bool:
+        """Push an existing timer's deadline to delay seconds from now"""
+        timer = self.timers.get(key)
+        if not timer:
+            return False
+        self.schedule(key, delay, timer[3])
+        return True
+    
+    def cancel(self, key) -> bool:
+        timer = self.timers.pop(key, None)
+        if not timer:
+            return False
+        del self.wheels[timer[0]][timer[1]][key]
+        return True
+    
+    def advance(self) -> List[Tuple[Any, Callable]]:
+        """Process one tick; returns the (key, callback) pairs that fell due"""
+        index = self.now & self.mask
+        level = 1
+        while index == 0 and level < self.LEVELS:
+            index = (self.now >> (self.BITS * level)) & self.mask
+            slot = self.wheels[level][index]
+            self.wheels[level][index] = {}
+            for key, expires in slot.items():
+                self._file(key, expires, self.timers[key][3])
+            level += 1
+        
+        slot = self.wheels[0][self.now & self.mask]
+        self.wheels[0][self.now & self.mask] = {}
+        self.now += 1
+        due = []
+        for key, expires in slot.items():
+            if expires >= self.now:
+                # Parked beyond the top wheel; still in the future
+                self._file(key, expires, self.timers[key][3])
+                continue
+            due.append((key, self.timers.pop(key)[3]))
+        self.fired += len(due)
+        return due
+    
+    def start(self):
+        if not self.driver:
+            self.driver = asyncio.create_task(self._drive_forever())
+    
+    async def stop(self):
+        if self.driver:
+            self.driver.cancel()
+            self.driver = None
+    
+    async def _drive_forever(self):
+        loop = asyncio.get_running_loop()
+        started = loop.time() - self.now * self.tick
+        while True:
+            # Catch up on ticks missed while the loop was busy
+            while self.now <= (loop.time() - started) / self.tick:
+                for key, callback in self.advance():
+                    try:
+                        result = callback(key)
+                        if inspect.isawaitable(result):
+                            await result
+                    except Exception as e:
+                        print(f"❌ Timer {key} failed: {e}")
+            await asyncio.sleep(started + self.now * self.tick - loop.time())
+
+class BattleHistory:
+    """Per-trainer battle index: one user_battles row per participant.
+    
+    Keyed (user_id, started_at DESC, battle_id), so "last N battles" is a
+    single index range instead of an OR across player1_id/player2_id, and a
+    second index on (user_id, opponent_id, started_at) answers head-to-head
+    questions. Rows are written when a battle is created and updated when it
+    finishes; they are never archived, so history covers archived battles too.
+    """
+    
+    def __init__(self, db: DatabaseManager):
+        self.db = db
+    
+    def record_created(self, battles: List[Tuple[str, str, Optional[str], datetime]]):
+        """Index new battles: [(battle_id, player1_id, player2_id, started_at)]"""
+        rows = []
+        for battle_id, player1_id, player2_id, started_at in battles:
+            battle_key = uuid_to_bin(battle_id)
+            rows.append((player1_id, started_at, battle_key, player2_id))
+            if player2_id:
+                rows.append((player2_id, started_at, battle_key, player1_id))
+        if not rows:
+            return
+        values = ", ".join(["(%s, %s, %s, %s, 'LOBBY')"] * len(rows))
+        self.db.execute_query(f"""
+        INSERT INTO user_battles (user_id, started_at, battle_id, opponent_id, status)
+        VALUES {values}
+        """, tuple(value for row in rows for value in row))
+    
+    def record_finished(self, battle_id: str, status: str, winner_id: Optional[str]):
+        """Set the outcome on both participants' rows (W/L, NULL without a winner)"""
+        self.db.execute_query("""
+        UPDATE user_battles
+        SET status = %s, result = CASE WHEN %s IS NULL THEN NULL WHEN user_id = %s THEN 'W' ELSE 'L' END
+        WHERE battle_id = %s
+        """, (status, winner_id, winner_id, uuid_to_bin(battle_id)))
+    
+    def recent(self, user_id: str, limit: int = 5, opponent_id: str = None) -> List[Dict]:
+        """A trainer's latest battles, optionally only those against one opponent"""
+        if opponent_id:
+            return self.db.execute_query("""
+            SELECT battle_id, opponent_id, status, result, started_at FROM user_battles
+            WHERE user_id = %s AND opponent_id = %s
+            ORDER BY started_at DESC
+            LIMIT %s
+            """, (user_id, opponent_id, limit), fetch=True) or []
+        return self.db.execute_query("""
+        SELECT battle_id, opponent_id, status, result, started_at FROM user_battles
+        WHERE user_id = %s
+        ORDER BY started_at DESC
+        LIMIT %s
+        """, (user_id, limit), fetch=True) or []
+    
+    def record(self, user_id: str, opponent_id: str = None) -> Dict[str, int]:
+        """Win/loss counts overall or against one opponent"""
+        if opponent_id:
+            rows = self.db.execute_query("""
+            SELECT result, COUNT(*) AS battles FROM user_battles
+            WHERE user_id = %s AND opponent_id = %s
+            GROUP BY result
+            """, (user_id, opponent_id), fetch=True) or []
+        else:
+            rows = self.db.execute_query("""
+            SELECT result, COUNT(*) AS battles FROM user_battles
+            WHERE user_id = %s
+            GROUP BY result
+            """, (user_id,), fetch=True) or []
+        counts = {row['result']: row['battles'] for row in rows}
+        return {'wins': counts.get('W', 0), 'losses': counts.get('L', 0),
+                'battles': sum(counts.values())}
+
+class BattleManager:
+    """Manages battle sessions and state.
+    
+    Every trainer in a battle has a TURN_TIMEOUT clock, reset whenever they
+    act; when it runs out an automatic move is made for them, and after
+    TURN_MISS_LIMIT automatic moves in a row they forfeit. The whole battle
+    ends after BATTLE_TIMEOUT minutes. All deadlines live in one TimerWheel.
+    """
+    
+    def __init__(self, db: DatabaseManager, process_index: int = 0, process_count: int = 1):
+        self.db = db
+        self.active_battles = {}  # In-memory battle state storage
+        self.moves = MoveCatalog(db)
+        self.history = BattleHistory(db)
+        self.timers = TimerWheel()
+        
+        # In multi-process mode each battle lives in exactly one process, picked by its ID
+        self.process_index = process_index
+        self.process_count = process_count
+        
+        # Subscribers to battle lifecycle events: callback(event_type, battle)
+        self.listeners = []
+        
+        # user_id -> battle_id for every trainer in a local battle
+        self.players_in_battle = {}
+    
+    def battle_for(self, user_id: str) -> Optional[str]:
+        """The battle a trainer is currently in, if any, on this or another shard process"""
+        battle_id = self.players_in_battle.get(user_id)
+        if battle_id or self.process_count == 1:
+            return battle_id
+        # Other processes' battles are only visible through the shared history index
+        row = self.db.execute_fetchone("""
+        SELECT battle_id FROM user_battles
+        WHERE user_id = %s AND started_at > %s AND status IN ('LOBBY', 'ACTIVE')
+        ORDER BY started_at DESC LIMIT 1
+        """, (user_id, datetime.now() - timedelta(minutes=BATTLE_TIMEOUT)))
+        return row['battle_id'] if row else None
+    
+    def add_listener(self, callback: Callable[[str, Dict], Any]):
+        self.listeners.append(callback)
+    
+    async def emit(self, event_type: str, battle: Dict):
+        for listener in self.listeners:
+            try:
+                result = listener(event_type, battle)
+                if asyncio.iscoroutine(result):
+                    await result
+            except Exception as e:
+                print(f"❌ Battle listener failed on {event_type}: {e}")
+    
+    def owner_of(self, battle_id: str) -> int:
+        """Index of the process that holds a battle's in-memory state"""
+        return zlib.crc32(battle_id.encode()) % self.process_count
+    
+    def is_local(self, battle_id: str) -> bool:
+        return self.owner_of(battle_id) == self.process_index
+    
+    def new_battle_id(self) -> str:
+        """Generate a battle ID that routes back to this process"""
+        while True:
+            battle_id = uuid7()
+            if self.is_local(battle_id):
+                return battle_id
+    
+    async def create_battle_session(self, player1_id: str, player2_id: str = None, 
+                                  server_id: str = None) -> str:
+        """Create a new battle session"""
+        battle_id = (await self.create_battle_sessions([(player1_id, player2_id)], server_id))[0]
+        print(f"Created battle session: {battle_id}")
+        return battle_id
+    
+    async def create_battle_sessions(self, pairs: List[Tuple[str, Optional[str]]],
+                                     server_id: str = None) -> List[str]:
+        """Create battle sessions with their team snapshots (e.g. a whole tournament round).
+        
+        Every team is read in one query and written as a compact snapshot to
+        battle_participants in one insert; battle state is hydrated from the
+        same snapshots so the engine and the record always agree.
+        """
+        if not pairs:
+            return []
+        
+        battle_ids = [self.new_battle_id() for _ in pairs]
+        started_at = datetime.now()
+        values = ", ".join(["(%s, %s, %s, %s, %s)"] * len(pairs))
+        params = []
+        for battle_id, (player1_id, player2_id) in zip(battle_ids, pairs):
+            params += [uuid_to_bin(battle_id), player1_id, player2_id, 'LOBBY', started_at]
+        self.db.execute_query(f"""
+        INSERT INTO battles (id, player1_id, player2_id, status, started_at)
+        VALUES {values}
+        """, tuple(params))
+        self.history.record_created([(battle_id, player1_id, player2_id, started_at)
+                                     for battle_id, (player1_id, player2_id) in zip(battle_ids, pairs)])
+        
+        players = list(dict.fromkeys(player for pair in pairs for player in pair if player))
+        teams = self.load_teams(players, with_moves=True)
+        snapshots = {player: self.snapshot_team(teams[player]) for player in players}
+        
+        participants = []
+        for battle_id, pair in zip(battle_ids, pairs):
+            participants += [(uuid_to_bin(battle_id), player, snapshots[player]) for player in pair if player]
+        values = ", ".join(["(%s, %s, %s)"] * len(participants))
+        self.db.execute_query(f"""
+        INSERT INTO battle_participants (battle_id, user_id, team_data)
+        VALUES {values}
+        """, tuple(value for participant in participants for value in participant))
+        
+        for battle_id, (player1_id, player2_id) in zip(battle_ids, pairs):
+            battle_teams = {player: self.hydrate_team(snapshots[player])
+                            for player in (player1_id, player2_id) if player}
+            self.track_battle(battle_id, player1_id, player2_id, server_id, battle_teams)
+        
+        if len(battle_ids) > 1:
+            print(f"Created {len(battle_ids)} battle sessions")
+        return battle_ids
+    
+    def track_battle(self, battle_id: str, player1_id: str, player2_id: str = None,
+                     server_id: str = None, teams: Dict[str, List[Dict]] = None):
+        """Hold the in-memory state for a battle whose row already exists"""
+        self.active_battles[battle_id] = {
+            'id': battle_id,
+            'player1_id': player1_id,
+            'player2_id': player2_id,
+            'server_id': server_id,
+            'status': 'LOBBY',
+            'turn': 1,
+            'created_at': datetime.now().isoformat(),
+            'teams': teams or {},
+            'performance': {player: {'damage': 0, 'kos': 0}
+                            for player in (player1_id, player2_id) if player},
+            'pp_spent': {},  # "pokemon_id:slot" -> PP the trainer spent, written back at the end
+            'missed_turns': {player: 0 for player in (player1_id, player2_id) if player}
+        }
+        self.players_in_battle[player1_id] = battle_id
+        if player2_id:
+            self.players_in_battle[player2_id] = battle_id
+        
+        # Turn clocks start with the first submitted move (see use_move); until then only
+        # the battle limit applies, and it ends the battle with no winner
+        self.timers.schedule((battle_id, None), BATTLE_TIMEOUT * 60, self._battle_expired)
+    
+    async def finish_battle(self, battle_id: str, winner_id: str = None,
+                            status: str = 'COMPLETED') -> Optional[Dict]:
+        """Close a battle, record the outcome and notify listeners"""
+        battle = self.active_battles.pop(battle_id, None)
+        if not battle:
+            return None
+        for player_id in (battle['player1_id'], battle['player2_id']):
+            if self.players_in_battle.get(player_id) == battle_id:
+                del self.players_in_battle[player_id]
+            self.timers.cancel((battle_id, player_id))
+        self.timers.cancel((battle_id, None))
+        
+        battle.update({'status': status, 'winner_id': winner_id, 'ended_at': datetime.now()})
+        self.db.execute_query("""
+        UPDATE battles SET status = %s, winner_id = %s, ended_at = %s, turn_count = %s
+        WHERE id = %s
+        """, (status, winner_id, battle['ended_at'], battle['turn'], uuid_to_bin(battle_id)))
+        self.history.record_finished(battle_id, status, winner_id)
+        
+        self._write_back_pp(battle)
+        
+        # Both participants' performance in one statement
+        performance = battle.get('performance') or {}
+        if performance:
+            cases = " ".join(["WHEN %s THEN %s"] * len(performance))
+            params = []
+            for player, stats in performance.items():
+                params += [player, json.dumps(stats, separators=(',', ':'))]
+            self.db.execute_query(f"""
+            UPDATE battle_participants SET performance_data = CASE user_id {cases} END
+            WHERE battle_id = %s
+            """, tuple(params + [uuid_to_bin(battle_id)]))
+        
+        await self.emit('battle_completed', battle)
+        return battle
+    
+    # Columns needed to build a team member, shared with ContextLoader's bootstrap query
+    TEAM_COLUMNS = """
+        p.id, p.nickname, p.level, p.experience, p.is_starter, p.team_slot,
+        p.current_hp, p.status_condition, p.updated_at,
+        p.hp_iv, p.attack_iv, p.defense_iv, p.sp_attack_iv, p.sp_defense_iv, p.speed_iv,
+        s.name as species_name, s.type1, s.type2,
+        s.base_hp, s.base_attack, s.base_defense, s.base_sp_attack, s.base_sp_defense, s.base_speed
+    """
+    
+    async def get_user_team(self, user_id: str) -> List[Dict]:
+        """Get user's active Pokemon team with calculated stats and movesets"""
+        return self.load_teams([user_id], with_moves=True)[user_id]
+    
+    def load_teams(self, user_ids: List[str], with_moves: bool = False) -> Dict[str, List[Dict]]:
+        """Active teams for several trainers in one query (plus one for all their moves)"""
+        teams = {user_id: [] for user_id in user_ids}
+        if not user_ids:
+            return teams
+        placeholders = ", ".join(["%s"] * len(user_ids))
+        team_query = f"""
+        SELECT {self.TEAM_COLUMNS}, p.user_id
+        FROM pokemon p
+        JOIN pokemon_species s ON p.species_id = s.id
+        WHERE p.user_id IN ({placeholders}) AND p.is_active = TRUE
+        ORDER BY p.user_id, p.team_slot
+        """
+        team_data = self.db.execute_query(team_query, tuple(user_ids), fetch=True) or []
+        for pokemon in team_data:
+            teams[pokemon['user_id']].append(self.build_team_member(pokemon))
+        
+        if with_moves:
+            self.moves.attach([member for team in teams.values() for member in team])
+        return teams
+    
+    # Field order of a snapshot entry; then stats as a list in STAT_ORDER,
+    # then moves as [slot, move_id, pp, max_pp] (resolved against the move catalog)
+    SNAPSHOT_FIELDS = ('id', 'species', 'nickname', 'level', 'type1', 'type2', 'current_hp', 'max_hp', 'status')
+    STAT_ORDER = ('hp', 'attack', 'defense', 'sp_attack', 'sp_defense', 'speed')
+    SNAPSHOT_VERSION = 2
+    
+    @classmethod
+    def snapshot_team(cls, team: List[Dict]) -> str:
+        """Serialize a team as positional arrays (no repeated keys)"""
+        entries = [
+            [member[name] for name in cls.SNAPSHOT_FIELDS]
+            + [[member['stats'][stat] for stat in cls.STAT_ORDER]]
+            + [[[move['slot'], move['move_id'], move['pp'], move['max_pp']] for move in member.get('moves', [])]]
+            for member in team
+        ]
+        return json.dumps({'v': cls.SNAPSHOT_VERSION, 'team': entries}, separators=(',', ':'))
+    
+    def hydrate_team(self, snapshot) -> List[Dict]:
+        """Rebuild battle-ready team entries from a snapshot"""
+        if isinstance(snapshot, str):
+            snapshot = json.loads(snapshot)
+        stats_at = len(self.SNAPSHOT_FIELDS)
+        team = []
+        for entry in snapshot['team']:
+            member = dict(zip(self.SNAPSHOT_FIELDS, entry))
+            member['stats'] = dict(zip(self.STAT_ORDER, entry[stats_at]))
+            # Version 1 snapshots carried no moves
+            moves = entry[stats_at + 1] if len(entry) > stats_at + 1 else []
+            member['moves'] = [self.moves.battle_move(move_id, slot, pp, max_pp)
+                               for slot, move_id, pp, max_pp in moves]
+            team.append(member)
+        return team
+    
+    def use_move(self, battle_id: str, user_id: str, pokemon_id: str, slot: int,
+                 automatic: bool = False) -> Optional[Dict]:
+        """Spend one PP of a move in memory; None if the move can't be used"""
+        battle = self.active_battles.get(battle_id)
+        if not battle:
+            return None
+        for member in battle['teams'].get(user_id, []):
+            if member['id'] != pokemon_id:
+                continue
+            for move in member['moves']:
+                if move['slot'] == slot and move['pp'] > 0:
+                    move['pp'] -= 1
+                    if not automatic:
+                        # Only the trainer's own moves cost real PP, not ones made for them on timeout
+                        key = f"{pokemon_id}:{slot}"
+                        battle['pp_spent'][key] = battle['pp_spent'].get(key, 0) + 1
+                        self._start_turn_clocks(battle)
+                        # The trainer is here: their turn clock starts over
+                        battle['missed_turns'][user_id] = 0
+                        self.timers.reset((battle_id, user_id), TURN_TIMEOUT)
+                    return move
+        return None
+    
+    def _start_turn_clocks(self, battle: Dict):
+        """Once moves are being submitted, every trainer in the battle is on the clock"""
+        if battle['status'] == 'ACTIVE':
+            return
+        battle['status'] = 'ACTIVE'
+        for player in battle['missed_turns']:
+            self.timers.schedule((battle['id'], player), TURN_TIMEOUT, self._turn_expired)
+    
+    async def _turn_expired(self, key: Tuple[str, str]):
+        """A trainer let their turn clock run out: move for them, or forfeit them"""
+        battle_id, user_id = key
+        battle = self.active_battles.get(battle_id)
+        if not battle:
+            return
+        battle['missed_turns'][user_id] += 1
+        if battle['missed_turns'][user_id] >= TURN_MISS_LIMIT:
+            opponent_id = battle['player2_id'] if user_id == battle['player1_id'] else battle['player1_id']
+            print(f"⏱️ {user_id} forfeits battle {battle_id} after {TURN_MISS_LIMIT} missed turns")
+            await self.finish_battle(battle_id, opponent_id, 'FORFEIT' if opponent_id else 'ABANDONED')
+            return
+        
+        # First usable move of the first Pokemon still standing
+        for member in battle['teams'].get(user_id, []):
+            if member['current_hp'] <= 0:
+                continue
+            move = next((move for move in member['moves'] if move['pp'] > 0), None)
+            if move:
+                self.use_move(battle_id, user_id, member['id'], move['slot'], automatic=True)
+            break
+        self.timers.schedule(key, TURN_TIMEOUT, self._turn_expired)
+    
+    async def _battle_expired(self, key: Tuple[str, None]):
+        battle_id, _ = key
+        if battle_id in self.active_battles:
+            print(f"⏱️ Battle {battle_id} hit the {BATTLE_TIMEOUT} minute limit")
+            await self.finish_battle(battle_id, None, 'TIMEOUT')
+    
+    def _write_back_pp(self, battle: Dict):
+        """Persist the PP trainers spent during the battle in one update"""
+        spent = battle.get('pp_spent')
+        if not spent:
+            return
+        cases = []
+        params = []
+        pokemon_ids = []
+        for key, used in spent.items():
+            pokemon_id, slot = key.rsplit(':', 1)
+            cases.append("WHEN pokemon_id = %s AND slot = %s THEN GREATEST(current_pp - %s, 0)")
+            pokemon_key = uuid_to_bin(pokemon_id)
+            params += [pokemon_key, int(slot), used]
+            if pokemon_key not in pokemon_ids:
+                pokemon_ids.append(pokemon_key)
+        placeholders = ", ".join(["%s"] * len(pokemon_ids))
+        self.db.execute_query(f"""
+        UPDATE pokemon_moves SET current_pp = CASE {' '.join(cases)} ELSE current_pp END
+        WHERE pokemon_id IN ({placeholders})
+        """, tuple(params + pokemon_ids))
+    
+    def load_snapshots(self, battle_ids: List[str]) -> Dict[str, Dict[str, List[Dict]]]:
+        """Teams for battles that are not in memory (e.g. after a restart), in one query"""
+        battles = {battle_id: {} for battle_id in battle_ids}
+        if not battle_ids:
+            return battles
+        placeholders = ", ".join(["%s"] * len(battle_ids))
+        rows = self.db.execute_query(f"""
+        SELECT battle_id, user_id, team_data FROM battle_participants
+        WHERE battle_id IN ({placeholders})
+        """, tuple(uuid_to_bin(battle_id) for battle_id in battle_ids), fetch=True) or []
+        for row in rows:
+            battles[row['battle_id']][row['user_id']] = self.hydrate_team(row['team_data'])
+        return battles
+    
+    def record_hit(self, battle_id: str, attacker_id: str, damage: int, knocked_out: bool = False):
+        """Tally damage and KOs for a participant; written once when the battle ends"""
+        battle = self.active_battles.get(battle_id)
+        if not battle or attacker_id not in battle['performance']:
+            return
+        stats = battle['performance'][attacker_id]
+        stats['damage'] += damage
+        if knocked_out:
+            stats['kos'] += 1
+    
+    @staticmethod
+    def build_team_member(pokemon: Dict) -> Dict:
+        """Turn a TEAM_COLUMNS row into a team entry with calculated stats"""
+        base_stats = {
+            'hp': pokemon['base_hp'],
+            'attack': pokemon['base_attack'],
+            'defense': pokemon['base_defense'],
+            'sp_attack': pokemon['base_sp_attack'],
+            'sp_defense': pokemon['base_sp_defense'],
+            'speed': pokemon['base_speed']
+        }
+        
+        ivs = {
+            'hp': pokemon['hp_iv'],
+            'attack': pokemon['attack_iv'],
+            'defense': pokemon['defense_iv'],
+            'sp_attack': pokemon['sp_attack_iv'],
+            'sp_defense': pokemon['sp_defense_iv'],
+            'speed': pokemon['speed_iv']
+        }
+        
+        final_stats = IVGenerator.calculate_stats(base_stats, ivs, pokemon['level'])
+        
+        # Passive healing since the row was last written
+        current_hp, hp_as_of = HPRegeneration.regenerate(
+            pokemon['current_hp'], final_stats['hp'], pokemon['updated_at']
+        )
+        
+        return {
+            'id': pokemon['id'],
+            'nickname': pokemon['nickname'] or pokemon['species_name'],
+            'species': pokemon['species_name'],
+            'level': pokemon['level'],
+            'experience': pokemon['experience'],
+            'is_starter': pokemon['is_starter'],
+            'team_slot': pokemon['team_slot'],
+            'type1': pokemon['type1'],
+            'type2': pokemon['type2'],
+            'current_hp': current_hp,
+            'max_hp': final_stats['hp'],
+            'hp_as_of': hp_as_of,  # what updated_at must become when current_hp is written back
+            'stats': final_stats,
+            'status': pokemon['status_condition'],
+            'ivs': ivs
+        }
+
+class BattleArchive:
+    """Moves finished battles out of the hot battles table.
+    
+    Battles that ended more than ARCHIVE_AFTER_DAYS ago are copied into
+    battle_archive (partitioned by start month on MySQL) with their logs and
+    participant snapshots zlib-compressed, then deleted from battles, which
+    cascades to battle_participants. Each chunk of ARCHIVE_CHUNK_SIZE battles
+    is its own short transaction, with a pause in between so gameplay writes
+    never wait long. Lookups check the hot table first, then the archive.
+    """
+    
+    COLUMNS = "id, player1_id, player2_id, winner_id, battle_format, battle_type, turn_count, weather, status, started_at, ended_at"
+    
+    def __init__(self, db: DatabaseManager):
+        self.db = db
+        self.archiver = None
+        self.archived = 0  # battles moved since startup
+    
+    @staticmethod
+    def compress(text: Optional[str]) -> Optional[bytes]:
+        return zlib.compress(text.encode('utf-8'), 6) if text is not None else None
+    
+    @staticmethod
+    def decompress(blob) -> Optional[str]:
+        return zlib.decompress(blob).decode('utf-8') if blob is not None else None
+    
+    def ensure_partitions(self, cutoff: datetime):
+        """Split p_future so every month up to the cutoff has its own partition"""
+        if not self.db.backend.partitions:
+            return
+        oldest = self.db.execute_fetchone(
+            "SELECT MIN(started_at) AS started_at FROM battles WHERE ended_at < %s", (cutoff,)
+        )
+        if not oldest or not oldest['started_at']:
+            return
+        rows = self.db.execute_query("""
+        SELECT PARTITION_NAME AS name FROM information_schema.PARTITIONS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'battle_archive'
+        """, fetch=True) or []
+        # Months up to the newest monthly partition are covered by the existing ones
+        newest = max((row['name'] for row in rows if row['name'] != 'p_future'), default='')
+        
+        month = oldest['started_at'].replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        new = []
+        while month <= cutoff:
+            following = (month + timedelta(days=32)).replace(day=1)
+            name = f"p{month:%Y%m}"
+            if name > newest:
+                new.append(f"PARTITION {name} VALUES LESS THAN ('{following:%Y-%m-%d}')")
+            month = following
+        if new:
+            self.db.execute_query(f"""
+            ALTER TABLE battle_archive REORGANIZE PARTITION p_future INTO (
+                {', '.join(new)}, PARTITION p_future VALUES LESS THAN (MAXVALUE)
+            )
+            """)
+    
+    def archive_chunk(self, cutoff: datetime) -> int:
+        """Move up to ARCHIVE_CHUNK_SIZE finished battles in one transaction"""
+        with self.db.transaction():
+            battles = self.db.execute_query(f"""
+            SELECT {self.COLUMNS}, battle_data, spectator_data FROM battles
+            WHERE ended_at < %s
+            ORDER BY ended_at
+            LIMIT %s
+            FOR UPDATE SKIP LOCKED
+            """, (cutoff, ARCHIVE_CHUNK_SIZE), fetch=True) or []
+            if not battles:
+                return 0
+            battle_keys = tuple(uuid_to_bin(battle['id']) for battle in battles)
+            placeholders = ", ".join(["%s"] * len(battle_keys))
+            rows = self.db.execute_query(f"""
+            SELECT battle_id, user_id, team_data, final_xp_gained, performance_data
+            FROM battle_participants WHERE battle_id IN ({placeholders})
+            """, battle_keys, fetch=True) or []
+            participants = {}
+            for row in rows:
+                participants.setdefault(row['battle_id'], {})[row['user_id']] = [
+                    row['team_data'], row['final_xp_gained'], row['performance_data']
+                ]
+            
+            values = ", ".join(["(%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)"] * len(battles))
+            params = []
+            for battle, battle_key in zip(battles, battle_keys):
+                params += [battle_key] + [battle[column] for column in self.COLUMNS.split(', ')[1:]]
+                params += [
+                    self.compress(json.dumps(participants.get(battle['id'], {}), separators=(',', ':'))),
+                    self.compress(battle['battle_data']),
+                    self.compress(battle['spectator_data']),
+                ]
+            self.db.execute_query(f"""
+            INSERT INTO battle_archive ({self.COLUMNS}, participants, battle_log, spectator_log)
+            VALUES {values}
+            """, tuple(params))
+            self.db.execute_query(f"DELETE FROM battles WHERE id IN ({placeholders})", battle_keys)
+        return len(battles)
+    
+    async def run(self) -> int:
+        """Archive everything past the threshold, one chunk at a time"""
+        cutoff = datetime.now() - timedelta(days=ARCHIVE_AFTER_DAYS)
+        self.ensure_partitions(cutoff)
+        moved = 0
+        while True:
+            try:
+                count = self.archive_chunk(cutoff)
+            except TransactionAborted:
+                print("❌ Battle archive chunk failed, retrying next run")
+                break
+            moved += count
+            if count < ARCHIVE_CHUNK_SIZE:
+                break
+            await asyncio.sleep(ARCHIVE_CHUNK_PAUSE)
+        if moved:
+            self.archived += moved
+            print(f"🗄️ Archived {moved} battle(s) older than {ARCHIVE_AFTER_DAYS} days")
+        return moved
+    
+    def find(self, battle_id: str) -> Optional[Dict]:
+        """A battle's record, decompressed if it has been archived"""
+        if not UUID_TEXT.fullmatch(battle_id):
+            return None
+        battle_key = uuid_to_bin(battle_id)
+        battle = self.db.execute_fetchone(f"SELECT {self.COLUMNS} FROM battles WHERE id = %s", (battle_key,))
+        if battle:
+            rows = self.db.execute_query("""
+            SELECT user_id, team_data, final_xp_gained, performance_data
+            FROM battle_participants WHERE battle_id = %s
+            """, (battle_key,), fetch=True) or []
+            battle['participants'] = {row['user_id']: [row['team_data'], row['final_xp_gained'], row['performance_data']]
+                                      for row in rows}
+            battle['archived'] = False
+            return battle
+        
+        battle = self.db.execute_fetchone(
+            f"SELECT {self.COLUMNS}, participants FROM battle_archive WHERE id = %s", (battle_key,)
+        )
+        if battle:
+            battle['participants'] = json.loads(self.decompress(battle['participants']))
+            battle['archived'] = True
+        return battle
+    
+    def replay(self, battle_id: str) -> Optional[Dict]:
+        """The battle and spectator logs, wherever the battle is stored"""
+        if not UUID_TEXT.fullmatch(battle_id):
+            return None
+        battle_key = uuid_to_bin(battle_id)
+        row = self.db.execute_fetchone(
+            "SELECT battle_data, spectator_data FROM battles WHERE id = %s", (battle_key,)
+        )
+        if not row:
+            row = self.db.execute_fetchone(
+                "SELECT battle_log, spectator_log FROM battle_archive WHERE id = %s", (battle_key,)
+            )
+            if not row:
+                return None
+            row = {'battle_data': self.decompress(row['battle_log']),
+                   'spectator_data': self.decompress(row['spectator_log'])}
+        return {key: json.loads(value) if value else None for key, value in row.items()}
+    
+    def start(self):
+        if not self.archiver:
+            self.archiver = asyncio.create_task(self._archive_forever())
+    
+    async def stop(self):
+        if self.archiver:
+            self.archiver.cancel()
+            self.archiver = None
+    
+    async def _archive_forever(self):
+        while True:
+            await asyncio.sleep(ARCHIVE_INTERVAL)
+            try:
+                await self.run()
+            except Exception as e:
+                print(f"❌ Battle archive run failed: {e}")
+
+@dataclass
+class BracketMatch:
+    """One game in a tournament, fed by seeds or by the winner/loser of earlier games"""
+    round: int
+    sources: List[Optional[Tuple[str, int]]]  # ('seed', index), ('win', match), ('lose', match) or None
+    players: List[Optional[str]] = field(default_factory=lambda: [None, None])
+    resolved: int = 0  # Slots whose occupant is known (a bye counts as known)
+    result: str = '-'  # '-' pending, '1'/'2' winning slot, 'b' walkover
+    dependents: List[Tuple[int, int, str]] = field(default_factory=list)  # (match, slot, 'win'/'lose')
+    
+    @property
+    def winner(self) -> Optional[str]:
+        if self.result == '1':
+            return self.players[0]
+        if self.result == '2':
+            return self.players[1]
+        if self.result == 'b':
+            return self.players[0] if self.players[0] is not None else self.players[1]
+        return None
+    
+    @property
+    def loser(self) -> Optional[str]:
+        if self.result == '1':
+            return self.players[1]
+        if self.result == '2':
+            return self.players[0]
+        return None
+
+class Tournament:
+    """A bracket as a graph of matches.
+    
+    Each match knows which later matches consume its winner and loser, so a
+    result advances players immediately and hands back any matches that just
+    became playable; nothing waits for the rest of the round. The bracket is
+    rebuilt deterministically from the seeded player list, so persisting the
+    players and a one-character-per-match results string is enough to restore it.
+    """
+    
+    FORMATS = ('single', 'double', 'swiss')
+    
+    def __init__(self, tournament_id: str, server_id: str, channel_id: Optional[str], name: str,
+                 format: str, created_by: str, players: List[str] = None, status: str = 'OPEN'):
+        self.id = tournament_id
+        self.server_id = server_id
+        self.channel_id = channel_id
+        self.name = name
+        self.format = format
+        self.created_by = created_by
+        self.players = players or []
+        self.status = status
+        self.matches: List[BracketMatch] = []
+        self.battles: Dict[str, int] = {}  # Live battle ID -> match index
+        self.swiss_rounds = 0
+        self._ready: List[int] = []
+    
+    # ----- Construction -----
+    
+    def _add_match(self, round_number: int, sources: List) -> int:
+        index = len(self.matches)
+        self.matches.append(BracketMatch(round_number, sources))
+        for slot, source in enumerate(sources):
+            if source and source[0] in ('win', 'lose'):
+                self.matches[source[1]].dependents.append((index, slot, source[0]))
+        return index
+    
+    @staticmethod
+    def seed_order(size: int) -> List[int]:
+        """Standard bracket placement so top seeds meet as late as possible"""
+        order = [0]
+        while len(order) < size:
+            order = [seed for s in order for seed in (s, len(order) * 2 - 1 - s)]
+        return order
+    
+    def _build_winners_bracket(self) -> List[List[int]]:
+        size = 2
+        while size < len(self.players):
+            size *= 2
+        order = self.seed_order(size)
+        
+        rounds = [[self._add_match(1, [('seed', order[i]), ('seed', order[i + 1])])
+                   for i in range(0, size, 2)]]
+        while len(rounds[-1]) > 1:
+            previous = rounds[-1]
+            rounds.append([self._add_match(len(rounds) + 1, [('win', previous[i]), ('win', previous[i + 1])])
+                           for i in range(0, len(previous), 2)])
+        return rounds
+    
+    def _build_double_elimination(self):
+        winners = self._build_winners_bracket()
+        round_number = len(winners)
+        
+        def play(pairs):
+            nonlocal round_number
+            round_number += 1
+            return [('win', self._add_match(round_number, list(pair))) for pair in pairs]
+        
+        survivors = [('lose', match) for match in winners[0]]
+        if len(survivors) > 1:
+            survivors = play(zip(survivors[::2], survivors[1::2]))
+        for matches in winners[1:]:
+            # Drop the winners-bracket losers in reversed order to avoid immediate rematches
+            dropped = [('lose', match) for match in reversed(matches)]
+            survivors = play(zip(survivors, dropped))
+            if len(survivors) > 1:
+                survivors = play(zip(survivors[::2], survivors[1::2]))
+        
+        self._add_match(round_number + 1, [('win', winners[-1][0]), survivors[0]])
+    
+    def _pair_swiss_round(self):
+        """Pair the next Swiss round by score, avoiding rematches where possible"""
+        self.swiss_rounds += 1
+        scores = self.scores()
+        played = {frozenset(m.players) for m in self.matches}
+        had_bye = {m.winner for m in self.matches if m.result == 'b'}
+        
+        standing = sorted(range(len(self.players)), key=lambda i: (-scores[self.players[i]], i))
+        created = []
+        if len(standing) % 2:
+            bye = next((i for i in reversed(standing) if self.players[i] not in had_bye), standing[-1])
+            standing.remove(bye)
+            created.append(self._add_match(self.swiss_rounds, [('seed', bye), None]))
+        
+        while standing:
+            first = standing.pop(0)
+            partner = next((i for i in standing
+                            if frozenset((self.players[first], self.players[i])) not in played), standing[0])
+            standing.remove(partner)
+            created.append(self._add_match(self.swiss_rounds, [('seed', first), ('seed', partner)]))
+        self._resolve_seeds(created)
+    
+    def build(self) -> List[int]:
+        """Lay out the bracket and fill first-round slots; returns playable matches"""
+        self.matches = []
+        self.swiss_rounds = 0
+        self._ready = []
+        if self.format == 'swiss':
+            self._pair_swiss_round()
+        else:
+            if self.format == 'double':
+                self._build_double_elimination()
+            else:
+                self._build_winners_bracket()
+            self._resolve_seeds(range(len(self.matches)))
+        return self._take_ready()
+    
+    # ----- Advancement -----
+    
+    def _resolve_seeds(self, indices):
+        for index in indices:
+            for slot, source in enumerate(self.matches[index].sources):
+                if source is None:
+                    self._resolve(index, slot, None)
+                elif source[0] == 'seed':
+                    player = self.players[source[1]] if source[1] < len(self.players) else None
+                    self._resolve(index, slot, player)
+    
+    def _resolve(self, index: int, slot: int, player: Optional[str]):
+        match = self.matches[index]
+        match.players[slot] = player
+        match.resolved += 1
+        if match.resolved < 2:
+            return
+        if match.players[0] is not None and match.players[1] is not None:
+            self._ready.append(index)
+        else:
+            # Bye or empty branch: whoever is present walks over
+            self._complete(index, 'b')
+    
+    def _complete(self, index: int, result: str):
+        match = self.matches[index]
+        match.result = result
+        for dependent, slot, kind in match.dependents:
+            self._resolve(dependent, slot, match.winner if kind == 'win' else match.loser)
+        
+        if (self.format == 'swiss' and self.swiss_rounds < self.total_swiss_rounds()
+                and all(m.result != '-' for m in self.matches)):
+            self._pair_swiss_round()
+    
+    def _take_ready(self) -> List[int]:
+        ready, self._ready = self._ready, []
+        return ready
+    
+    def record(self, index: int, winner_id: Optional[str]) -> List[int]:
+        """Apply a finished match; returns the matches it made playable"""
+        match = self.matches[index]
+        if match.result != '-':
+            return []
+        # A battle that ended without a winner goes to the higher seed
+        self._complete(index, '2' if winner_id == match.players[1] else '1')
+        return self._take_ready()
+    
+    # ----- State -----
+    
+    def total_swiss_rounds(self) -> int:
+        return max(1, (len(self.players) - 1).bit_length())
+    
+    def scores(self) -> Dict[str, int]:
+        scores = {player: 0 for player in self.players}
+        for match in self.matches:
+            if match.winner is not None:
+                scores[match.winner] += 1
+        return scores
+    
+    def is_finished(self) -> bool:
+        return bool(self.matches) and all(m.result != '-' for m in self.matches)
+    
+    def champion(self) -> Optional[str]:
+        if not self.is_finished():
+            return None
+        if self.format == 'swiss':
+            scores = self.scores()
+            return min(self.players, key=lambda p: (-scores[p], self.players.index(p)))
+        return self.matches[-1].winner
+    
+    def encode_results(self) -> str:
+        return ''.join(match.result for match in self.matches)
+    
+    def restore(self, results: str) -> List[int]:
+        """Rebuild from persisted results; returns matches that are playable but unstarted"""
+        ready = set(self.build())
+        index = 0
+        while index < len(self.matches) and index < len(results):
+            if results[index] in '12' and self.matches[index].result == '-':
+                ready.discard(index)
+                slot = int(results[index]) - 1
+                ready.update(self.record(index, self.matches[index].players[slot]))
+            index += 1
+        return sorted(ready)
+
+class TournamentManager:
+    """Runs guild tournaments on top of BattleManager.
+    
+    Playable matches are launched together as battle sessions, and
+    BattleManager's completion events feed results straight back into the
+    bracket, so there is no polling regardless of bracket size.
+    """
+    
+    MIN_PLAYERS = 2
+    
+    def __init__(self, db: DatabaseManager, battle_manager: BattleManager, outbound: 'OutboundScheduler',
+                 get_channel: Callable[[int], Any] = None):
+        self.db = db
+        self.battle_manager = battle_manager
+        self.outbound = outbound
+        self.get_channel = get_channel
+        self.tournaments: Dict[str, Tournament] = {}
+        self.by_server: Dict[str, str] = {}  # server_id -> open or running tournament ID
+        self.by_battle: Dict[str, str] = {}  # battle_id -> tournament ID
+        battle_manager.add_listener(self.on_battle_event)
+    
+    def for_server(self, server_id: str) -> Optional[Tournament]:
+        tournament_id = self.by_server.get(server_id)
+        return self.tournaments.get(tournament_id) if tournament_id else None
+    
+    def create(self, server_id: str, channel_id: str, name: str, format: str,
+               created_by: str) -> Tournament:
+        tournament = Tournament(str(uuid.uuid4())[:8], server_id, channel_id, name, format, created_by)
+        self.tournaments[tournament.id] = tournament
+        self.by_server[server_id] = tournament.id
+        self.db.execute_query("""
+        INSERT INTO tournaments (id, server_id, channel_id, name, format, status, players, results, created_by)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+        """, (tournament.id, server_id, channel_id, name, format, 'OPEN', '[]', '', created_by))
+        return tournament
+    
+    def join(self, tournament: Tournament, user_id: str) -> bool:
+        if tournament.status != 'OPEN' or user_id in tournament.players:
+            return False
+        tournament.players.append(user_id)
+        self.db.execute_query(
+            "UPDATE tournaments SET players = %s WHERE id = %s",
+            (json.dumps(tournament.players), tournament.id)
+        )
+        return True
+    
+    async def start(self, tournament: Tournament) -> bool:
+        if tournament.status != 'OPEN' or len(tournament.players) < self.MIN_PLAYERS:
+            return False
+        random.shuffle(tournament.players)
+        tournament.status = 'RUNNING'
+        ready = tournament.build()
+        await self.launch(tournament, ready)
+        return True
+    
+    async def launch(self, tournament: Tournament, indices: List[int]):
+        """Start battles for every playable match at once and announce the pairings"""
+        if indices:
+            pairs = [tuple(tournament.matches[index].players) for index in indices]
+            battle_ids = await self.battle_manager.create_battle_sessions(pairs, tournament.server_id)
+            for battle_id, index in zip(battle_ids, indices):
+                tournament.battles[battle_id] = index
+                self.by_battle[battle_id] = tournament.id
+            self.announce_matches(tournament, indices)
+        
+        if tournament.is_finished():
+            self.finish(tournament)
+        self.save(tournament)
+    
+    def finish(self, tournament: Tournament):
+        tournament.status = 'COMPLETED'
+        if self.by_server.get(tournament.server_id) == tournament.id:
+            del self.by_server[tournament.server_id]
+        champion = tournament.champion()
+        print(f"🏆 Tournament {tournament.id} won by {champion}")
+        
+        channel = self.get_channel(int(tournament.channel_id)) if self.get_channel and tournament.channel_id else None
+        if channel:
+            self.outbound.enqueue(channel, discord.Embed(
+                title=f"🏆 {tournament.name} — Champion!",
+                description=f"<@{champion}> wins the tournament!",
+                color=0xf1c40f
+            ))
+    
+    def save(self, tournament: Tournament):
+        """Persist the compact state: seeded players, results string and live battles"""
+        self.db.execute_query("""
+        UPDATE tournaments SET status = %s, players = %s, results = %s, battle_map = %s, winner_id = %s
+        WHERE id = %s
+        """, (
+            tournament.status, json.dumps(tournament.players), tournament.encode_results(),
+            json.dumps(tournament.battles), tournament.champion(), tournament.id
+        ))
+    
+    async def on_battle_event(self, event_type: str, battle: Dict):
+        if event_type != 'battle_completed':
+            return
+        tournament_id = self.by_battle.pop(battle['id'], None)
+        tournament = self.tournaments.get(tournament_id)
+        if not tournament:
+            return
+        index = tournament.battles.pop(battle['id'])
+        await self.launch(tournament, tournament.record(index, battle.get('winner_id')))
+    
+    def announce_matches(self, tournament: Tournament, indices: List[int]):
+        channel = self.get_channel(int(tournament.channel_id)) if self.get_channel and tournament.channel_id else None
+        if not channel:
+            return
+        battle_of = {index: battle_id for battle_id, index in tournament.battles.items()}
+        lines = [
+            f"R{tournament.matches[index].round}: <@{tournament.matches[index].players[0]}> vs "
+            f"<@{tournament.matches[index].players[1]}> • `{battle_of[index]}`"
+            for index in indices
+        ]
+        # Keep each embed well inside the description limit
+        for start in range(0, len(lines), 40):
+            self.outbound.enqueue(channel, discord.Embed(
+                title=f"🏟️ {tournament.name} — Matches Ready",
+                description="\n".join(lines[start:start + 40]),
+                color=0xe67e22
+            ))
+    
+    def restore(self):
+        """Reload running tournaments and reattach their live battles"""
+        rows = self.db.execute_query(
+            "SELECT * FROM tournaments WHERE status IN ('OPEN', 'RUNNING')", fetch=True
+        ) or []
+        resumed = []
+        reattached = []
+        for row in rows:
+            if SHARD_MODE == 'process' and (int(row['server_id']) >> 22) % SHARD_COUNT != SHARD_ID:
+                continue
+            players = json.loads(row['players']) if isinstance(row['players'], str) else row['players']
+            tournament = Tournament(row['id'], row['server_id'], row['channel_id'], row['name'],
+                                    row['format'], row['created_by'], players, row['status'])
+            self.tournaments[tournament.id] = tournament
+            self.by_server[tournament.server_id] = tournament.id
+            if tournament.status != 'RUNNING':
+                continue
+            
+            ready = tournament.restore(row['results'] or '')
+            battle_map = row['battle_map'] or {}
+            if isinstance(battle_map, str):
+                battle_map = json.loads(battle_map)
+            for battle_id, index in battle_map.items():
+                if index in ready:
+                    ready.remove(index)
+                    match = tournament.matches[index]
+                    tournament.battles[battle_id] = index
+                    self.by_battle[battle_id] = tournament.id
+                    reattached.append((battle_id, match.players[0], match.players[1], tournament.server_id))
+            resumed.append((tournament, ready))
+        
+        snapshots = self.battle_manager.load_snapshots([battle[0] for battle in reattached])
+        for battle_id, player1_id, player2_id, server_id in reattached:
+            self.battle_manager.track_battle(battle_id, player1_id, player2_id, server_id, snapshots[battle_id])
+        return resumed
+
+class TradeManager:
+    """One-for-one Pokemon trades between trainers.
+    
+    Offers live in memory. Accepting one locks exactly the two Pokemon rows,
+    always in ID order and with NOWAIT, so two trades can never deadlock and
+    a contended row fails fast instead of queueing behind another trainer's
+    transaction. The ownership swap is a single CASE update in one transaction.
+    """
+    
+    def __init__(self, db: DatabaseManager, battle_manager: BattleManager, context_loader: 'ContextLoader',
+                 offer_timeout: int = TRADE_OFFER_TIMEOUT):
+        self.db = db
+        self.battle_manager = battle_manager
+        self.context_loader = context_loader
+        self.offer_timeout = offer_timeout
+        self.offers: Dict[str, Dict] = {}
+        self.offers_by_user: Dict[str, set] = {}  # user_id -> IDs of offers they are part of
+    
+    def find_pokemon(self, user_id: str, pokemon_ref: str) -> Tuple[Optional[Dict], str]:
+        """Resolve a Pokemon by its full ID or the short ID shown in /mkp-pc"""
+        pokemon_ref = pokemon_ref.strip().lstrip('#').lower()
+        columns = """
+        SELECT p.id, p.user_id, p.nickname, p.level, p.is_starter, p.is_active, s.name AS species_name
+        FROM pokemon p
+        JOIN pokemon_species s ON p.species_id = s.id
+        """
+        if UUID_TEXT.fullmatch(pokemon_ref):
+            rows = self.db.execute_query(columns + "WHERE p.user_id = %s AND p.id = %s",
+                                         (user_id, uuid_to_bin(pokemon_ref)), fetch=True)
+        elif re.fullmatch(r'[0-9a-f]{6,32}', pokemon_ref):
+            # Keys are binary, so a short ID is matched against the hex of the trainer's own rows
+            rows = self.db.execute_query(columns + """
+            WHERE p.user_id = %s AND LOWER(HEX(p.id)) LIKE %s
+            LIMIT 2
+            """, (user_id, '%' + pokemon_ref), fetch=True)
+        else:
+            rows = []
+        
+        if not rows:
+            return None, f"Couldn't find a Pokemon with ID `{pokemon_ref}`."
+        if len(rows) > 1:
+            return None, f"More than one Pokemon matches `{pokemon_ref}`; use more of its ID."
+        return rows[0], ""
+    
+    def offers_for(self, user_id: str) -> List[Dict]:
+        self._expire(user_id)
+        return [self.offers[offer_id] for offer_id in self.offers_by_user.get(user_id, ())]
+    
+    def _expire(self, user_id: str):
+        now = datetime.now()
+        for offer_id in list(self.offers_by_user.get(user_id, ())):
+            if self.offers[offer_id]['expires_at'] < now:
+                self.discard(offer_id)
+    
+    def discard(self, offer_id: str):
+        offer = self.offers.pop(offer_id, None)
+        if not offer:
+            return
+        for user_id in (offer['from_user'], offer['to_user']):
+            offers = self.offers_by_user.get(user_id)
+            if offers:
+                offers.discard(offer_id)
+                if not offers:
+                    del self.offers_by_user[user_id]
+    
+    def propose(self, from_user: str, to_user: str, offered: Dict, requested: Dict) -> Tuple[Optional[Dict], str]:
+        """Record an offer of `offered` (from_user's) for `requested` (to_user's)"""
+        if from_user == to_user:
+            return None, "You can't trade with yourself!"
+        if offered['is_starter'] or requested['is_starter']:
+            return None, "Starter Pokemon can't be traded."
+        if offered['is_active'] or requested['is_active']:
+            return None, "Only Pokemon stored in the PC can be traded, not team members."
+        for user_id in (from_user, to_user):
+            if self.battle_manager.battle_for(user_id):
+                return None, "Trainers in a battle can't trade."
+        
+        offer = {
+            'id': str(uuid.uuid4())[:8],
+            'from_user': from_user,
+            'to_user': to_user,
+            'offered': offered,
+            'requested': requested,
+            'expires_at': datetime.now() + timedelta(seconds=self.offer_timeout)
+        }
+        self.offers[offer['id']] = offer
+        for user_id in (from_user, to_user):
+            self.offers_by_user.setdefault(user_id, set()).add(offer['id'])
+        return offer, ""
+    
+    def accept(self, offer_id: str, user_id: str) -> Tuple[bool, str]:
+        """Swap the two Pokemon if both are still where the offer expects them"""
+        self._expire(user_id)
+        offer = self.offers.get(offer_id)
+        if not offer or offer['to_user'] != user_id:
+            return False, "That trade offer doesn't exist or has expired."
+        for trainer in (offer['from_user'], offer['to_user']):
+            if self.battle_manager.battle_for(trainer):
+                return False, "Trainers in a battle can't trade."
+        
+        owners = {offer['offered']['id']: offer['from_user'], offer['requested']['id']: offer['to_user']}
+        new_owners = {offer['offered']['id']: offer['to_user'], offer['requested']['id']: offer['from_user']}
+        pokemon_ids = sorted(owners)
+        pokemon_keys = tuple(uuid_to_bin(pokemon_id) for pokemon_id in pokemon_ids)
+        busy = False
+        
+        try:
+            with self.db.transaction():
+                # Lock in ID order; NOWAIT turns contention into an immediate retryable failure
+                rows = self.db.execute_query(f"""
+                SELECT {BattleManager.TEAM_COLUMNS}, p.user_id
+                FROM pokemon p
+                JOIN pokemon_species s ON p.species_id = s.id
+                WHERE p.id IN (%s, %s)
+                ORDER BY p.id
+                FOR UPDATE OF p NOWAIT
+                """, pokemon_keys, fetch=True)
+                if rows is None:
+                    busy = True
+                    raise TransactionAborted("rows are locked by another trade")
+                if len(rows) != 2 or any(row['user_id'] != owners[row['id']] for row in rows):
+                    raise TransactionAborted("a Pokemon changed hands")
+                if any(row['team_slot'] is not None for row in rows):
+                    raise TransactionAborted("a Pokemon joined its trainer's team")
+                
+                # Rewriting the row moves updated_at, so bank the passive healing first
+                params = []
+                for row in rows:
+                    params += [uuid_to_bin(row['id']), new_owners[row['id']]]
+                members = [BattleManager.build_team_member(row) for row in rows]
+                for member in members:
+                    params += [uuid_to_bin(member['id']),
+                               HPRegeneration.stored_value(member['current_hp'], member['max_hp'])]
+                for member in members:
+                    params += [uuid_to_bin(member['id']), member['hp_as_of'] or datetime.now()]
+                self.db.execute_query("""
+                UPDATE pokemon
+                SET user_id = CASE id WHEN %s THEN %s WHEN %s THEN %s END,
+                    current_hp = CASE id WHEN %s THEN %s WHEN %s THEN %s END,
+                    updated_at = CASE id WHEN %s THEN %s WHEN %s THEN %s END,
+                    is_active = FALSE,
+                    team_slot = NULL
+                WHERE id IN (%s, %s)
+                """, tuple(params) + pokemon_keys)
+        except TransactionAborted as e:
+            print(f"⚠️ Trade {offer_id} not completed: {e}")
+            if busy:
+                return False, "One of these Pokemon is busy in another trade, try again in a moment."
+            self.discard(offer_id)
+            return False, "One of these Pokemon is no longer available."
+        
+        # Any other offer naming either Pokemon is now stale
+        traded = set(pokemon_ids)
+        for trainer in (offer['from_user'], offer['to_user']):
+            for other_id in list(self.offers_by_user.get(trainer, ())):
+                other = self.offers[other_id]
+                if other['offered']['id'] in traded or other['requested']['id'] in traded:
+                    self.discard(other_id)
+        
+        self.context_loader.invalidate_user(offer['from_user'])
+        self.context_loader.invalidate_user(offer['to_user'])
+        print(f"🔁 Trade {offer_id} completed between {offer['from_user']} and {offer['to_user']}")
+        return True, ""
+
+class PendingStarterStore:
+    """Onboarding sessions held in memory, keyed by pending ID.
+    
+    Each (user, server) pair has at most one session, so rerolling starters
+    reuses it instead of creating a row per click. Sessions are only written
+    to pending_starters once they are named, which is what start_journey needs
+    to resume a trainer after a restart. A sweeper drops expired sessions and
+    deletes expired rows in batches.
+    """
+    
+    def __init__(self, db: DatabaseManager, timeout_minutes: int = STARTER_SELECTION_TIMEOUT):
+        self.db = db
+        self.timeout = timedelta(minutes=timeout_minutes)
+        self.sessions = {}  # pending_id -> session
+        self.by_user = {}   # (user_id, server_id) -> pending_id
+        self.sweeper = None
+    
+    def select(self, user_id: str, server_id: str, species_id: int, ivs: Dict[str, int]) -> str:
+        """Record a starter pick, reusing the trainer's existing session"""
+        pending_id = self.by_user.get((user_id, server_id)) or uuid7()
+        session = self.sessions.get(pending_id, {'persisted': False})
+        session.update({
+            'id': pending_id,
+            'user_id': user_id,
+            'server_id': server_id,
+            'selected_species_id': species_id,
+            'generated_ivs': ivs,
+            'pokemon_nickname': None,
+            'step': 'SPECIES_SELECTED',
+            'expires_at': datetime.now() + self.timeout
+        })
+        self.sessions[pending_id] = session
+        self.by_user[(user_id, server_id)] = pending_id
+        if session['persisted']:
+            # The saved row still holds the old pick; a restart must not resume it
+            self._persist_now(session)
+        return pending_id
+    
+    def name(self, pending_id: str, nickname: str, work_queue: 'BackgroundWorkQueue' = None) -> bool:
+        """Attach a nickname and persist the session in the background"""
+        session = self.get(pending_id)
+        if not session:
+            return False
+        
+        session['pokemon_nickname'] = nickname
+        session['step'] = 'NAMED'
+        if work_queue:
+            work_queue.submit('persist_pending_starter', lambda: self._persist(session))
+        else:
+            self._persist_now(session)
+        return True
+    
+    def get(self, pending_id: str) -> Optional[Dict]:
+        """Look up a live session, falling back to the table after a restart"""
+        session = self.sessions.get(pending_id)
+        if session is None:
+            row = self.db.execute_fetchone("SELECT * FROM pending_starters WHERE id = %s",
+                                           (uuid_to_bin(pending_id),))
+            session = self._adopt(row)
+        if session and session['expires_at'] < datetime.now():
+            self._forget(session)
+            return None
+        return session
+    
+    def find_for_user(self, user_id: str, server_id: str) -> Optional[Dict]:
+        """Find a trainer's unfinished session, e.g. when they return after a restart"""
+        pending_id = self.by_user.get((user_id, server_id))
+        if pending_id:
+            return self.get(pending_id)
+        
+        row = self.db.execute_fetchone("""
+        SELECT * FROM pending_starters
+        WHERE user_id = %s AND server_id = %s AND expires_at > %s
+        ORDER BY created_at DESC LIMIT 1
+        """, (user_id, server_id, datetime.now()))
+        return self._adopt(row)
+    
+    def discard(self, pending_id: str):
+        """Remove a session once it is confirmed or cancelled"""
+        session = self.sessions.get(pending_id)
+        if session:
+            # A persist job may still be queued; it checks this flag before inserting
+            session['discarded'] = True
+            self._forget(session)
+        if session is None or session['persisted']:
+            self.db.execute_query("DELETE FROM pending_starters WHERE id = %s", (uuid_to_bin(pending_id),))
+    
+    def _adopt(self, row: Optional[Dict]) -> Optional[Dict]:
+        if not row:
+            return None
+        session = dict(row)
+        if isinstance(session['generated_ivs'], str):
+            session['generated_ivs'] = json.loads(session['generated_ivs'])
+        session['persisted'] = True
+        self.sessions[session['id']] = session
+        self.by_user[(session['user_id'], session['server_id'])] = session['id']
+        return session
+    
+    def _forget(self, session: Dict):
+        self.sessions.pop(session['id'], None)
+        key = (session['user_id'], session['server_id'])
+        if self.by_user.get(key) == session['id']:
+            del self.by_user[key]
+    
+    async def _persist(self, session: Dict):
+        if not session.get('discarded'):
+            self._persist_now(session)
+    
+    def _persist_now(self, session: Dict):
+        query = """
+        INSERT INTO pending_starters
+            (id, user_id, server_id, selected_species_id, pokemon_nickname, generated_ivs, step, expires_at)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE
+        selected_species_id = VALUES(selected_species_id),
+        pokemon_nickname = VALUES(pokemon_nickname),
+        generated_ivs = VALUES(generated_ivs),
+        step = VALUES(step),
+        expires_at = VALUES(expires_at)
+        """
+        result = self.db.execute_query(query, (
+            uuid_to_bin(session['id']), session['user_id'], session['server_id'], session['selected_species_id'],
+            session['pokemon_nickname'], json.dumps(session['generated_ivs']), session['step'],
+            session['expires_at']
+        ))
+        if result is None:
+            raise RuntimeError(f"could not persist pending starter {session['id']}")
+        session['persisted'] = True
+    
+    def start(self, sweep_table: bool = True):
+        """Sweep periodically; sweep_table=False only expires this process's sessions"""
+        if not self.sweeper:
+            self.sweeper = asyncio.create_task(self._sweep_forever(sweep_table))
+    
+    async def stop(self):
+        if self.sweeper:
+            self.sweeper.cancel()
+            self.sweeper = None
+    
+    async def _sweep_forever(self, sweep_table: bool):
+        while True:
+            await asyncio.sleep(PENDING_SWEEP_INTERVAL)
+            self.sweep(sweep_table=sweep_table)
+    
+    def sweep(self, batch_size: int = 1000, sweep_table: bool = True) -> int:
+        """Expire sessions in memory and delete expired rows in batches (served by idx_expires)"""
+        now = datetime.now()
+        for session in [s for s in self.sessions.values() if s['expires_at'] < now]:
+            self._forget(session)
+        
+        deleted = 0
+        if not sweep_table:
+            return deleted
+        while True:
+            count = self.db.execute_query(
+                "DELETE FROM pending_starters WHERE expires_at < %s LIMIT %s", (now, batch_size)
+            )
+            if not count:
+                break
+            deleted += count
+            if count < batch_size:
+                break
+        return deleted
+
+@dataclass
+class InteractionContext:
+    """Everything a slash command needs to know about the caller before responding"""
+    user_id: str
+    server_id: Optional[str]
+    lang: str = 'en'
+    server_config: Optional[Dict] = None
+    user_exists: bool = False
+    team: List[Dict] = field(default_factory=list)
+
+class ContextLoader:
+    """Loads server config, user existence and active team in a single round trip
+    (plus one for the team's movesets).
+    
+    Server configs and team lookups are cached for a short time, so a warm
+    command needs no query at all. Anything that writes to those rows must
+    call invalidate_server / invalidate_user.
+    """
+    
+    SERVER_COLUMNS = ('language', 'starter_channel_id', 'updates_channel_id')
+    
+    def __init__(self, db: DatabaseManager, moves: 'MoveCatalog' = None):
+        self.db = db
+        self.moves = moves
+        self.server_cache = {}  # server_id -> (expires_at, config or None)
+        self.user_cache = {}    # user_id -> (expires_at, team) for known trainers only
+        self.broker = None      # BrokerClient in multi-process mode
+    
+    def attach_broker(self, broker: 'BrokerClient'):
+        """Share invalidations with the other shard processes"""
+        self.broker = broker
+        broker.subscribe('invalidate.server', lambda server_id: self.server_cache.pop(server_id, None))
+        broker.subscribe('invalidate.user', lambda user_id: self.user_cache.pop(user_id, None))
+    
+    async def load(self, interaction: discord.Interaction, with_team: bool = True) -> InteractionContext:
+        """Build the context for an interaction, hitting the database at most once"""
+        user_id = str(interaction.user.id)
+        server_id = str(interaction.guild.id) if interaction.guild else None
+        now = time.monotonic()
+        
+        server_hit = self.server_cache.get(server_id)
+        user_hit = self.user_cache.get(user_id)
+        server_cached = server_id is None or (server_hit is not None and server_hit[0] > now)
+        user_cached = user_hit is not None and user_hit[0] > now
+        
+        # Only a cached team proves the trainer exists; a miss says nothing, so it goes to the query
+        if server_cached and user_cached:
+            server_config = server_hit[1] if server_id else None
+            ctx = InteractionContext(user_id, server_id, server_config=server_config,
+                                     user_exists=True, team=user_hit[1])
+        else:
+            ctx = self._fetch(user_id, server_id, with_team)
+        
+        if ctx.server_config:
+            ctx.lang = ctx.server_config.get('language') or 'en'
+        return ctx
+    
+    def _fetch(self, user_id: str, server_id: Optional[str], with_team: bool) -> InteractionContext:
+        """Run the combined bootstrap query and refresh the caches from it"""
+        team_join = ""
+        team_columns = ""
+        if with_team:
+            team_columns = f", {BattleManager.TEAM_COLUMNS}"
+            team_join = """
+            LEFT JOIN pokemon p ON p.user_id = u.id AND p.is_active = TRUE
+            LEFT JOIN pokemon_species s ON p.species_id = s.id
+            """
+        
+        query = f"""
+        SELECT
+            srv.id AS server_row, srv.language, srv.starter_channel_id, srv.updates_channel_id,
+            u.id AS user_row
+            {team_columns}
+        FROM (SELECT %s AS user_id, %s AS server_id) req
+        LEFT JOIN servers srv ON srv.id = req.server_id
+        LEFT JOIN users u ON u.id = req.user_id
+        {team_join}
+        {"ORDER BY p.team_slot" if with_team else ""}
+        """
+        rows = self.db.execute_query(query, (user_id, server_id), fetch=True) or []
+        
+        ctx = InteractionContext(user_id, server_id)
+        if not rows:
+            return ctx
+        
+        first = rows[0]
+        if first['server_row']:
+            ctx.server_config = {column: first[column] for column in self.SERVER_COLUMNS}
+        if server_id:
+            self.server_cache[server_id] = (time.monotonic() + SERVER_CACHE_TTL, ctx.server_config)
+        
+        ctx.user_exists = first['user_row'] is not None
+        if with_team and ctx.user_exists:
+            ctx.team = [BattleManager.build_team_member(row) for row in rows if row['id']]
+            if self.moves:
+                self.moves.attach(ctx.team)
+            self.user_cache[user_id] = (time.monotonic() + TEAM_CACHE_TTL, ctx.team)
+        
+        return ctx
+    
+    async def get_team(self, user_id: str, battle_manager: 'BattleManager') -> List[Dict]:
+        """Get a user's team, reusing the cached copy when it is still fresh"""
+        hit = self.user_cache.get(user_id)
+        if hit and hit[0] > time.monotonic():
+            return hit[1]
+        
+        team = await battle_manager.get_user_team(user_id)
+        if team:
+            self.user_cache[user_id] = (time.monotonic() + TEAM_CACHE_TTL, team)
+        return team
+    
+    def invalidate_server(self, server_id: str):
+        """Drop a cached server config after it has been written"""
+        self.server_cache.pop(str(server_id), None)
+        if self.broker:
+            self.broker.publish('invalidate.server', str(server_id))
+    
+    def invalidate_user(self, user_id: str):
+        """Drop a cached team after the user's Pokemon have changed"""
+        self.user_cache.pop(str(user_id), None)
+        if self.broker:
+            self.broker.publish('invalidate.user', str(user_id))
+
+class BackgroundWorkQueue:
+    """Bounded queue of side effects (notifications, stats, audit writes) run off the response path"""
+    
+    def __init__(self, maxsize: int = WORK_QUEUE_SIZE, workers: int = WORK_QUEUE_WORKERS,
+                 max_attempts: int = WORK_QUEUE_MAX_ATTEMPTS):
+        self.queue = asyncio.Queue(maxsize=maxsize)
+        self.worker_count = workers
+        self.max_attempts = max_attempts
+        self.workers = []
+        self.processed = 0
+        self.failed = 0
+        self.retried = 0
+        self.dropped = 0
+    
+    def start(self):
+        """Spawn the worker tasks"""
+        if self.workers:
+            return
+        for n in range(self.worker_count):
+            self.workers.append(asyncio.create_task(self._worker(), name=f'work-queue-{n}'))
+    
+    async def stop(self, drain_timeout: float = 5.0):
+        """Give queued jobs a chance to finish, then cancel the workers"""
+        try:
+            await asyncio.wait_for(self.queue.join(), timeout=drain_timeout)
+        except asyncio.TimeoutError:
+            print(f"⚠️ Work queue stopped with {self.queue.qsize()} job(s) pending")
+        for worker in self.workers:
+            worker.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        self.workers = []
+    
+    def submit(self, name: str, job: Callable[[], Awaitable], attempt: int = 1) -> bool:
+        """Queue a job factory; returns False if the queue is full and the job was dropped"""
+        try:
+            self.queue.put_nowait((name, job, attempt))
+            return True
+        except asyncio.QueueFull:
+            self.dropped += 1
+            print(f"⚠️ Work queue full, dropped job: {name}")
+            return False
+    
+    async def _worker(self):
+        while True:
+            name, job, attempt = await self.queue.get()
+            try:
+                await job()
+                self.processed += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if attempt < self.max_attempts:
+                    self.retried += 1
+                    delay = WORK_QUEUE_RETRY_DELAY * (2 ** (attempt - 1))
+                    asyncio.get_running_loop().call_later(delay, self.submit, name, job, attempt + 1)
+                else:
+                    self.failed += 1
+                    print(f"❌ Background job {name} failed after {attempt} attempt(s): {e}")
+            finally:
+                self.queue.task_done()
+    
+    def stats(self) -> Dict[str, int]:
+        """Queue depth and counters for the metrics command"""
+        return {
+            'depth': self.queue.qsize(),
+            'capacity': self.queue.maxsize,
+            'processed': self.processed,
+            'retried': self.retried,
+            'failed': self.failed,
+            'dropped': self.dropped
+        }
+
+class InteractionPipeline:
+    """Tracks handler latency and defers interactions that usually miss the response budget"""
+    
+    def __init__(self, budget: float = INTERACTION_DEFER_BUDGET):
+        self.budget = budget
+        self.timings = {}  # handler name -> exponentially weighted average, in seconds
+        self.calls = {}
+    
+    def record(self, name: str, seconds: float):
+        previous = self.timings.get(name)
+        self.timings[name] = seconds if previous is None else previous * 0.8 + seconds * 0.2
+        self.calls[name] = self.calls.get(name, 0) + 1
+    
+    def expected(self, name: str) -> float:
+        return self.timings.get(name, 0.0)
+    
+    async def maybe_defer(self, interaction: discord.Interaction, name: str,
+                          ephemeral: bool = True) -> bool:
+        """Acknowledge the interaction right away when this handler is expected to be slow"""
+        if interaction.response.is_done() or self.expected(name) < self.budget:
+            return False
+        
+        if interaction.type == discord.InteractionType.component:
+            await interaction.response.defer()
+        else:
+            await interaction.response.defer(ephemeral=ephemeral, thinking=True)
+        return True
+    
+    def stats(self) -> Dict[str, Dict]:
+        return {
+            name: {'avg_ms': round(seconds * 1000, 1), 'calls': self.calls.get(name, 0)}
+            for name, seconds in self.timings.items()
+        }
+
+class LoopMonitor:
+    """Event-loop health: scheduling lag, and who was running when the loop stalled.
+    
+    A task on the loop wakes every `interval` and records how late it was. A
+    watchdog thread checks that heartbeat; once the loop has been blocked for
+    `threshold` it grabs the loop thread's stack with sys._current_frames()
+    while the offending code is still on it, along with the handler (from
+    @tracked) or task that owns it. Nothing is hooked into the loop itself, so
+    the cost is one wake-up per interval on each side.
+    """
+    
+    STACK_DEPTH = 12
+    LAG_SAMPLES = 600
+    
+    def __init__(self, interval: float = LOOP_LAG_INTERVAL, threshold: float = SLOW_CALLBACK_THRESHOLD,
+                 keep: int = SLOW_CALLBACK_KEEP):
+        self.interval = interval
+        self.threshold = threshold
+        self.keep = keep
+        self.running = {}  # task -> name of the @tracked handler it is in
+        self.sampler = None
+        self.watchdog = None
+        self.stopping = threading.Event()
+        self.loop = None
+        self.loop_thread = None
+        self.beat = 0.0
+        self.captured = None  # (beat, culprit, stack) taken by the watchdog during a stall
+        self.reset()
+    
+    def reset(self):
+        self.lags = deque(maxlen=self.LAG_SAMPLES)
+        self.max_lag = 0.0
+        self.stalls = 0
+        self.stalled_seconds = 0.0
+        self.by_culprit = {}  # culprit -> [stalls, seconds]
+        self.slowest = []  # min-heap of (seconds, at, culprit, stack)
+    
+    @property
+    def enabled(self) -> bool:
+        return self.sampler is not None
+    
+    def enter(self, name: str) -> Tuple[Optional[asyncio.Task], Optional[str]]:
+        """Mark the current task as running a handler; returns what leave() needs"""
+        task = asyncio.current_task()
+        previous = self.running.get(task)
+        self.running[task] = name
+        return task, previous
+    
+    def leave(self, token: Tuple[Optional[asyncio.Task], Optional[str]]):
+        task, previous = token
+        if previous is None:
+            self.running.pop(task, None)
+        else:
+            self.running[task] = previous
+    
+    def start(self):
+        if self.sampler:
+            return
+        self.loop = asyncio.get_running_loop()
+        self.loop_thread = threading.get_ident()
+        self.beat = time.perf_counter()
+        self.captured = None
+        self.stopping.clear()
+        self.sampler = asyncio.create_task(self._sample_forever())
+        self.watchdog = threading.Thread(target=self._watch, name='loop-watchdog', daemon=True)
+        self.watchdog.start()
+    
+    async def stop(self):
+        if not self.sampler:
+            return
+        self.sampler.cancel()
+        self.sampler = None
+        self.stopping.set()
+        await asyncio.to_thread(self.watchdog.join)
+        self.watchdog = None
+    
+    async def _sample_forever(self):
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            now = time.perf_counter()
+            lag = max(0.0, now - started - self.interval)
+            self.beat = now
+            self.lags.append(lag)
+            self.max_lag = max(self.max_lag, lag)
+            captured, self.captured = self.captured, None
+            if lag >= self.threshold:
+                self._record_stall(lag, captured)
+    
+    def _watch(self):
+        """Watchdog thread: snapshot the loop thread's stack while it is blocked"""
+        while not self.stopping.wait(self.interval):
+            beat = self.beat
+            blocked = time.perf_counter() - beat - self.interval
+            if blocked < self.threshold or (self.captured and self.captured[0] == beat):
+                continue
+            frame = sys._current_frames().get(self.loop_thread)
+            stack = "".join(traceback.format_stack(frame, limit=self.STACK_DEPTH)) if frame else ""
+            culprit = self._culprit()
+            # The loop may have moved on while we looked; then the stack is not the stall's
+            if self.beat == beat:
+                self.captured = (beat, culprit, stack)
+    
+    def _culprit(self) -> str:
+        """The handler (or failing that, the task) the loop thread is running"""
+        task = asyncio.current_task(self.loop)
+        if task is None:
+            return "loop callback"
+        name = self.running.get(task)
+        if name:
+            return name
+        coro = task.get_coro()
+        return getattr(coro, '__qualname__', None) or task.get_name()
+    
+    def _record_stall(self, seconds: float, captured: Optional[Tuple]):
+        culprit, stack = (captured[1], captured[2]) if captured else ("unknown", "")
+        self.stalls += 1
+        self.stalled_seconds += seconds
+        totals = self.by_culprit.setdefault(culprit, [0, 0.0])
+        totals[0] += 1
+        totals[1] += seconds
+        entry = (seconds, time.time(), culprit, stack)
+        if len(self.slowest) < self.keep:
+            heapq.heappush(self.slowest, entry)
+        else:
+            heapq.heappushpop(self.slowest, entry)
+        print(f"🐢 Event loop blocked for {seconds * 1000:.0f} ms in {culprit}" + (f"\n{stack}" if stack else ""))
+    
+    def stats(self) -> Dict[str, Any]:
+        lags = sorted(self.lags) or [0.0]
+        return {
+            'enabled': self.enabled,
+            'lag_p50_ms': round(lags[len(lags) // 2] * 1000, 1),
+            'lag_p99_ms': round(lags[min(len(lags) - 1, int(len(lags) * 0.99))] * 1000, 1),
+            'lag_max_ms': round(self.max_lag * 1000, 1),
+            'stalls': self.stalls,
+            'stalled_s': round(self.stalled_seconds, 2),
+            'culprits': sorted(((name, count, round(seconds * 1000)) for name, (count, seconds)
+                                in self.by_culprit.items()), key=lambda row: -row[2]),
+            'slowest': sorted(self.slowest, reverse=True),
+        }
+
+class OutboundScheduler:
+    """Rate-limit-aware sender for bot-initiated channel messages.
     
-    TYPE_EMOJIS = {
-        'FIRE': '🔥', 'WATER': '💧', 'GRASS': '🌿', 'ELECTRIC': '⚡',
-        'NORMAL': '⭐', 'BUG': '🐛', 'FLYING': '💨', 'POISON': '☠️',
-        'GROUND': '🌍', 'ROCK': '🗿', 'ICE': '❄️', 'STEEL': '⚙️',
-        'PSYCHIC': '🔮', 'FIGHTING': '👊', 'GHOST': '👻', 'DRAGON': '🐉'
-    }
+    Embeds queued for the same channel within OUTBOUND_COALESCE_WINDOW are
+    merged into one message (up to 10 embeds), and every send waits on the
+    bucket state Discord reports in its X-RateLimit-* response headers, which
+    we observe through an aiohttp trace hook on the bot's HTTP session.
+    """
     
-    @classmethod
-    def get_effectiveness_text(cls, attacking_type: str, lang: str = 'en', 
-                             translations: TranslationManager = None) -> str:
-        """Get formatted effectiveness text for a type"""
-        if attacking_type not in cls.EFFECTIVENESS:
-            return ""
-        
-        eff = cls.EFFECTIVENESS[attacking_type]
-        lines = []
-        
-        if eff['strong']:
-            strong_types = [f"{cls.TYPE_EMOJIS.get(t, '❓')} {t}" for t in eff['strong']]
-            strong_text = translations.get('pokemon.type_chart.strong_vs', lang) if translations else "Strong vs:"
-            lines.append(f"{strong_text} {', '.join(strong_types)}")
-        
-        if eff['weak']:
-            weak_types = [f"{cls.TYPE_EMOJIS.get(t, '❓')} {t}" for t in eff['weak']]
-            weak_text = translations.get('pokemon.type_chart.weak_vs', lang) if translations else "Weak vs:"
-            lines.append(f"{weak_text} {', '.join(weak_types)}")
+    MAX_EMBEDS_PER_MESSAGE = 10
+    CHANNEL_ROUTE = re.compile(r'/channels/(\d+)/messages')
+    
+    def __init__(self, coalesce_window: float = OUTBOUND_COALESCE_WINDOW):
+        self.coalesce_window = coalesce_window
+        self.pending = {}  # channel_id -> list of (channel, embed)
+        self.drainers = {}  # channel_id -> drain task
+        self.buckets = {}  # (method, channel_id) -> (remaining, reset_at)
+        self.global_reset_at = 0.0
+        self.events_queued = 0
+        self.messages_sent = 0
+        self.rate_limited = 0
+    
+    def enqueue(self, channel: discord.abc.Messageable, embed: discord.Embed):
+        """Queue an embed for a channel; it goes out with any others that arrive close by"""
+        channel_id = channel.id
+        self.pending.setdefault(channel_id, []).append((channel, embed))
+        self.events_queued += 1
+        if channel_id not in self.drainers:
+            self.drainers[channel_id] = asyncio.create_task(self._drain(channel_id))
+    
+    async def send(self, channel: discord.abc.Messageable, **kwargs) -> discord.Message:
+        """Send a message right away (e.g. one carrying a view), pacing it against the bucket"""
+        await self.wait_for_route('POST', channel.id)
+        message = await channel.send(**kwargs)
+        self.messages_sent += 1
+        return message
+    
+    async def wait_for_route(self, method: str, channel_id: int):
+        """Sleep until the route's bucket (and the global limit) has room"""
+        loop = asyncio.get_running_loop()
+        while True:
+            now = loop.time()
+            wait = self.global_reset_at - now
+            remaining, reset_at = self.buckets.get((method, int(channel_id)), (1, 0.0))
+            if remaining <= 0 and reset_at > now:
+                wait = max(wait, reset_at - now)
+            if wait <= 0:
+                break
+            await asyncio.sleep(wait)
         
-        return "\n".join(lines)
-
-class BattleManager:
-    """Manages battle sessions and state"""
+        # Reserve a slot until the next response tells us the real count
+        key = (method, int(channel_id))
+        if key in self.buckets:
+            remaining, reset_at = self.buckets[key]
+            self.buckets[key] = (remaining - 1, reset_at)
     
-    def __init__(self, db: DatabaseManager):
-        self.db = db
-        self.active_battles = {}  # In-memory battle state storage
+    async def _drain(self, channel_id: int):
+        try:
+            await asyncio.sleep(self.coalesce_window)
+            while self.pending.get(channel_id):
+                batch = self.pending[channel_id][:self.MAX_EMBEDS_PER_MESSAGE]
+                del self.pending[channel_id][:self.MAX_EMBEDS_PER_MESSAGE]
+                channel = batch[0][0]
+                try:
+                    await self.send(channel, embeds=[embed for _, embed in batch])
+                except discord.HTTPException as e:
+                    print(f"❌ Failed to deliver {len(batch)} update(s) to channel {channel_id}: {e}")
+        finally:
+            self.pending.pop(channel_id, None)
+            self.drainers.pop(channel_id, None)
     
-    async def create_battle_session(self, player1_id: str, player2_id: str = None, 
-                                  server_id: str = None) -> str:
-        """Create a new battle session"""
-        battle_id = str(uuid.uuid4())
+    async def flush(self, timeout: float = 5.0):
+        """Wait for queued messages to go out (used on shutdown)"""
+        if self.drainers:
+            await asyncio.wait(list(self.drainers.values()), timeout=timeout)
+    
+    def observe(self, method: str, path: str, status: int, headers):
+        """Record bucket state from a Discord API response"""
+        loop = asyncio.get_running_loop()
+        if status == 429:
+            self.rate_limited += 1
+            if headers.get('X-RateLimit-Global'):
+                self.global_reset_at = loop.time() + float(headers.get('Retry-After', 1))
         
-        # Insert battle record
-        battle_query = """
-        INSERT INTO battles (id, player1_id, player2_id, status, started_at)
-        VALUES (%s, %s, %s, %s, %s)
-        """
-        self.db.execute_query(battle_query, (
-            battle_id, player1_id, player2_id, 'LOBBY', datetime.now()
-        ))
+        match = self.CHANNEL_ROUTE.search(path)
+        if not match or 'X-RateLimit-Remaining' not in headers:
+            return
+        self.buckets[(method, int(match.group(1)))] = (
+            int(headers['X-RateLimit-Remaining']),
+            loop.time() + float(headers.get('X-RateLimit-Reset-After', 0))
+        )
+    
+    def trace_config(self) -> aiohttp.TraceConfig:
+        """aiohttp hook that feeds every Discord response into observe()"""
+        async def on_request_end(session, context, params):
+            self.observe(params.method, params.url.path, params.response.status, params.response.headers)
         
-        # Initialize battle state
-        self.active_battles[battle_id] = {
-            'id': battle_id,
-            'player1_id': player1_id,
-            'player2_id': player2_id,
-            'server_id': server_id,
-            'status': 'LOBBY',
-            'turn': 1,
-            'created_at': datetime.now().isoformat()
+        trace = aiohttp.TraceConfig()
+        trace.on_request_end.append(on_request_end)
+        return trace
+    
+    def stats(self) -> Dict[str, int]:
+        return {
+            'pending': sum(len(batch) for batch in self.pending.values()),
+            'events': self.events_queued,
+            'messages': self.messages_sent,
+            'rate_limited': self.rate_limited
         }
-        
-        print(f"Created battle session: {battle_id}")
-        return battle_id
+
+class StateBroker:
+    """Local pub/sub hub for shard processes, served over a Unix socket.
     
-    async def get_user_team(self, user_id: str) -> List[Dict]:
-        """Get user's active Pokemon team with calculated stats"""
-        team_query = """
-        SELECT 
-            p.id, p.nickname, p.level, p.current_hp, p.status_condition,
-            p.hp_iv, p.attack_iv, p.defense_iv, p.sp_attack_iv, p.sp_defense_iv, p.speed_iv,
-            s.name as species_name, s.type1, s.type2,
-            s.base_hp, s.base_attack, s.base_defense, s.base_sp_attack, s.base_sp_defense, s.base_speed
-        FROM pokemon p
-        JOIN pokemon_species s ON p.species_id = s.id
-        WHERE p.user_id = %s AND p.is_active = TRUE
-        ORDER BY p.team_slot
-        """
-        team_data = self.db.execute_query(team_query, (user_id,), fetch=True) or []
+    Messages are newline-delimited JSON objects with a 'topic'. A message with
+    a 'to' field goes only to that shard; everything else is fanned out to
+    every other connected shard.
+    """
+    
+    def __init__(self, path: str = BROKER_SOCKET):
+        self.path = path
+        self.server = None
+        self.shards = {}  # shard_id -> StreamWriter
+    
+    async def start(self):
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        self.server = await asyncio.start_unix_server(self._handle, path=self.path)
+        print(f"📡 State broker listening on {self.path}")
+    
+    async def stop(self):
+        if self.server:
+            self.server.close()
+            await self.server.wait_closed()
+            self.server = None
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+    
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        shard_id = None
+        try:
+            while line := await reader.readline():
+                message = json.loads(line)
+                if message['topic'] == 'hello':
+                    shard_id = message['shard']
+                    self.shards[shard_id] = writer
+                    continue
+                
+                if message.get('to') is not None:
+                    targets = [self.shards.get(message['to'])]
+                else:
+                    targets = [w for sid, w in self.shards.items() if sid != shard_id]
+                for target in targets:
+                    if target:
+                        target.write(line)
+        except (ConnectionError, json.JSONDecodeError):
+            pass
+        finally:
+            if shard_id is not None and self.shards.get(shard_id) is writer:
+                del self.shards[shard_id]
+            writer.close()
+
+class BrokerClient:
+    """A shard's connection to the StateBroker: publish, subscribe and request/reply"""
+    
+    def __init__(self, shard_id: int, path: str = BROKER_SOCKET):
+        self.shard_id = shard_id
+        self.path = path
+        self.writer = None
+        self.handlers = {}  # topic -> callback(data) (may return a reply)
+        self.waiting = {}   # request id -> future
+        self.reader_task = None
+    
+    async def connect(self, attempts: int = 10):
+        """Connect (retrying while the broker starts up) and begin reading"""
+        for attempt in range(attempts):
+            try:
+                reader, self.writer = await asyncio.open_unix_connection(self.path)
+                break
+            except (FileNotFoundError, ConnectionRefusedError):
+                await asyncio.sleep(0.5 * (attempt + 1))
+        else:
+            print(f"❌ Could not reach state broker at {self.path}")
+            return False
         
-        # Calculate final stats for each Pokemon
-        team = []
-        for pokemon in team_data:
-            base_stats = {
-                'hp': pokemon['base_hp'],
-                'attack': pokemon['base_attack'],
-                'defense': pokemon['base_defense'],
-                'sp_attack': pokemon['base_sp_attack'],
-                'sp_defense': pokemon['base_sp_defense'],
-                'speed': pokemon['base_speed']
-            }
-            
-            ivs = {
-                'hp': pokemon['hp_iv'],
-                'attack': pokemon['attack_iv'],
-                'defense': pokemon['defense_iv'],
-                'sp_attack': pokemon['sp_attack_iv'],
-                'sp_defense': pokemon['sp_defense_iv'],
-                'speed': pokemon['speed_iv']
-            }
-            
-            final_stats = IVGenerator.calculate_stats(base_stats, ivs, pokemon['level'])
+        self._write({'topic': 'hello', 'shard': self.shard_id})
+        self.reader_task = asyncio.create_task(self._read(reader))
+        return True
+    
+    async def close(self):
+        if self.reader_task:
+            self.reader_task.cancel()
+        if self.writer:
+            self.writer.close()
+    
+    def subscribe(self, topic: str, callback: Callable[[Any], Any]):
+        self.handlers[topic] = callback
+    
+    def publish(self, topic: str, data: Any, to: int = None):
+        """Fire-and-forget message to every other shard (or one shard)"""
+        self._write({'topic': topic, 'data': data, 'to': to, 'from': self.shard_id})
+    
+    async def request(self, to: int, topic: str, data: Any, timeout: float = 2.0):
+        """Ask one shard a question and wait for its answer (None on timeout)"""
+        request_id = uuid.uuid4().hex
+        future = asyncio.get_running_loop().create_future()
+        self.waiting[request_id] = future
+        self._write({'topic': topic, 'data': data, 'to': to, 'from': self.shard_id, 'id': request_id})
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            return None
+        finally:
+            self.waiting.pop(request_id, None)
+    
+    def _write(self, message: Dict):
+        if self.writer and not self.writer.is_closing():
+            self.writer.write(json.dumps(message, default=str).encode() + b'\n')
+    
+    async def _read(self, reader: asyncio.StreamReader):
+        while line := await reader.readline():
+            message = json.loads(line)
+            if message['topic'] == 'reply':
+                future = self.waiting.get(message['id'])
+                if future and not future.done():
+                    future.set_result(message['data'])
+                continue
             
-            team.append({
-                'id': pokemon['id'],
-                'nickname': pokemon['nickname'] or pokemon['species_name'],
-                'species': pokemon['species_name'],
-                'level': pokemon['level'],
-                'type1': pokemon['type1'],
-                'type2': pokemon['type2'],
-                'current_hp': pokemon['current_hp'] or final_stats['hp'],
-                'max_hp': final_stats['hp'],
-                'stats': final_stats,
-                'status': pokemon['status_condition'],
-                'ivs': ivs
-            })
-        
-        return team
+            handler = self.handlers.get(message['topic'])
+            if not handler:
+                continue
+            try:
+                result = handler(message.get('data'))
+                if asyncio.iscoroutine(result):
+                    result = await result
+            except Exception as e:
+                print(f"❌ Broker handler for {message['topic']} failed: {e}")
+                result = None
+            if message.get('id'):
+                self._write({'topic': 'reply', 'id': message['id'], 'data': result, 'to': message['from']})
+        print("⚠️ Lost connection to state broker")
+
+def tracked(name: str):
+    """Record a handler's duration in the bot's InteractionPipeline and name it for the LoopMonitor"""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            interaction = next(arg for arg in args if isinstance(arg, discord.Interaction))
+            client = interaction.client
+            token = client.loop_monitor.enter(name)
+            start = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                client.pipeline.record(name, time.perf_counter() - start)
+                client.loop_monitor.leave(token)
+        return wrapper
+    return decorator
+
+async def send_response(interaction: discord.Interaction, **kwargs):
+    """Send a reply whether or not the interaction has been deferred"""
+    if interaction.response.is_done():
+        await interaction.followup.send(**kwargs)
+    else:
+        await interaction.response.send_message(**kwargs)
+
+async def edit_response(interaction: discord.Interaction, **kwargs):
+    """Edit the component's message whether or not the interaction has been deferred"""
+    if interaction.response.is_done():
+        await interaction.edit_original_response(**kwargs)
+    else:
+        await interaction.response.edit_message(**kwargs)
 
 class ActivityLauncherView(discord.ui.View):
     """View for launching Discord Activities"""
@@ -405,15 +3706,18 @@ class ActivityLauncherView(discord.ui.View):
     @discord.ui.button(label='🎮 Launch Battle Arena', 
                       style=discord.ButtonStyle.primary, 
                       custom_id='launch_activity')
+    @tracked('launch_activity')
     async def launch_activity(self, interaction: discord.Interaction, button: discord.ui.Button):
         user_id = str(interaction.user.id)
         server_id = str(interaction.guild.id)
+        await interaction.client.pipeline.maybe_defer(interaction, 'launch_activity')
         
         # Check if user has a team
-        team = await self.battle_manager.get_user_team(user_id)
+        team = await interaction.client.context_loader.get_team(user_id, self.battle_manager)
         if len(team) < 3:
-            await interaction.response.send_message(
-                "❌ You need at least 3 Pokemon to battle! Use the starter button to begin your journey.",
+            await send_response(
+                interaction,
+                content="❌ You need at least 3 Pokemon to battle! Use the starter button to begin your journey.",
                 ephemeral=True
             )
             return
@@ -422,7 +3726,10 @@ class ActivityLauncherView(discord.ui.View):
         battle_id = await self.battle_manager.create_battle_session(user_id, server_id=server_id)
         
         # Create activity URL with battle session data
-        activity_params = f"?battle_id={battle_id}&user_id={user_id}&mode=practice"
+        # The Activity has no backend to ask, so the lead Pokemon's moves ride along as name:pp pairs
+        lead_moves = ",".join(f"{move['name']}:{move['pp']}" for move in team[0].get('moves', []))
+        activity_params = (f"?battle_id={battle_id}&user_id={user_id}&mode=practice"
+                           f"&moves={urllib.parse.quote(lead_moves)}")
         full_activity_url = f"{self.activity_url}{activity_params}"
         
         # Create launch embed
@@ -466,11 +3773,97 @@ class ActivityLauncherView(discord.ui.View):
         )
         activity_view.add_item(activity_button)
         
-        await interaction.response.edit_message(embed=embed, view=activity_view)
+        await edit_response(interaction, embed=embed, view=activity_view)
+
+class ChallengeButton(discord.ui.DynamicItem[discord.ui.Button],
+                      template=r'challenge:(?P<action>accept|decline):(?P<challenger>\d+):(?P<opponent>\d+):(?P<expires>\d+)'):
+    """Accept/decline button on a /mkp-battle challenge.
+    
+    The whole challenge is encoded in the custom_id, so nothing is kept per
+    message: one add_dynamic_items() call routes every click, old or new,
+    including after a restart.
+    """
+    
+    LABELS = {
+        'accept': ("✅ Accept Challenge", discord.ButtonStyle.success),
+        'decline': ("❌ Decline", discord.ButtonStyle.danger),
+    }
+    
+    def __init__(self, action: str, challenger_id: str, opponent_id: str, expires_at: int):
+        label, style = self.LABELS[action]
+        super().__init__(discord.ui.Button(
+            label=label,
+            style=style,
+            custom_id=f"challenge:{action}:{challenger_id}:{opponent_id}:{expires_at}"
+        ))
+        self.action = action
+        self.challenger_id = challenger_id
+        self.opponent_id = opponent_id
+        self.expires_at = expires_at
+    
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Button, match: re.Match[str]):
+        return cls(match['action'], match['challenger'], match['opponent'], int(match['expires']))
+    
+    async def closed(self, interaction: discord.Interaction, title: str, description: str, color: int):
+        """Replace the challenge with its outcome; the buttons go with it"""
+        embed = discord.Embed(title=title, description=description, color=color)
+        await edit_response(interaction, content=None, embed=embed, view=None)
+    
+    @tracked('challenge_button')
+    async def callback(self, interaction: discord.Interaction):
+        user_id = str(interaction.user.id)
+        battle_manager = interaction.client.battle_manager
+        
+        # Either side may call it off; only the challenged trainer can accept
+        if user_id not in (self.challenger_id, self.opponent_id) or (
+                self.action == 'accept' and user_id != self.opponent_id):
+            await send_response(interaction, content="❌ This challenge isn't for you!", ephemeral=True)
+            return
+        
+        if time.time() >= self.expires_at:
+            await self.closed(interaction, "⌛ Challenge Expired",
+                              f"<@{self.challenger_id}>'s challenge to <@{self.opponent_id}> was not answered in time.",
+                              0x95a5a6)
+            return
+        
+        if self.action == 'decline':
+            verb = "withdrew" if user_id == self.challenger_id else "declined"
+            await self.closed(interaction, "❌ Challenge Declined",
+                              f"<@{user_id}> {verb} the battle challenge.", 0x95a5a6)
+            return
+        
+        await interaction.client.pipeline.maybe_defer(interaction, 'challenge_button')
+        
+        # Double clicks and other challenges may already have started a battle
+        for player_id in (self.challenger_id, self.opponent_id):
+            if battle_manager.battle_for(player_id):
+                await send_response(interaction, content=f"❌ <@{player_id}> is already in a battle!", ephemeral=True)
+                return
+        
+        battle_id = await battle_manager.create_battle_session(
+            self.challenger_id, self.opponent_id, server_id=str(interaction.guild_id)
+        )
+        
+        embed = discord.Embed(
+            title="⚔️ Challenge Accepted!",
+            description=f"<@{self.challenger_id}> vs <@{self.opponent_id}> — open the arena to battle!",
+            color=0x2ecc71
+        )
+        embed.set_footer(text=f"Battle ID: {battle_id}")
+        view = discord.ui.View()
+        view.add_item(discord.ui.Button(
+            label="🚀 Open Battle Arena",
+            style=discord.ButtonStyle.link,
+            url=f"{interaction.client.activity_base_url}?battle_id={battle_id}&mode=pvp"
+        ))
+        await edit_response(interaction, content=None, embed=embed, view=view)
 
 class StarterSelectionView(discord.ui.View):
     """Starter Pokemon selection interface"""
     
+    STARTER_NAMES = {1: 'Charmander', 4: 'Squirtle', 7: 'Bulbasaur'}
+    
     def __init__(self, user_id: str, server_id: str, db: DatabaseManager, 
                  translations: TranslationManager, lang: str = 'en'):
         super().__init__(timeout=300)
@@ -492,9 +3885,11 @@ class StarterSelectionView(discord.ui.View):
     async def bulbasaur_button(self, interaction: discord.Interaction, button: discord.ui.Button):
         await self._handle_starter_selection(interaction, 7, 'Bulbasaur', 'GRASS')
     
+    @tracked('starter_selection')
     async def _handle_starter_selection(self, interaction: discord.Interaction, 
                                       species_id: int, pokemon_name: str, pokemon_type: str):
         """Handle starter Pokemon selection and show stats"""
+        await interaction.client.pipeline.maybe_defer(interaction, 'starter_selection')
         
         # Generate IVs for this specific Pokemon
         ivs = IVGenerator.generate_starter_ivs()
@@ -507,7 +3902,7 @@ class StarterSelectionView(discord.ui.View):
         base_stats_row = self.db.execute_fetchone(base_query, (species_id,))
         
         if not base_stats_row:
-            await interaction.response.send_message("❌ Error loading Pokemon data.", ephemeral=True)
+            await send_response(interaction, content="❌ Error loading Pokemon data.", ephemeral=True)
             return
         
         base_stats = {
@@ -523,18 +3918,10 @@ class StarterSelectionView(discord.ui.View):
         final_stats = IVGenerator.calculate_stats(base_stats, ivs, 5)
         quality = IVGenerator.get_iv_quality(ivs)
         
-        # Store pending selection
-        pending_id = str(uuid.uuid4())
-        expires_at = datetime.now() + timedelta(minutes=10)
-        
-        pending_query = """
-        INSERT INTO pending_starters (id, user_id, server_id, selected_species_id, generated_ivs, expires_at)
-        VALUES (%s, %s, %s, %s, %s, %s)
-        """
-        self.db.execute_query(pending_query, (
-            pending_id, self.user_id, self.server_id, species_id,
-            json.dumps(ivs), expires_at
-        ))
+        # Store pending selection (in memory; rerolls reuse the same session)
+        pending_id = interaction.client.pending_starters.select(
+            self.user_id, self.server_id, species_id, ivs
+        )
         
         # Create stats display embed
         embed = discord.Embed(
@@ -569,7 +3956,7 @@ class StarterSelectionView(discord.ui.View):
         # Create naming modal button
         view = StarterNamingView(pending_id, pokemon_name, self.db, self.translations, self.lang)
         
-        await interaction.response.edit_message(embed=embed, view=view)
+        await edit_response(interaction, embed=embed, view=view)
 
 class StarterNamingView(discord.ui.View):
     """View for naming the selected starter"""
@@ -620,11 +4007,13 @@ class StarterNamingModal(discord.ui.Modal):
             nickname = self.pokemon_name
         
         # Update pending selection with nickname
-        update_query = """
-        UPDATE pending_starters SET pokemon_nickname = %s, step = 'NAMED'
-        WHERE id = %s
-        """
-        self.db.execute_query(update_query, (nickname, self.pending_id))
+        if not interaction.client.pending_starters.name(self.pending_id, nickname,
+                                                       interaction.client.work_queue):
+            await interaction.response.edit_message(
+                content=self.translations.get('starter.session_expired', self.lang),
+                embed=None, view=None
+            )
+            return
         
         # Show confirmation
         view = StarterConfirmationView(self.pending_id, nickname, self.pokemon_name,
@@ -659,7 +4048,7 @@ class StarterConfirmationView(discord.ui.View):
     @discord.ui.button(label='❌ Choose Different Pokemon', style=discord.ButtonStyle.danger)
     async def cancel_choice(self, interaction: discord.Interaction, button: discord.ui.Button):
         # Delete pending selection and restart
-        self.db.execute_query("DELETE FROM pending_starters WHERE id = %s", (self.pending_id,))
+        interaction.client.pending_starters.discard(self.pending_id)
         
         # Show starter selection again
         view = StarterSelectionView(str(interaction.user.id), str(interaction.guild.id),
@@ -673,6 +4062,7 @@ class StarterConfirmationView(discord.ui.View):
         
         await interaction.response.edit_message(embed=embed, view=view)
     
+    @tracked('create_starter_team')
     async def _create_starter_team(self, interaction: discord.Interaction):
         """Create the complete starter team"""
         await interaction.response.edit_message(
@@ -681,8 +4071,7 @@ class StarterConfirmationView(discord.ui.View):
         )
         
         # Get pending selection data
-        pending_query = "SELECT * FROM pending_starters WHERE id = %s"
-        pending = self.db.execute_fetchone(pending_query, (self.pending_id,))
+        pending = interaction.client.pending_starters.get(self.pending_id)
         
         if not pending:
             await interaction.edit_original_response(
@@ -692,67 +4081,76 @@ class StarterConfirmationView(discord.ui.View):
         
         user_id = pending['user_id']
         species_id = pending['selected_species_id']
-        ivs = json.loads(pending['generated_ivs'])
+        ivs = pending['generated_ivs']
         
         try:
+            # IDs are generated here so the new Pokemon's moves can go in the same pass
+            starter_id = uuid7()
+            common_ids = [uuid7(), uuid7()]
+            
             # Create starter Pokemon
             starter_query = """
             INSERT INTO pokemon (
-                user_id, species_id, nickname, level, experience, is_starter,
+                id, user_id, species_id, nickname, level, experience, is_starter,
                 team_slot, hp_iv, attack_iv, defense_iv, sp_attack_iv, 
                 sp_defense_iv, speed_iv, original_trainer
-            ) VALUES (%s, %s, %s, 5, 0, TRUE, 1, %s, %s, %s, %s, %s, %s, %s)
+            ) VALUES (%s, %s, %s, %s, 5, 0, TRUE, 1, %s, %s, %s, %s, %s, %s, %s)
             """
             self.db.execute_query(starter_query, (
-                user_id, species_id, self.nickname, 
+                uuid_to_bin(starter_id), user_id, species_id, self.nickname, 
                 ivs['hp'], ivs['attack'], ivs['defense'],
                 ivs['sp_attack'], ivs['sp_defense'], ivs['speed'],
                 user_id
             ))
             
-            # Add 2 random common Pokemon
-            common_species = [10, 13, 16, 19]  # Caterpie, Weedle, Pidgey, Rattata
-            for slot in [2, 3]:
-                common_species_id = random.choice(common_species)
+            # Add 2 random common Pokemon (base forms drawn from the species catalog)
+            wild = interaction.client.wild
+            new_pokemon = [(starter_id, species_id, 5)]
+            common_params = []
+            for pokemon_id, slot, common_ivs in zip(common_ids, [2, 3], IVGenerator.generate_common_ivs_batch(2)):
+                common_species_id = wild.sample_species('COMMON')
                 common_level = random.randint(3, 4)
-                common_ivs = IVGenerator.generate_common_ivs()
-                
-                common_query = """
-                INSERT INTO pokemon (
-                    user_id, species_id, level, experience, is_starter,
-                    team_slot, hp_iv, attack_iv, defense_iv, sp_attack_iv,
-                    sp_defense_iv, speed_iv, original_trainer
-                ) VALUES (%s, %s, %s, 0, FALSE, %s, %s, %s, %s, %s, %s, %s, %s)
-                """
-                self.db.execute_query(common_query, (
-                    user_id, common_species_id, common_level, slot,
+                new_pokemon.append((pokemon_id, common_species_id, common_level))
+                common_params += [
+                    uuid_to_bin(pokemon_id), user_id, common_species_id, common_level, slot,
                     common_ivs['hp'], common_ivs['attack'], common_ivs['defense'],
                     common_ivs['sp_attack'], common_ivs['sp_defense'], common_ivs['speed'],
                     user_id
-                ))
+                ]
             
-            # Give starter items
-            items = [
-                ('HEALING', 'POTION', 3),
-                ('HEALING', 'ANTIDOTE', 1), 
-                ('POKEBALL', 'POKEBALL', 5)
-            ]
+            common_query = """
+            INSERT INTO pokemon (
+                id, user_id, species_id, level, experience, is_starter,
+                team_slot, hp_iv, attack_iv, defense_iv, sp_attack_iv,
+                sp_defense_iv, speed_iv, original_trainer
+            ) VALUES (%s, %s, %s, %s, 0, FALSE, %s, %s, %s, %s, %s, %s, %s, %s),
+                     (%s, %s, %s, %s, 0, FALSE, %s, %s, %s, %s, %s, %s, %s, %s)
+            """
+            self.db.execute_query(common_query, tuple(common_params))
+            
+            # Starting moves for all three in one insert
+            interaction.client.battle_manager.moves.insert_movesets(new_pokemon)
             
-            for item_type, item_id, quantity in items:
-                item_query = """
-                INSERT INTO user_items (user_id, item_type, item_id, quantity)
-                VALUES (%s, %s, %s, %s)
-                """
-                self.db.execute_query(item_query, (user_id, item_type, item_id, quantity))
+            # Give starter items
+            interaction.client.inventory.grant(user_id, [
+                ('POTION', 3),
+                ('ANTIDOTE', 1),
+                ('POKEBALL', 5)
+            ])
             
             # Clean up pending selection
-            self.db.execute_query("DELETE FROM pending_starters WHERE id = %s", (self.pending_id,))
+            interaction.client.pending_starters.discard(self.pending_id)
+            interaction.client.context_loader.invalidate_user(user_id)
+            interaction.client.achievements.record('starter_chosen', user_id)
             
             # Send success message
             await self._send_welcome_message(interaction, user_id, species_id)
             
-            # Send notification to updates channel
-            await self._send_notification(interaction, user_id, species_id)
+            # Updates channel notification happens off the response path
+            interaction.client.work_queue.submit(
+                'starter_notification',
+                lambda: self._send_notification(interaction, user_id, species_id)
+            )
             
         except Exception as e:
             print(f"Error creating starter team: {e}")
@@ -804,61 +4202,58 @@ class StarterConfirmationView(discord.ui.View):
     
     async def _send_notification(self, interaction: discord.Interaction,
                                user_id: str, species_id: int):
-        """Send notification to updates channel"""
+        """Send notification to updates channel (runs on the background work queue,
+        so errors propagate and the job is retried)"""
         # Get server config
-        server_query = "SELECT updates_channel_id, language FROM servers WHERE id = %s"
-        server_config = self.db.execute_fetchone(server_query, (str(interaction.guild.id),))
+        ctx = await interaction.client.context_loader.load(interaction, with_team=False)
+        server_config = ctx.server_config
         
         if not server_config or not server_config['updates_channel_id']:
             return
         
-        try:
-            updates_channel = interaction.guild.get_channel(int(server_config['updates_channel_id']))
-            if not updates_channel:
-                return
+        updates_channel = interaction.guild.get_channel(int(server_config['updates_channel_id']))
+        if not updates_channel:
+            return
+        
+        # Get starter details
+        pokemon_query = """
+        SELECT p.nickname, s.name as species_name, s.type1
+        FROM pokemon p  
+        JOIN pokemon_species s ON p.species_id = s.id
+        WHERE p.user_id = %s AND p.is_starter = TRUE
+        """
+        starter = self.db.execute_fetchone(pokemon_query, (user_id,))
+        
+        if starter:
+            lang = ctx.lang
+            type_emoji = TypeEffectiveness.TYPE_EMOJIS.get(starter['type1'], '❓')
             
-            # Get starter details
-            pokemon_query = """
-            SELECT p.nickname, s.name as species_name, s.type1
-            FROM pokemon p  
-            JOIN pokemon_species s ON p.species_id = s.id
-            WHERE p.user_id = %s AND p.is_starter = TRUE
-            """
-            starter = self.db.execute_fetchone(pokemon_query, (user_id,))
+            embed = discord.Embed(
+                title=self.translations.get('notifications.new_trainer_title', lang),
+                description=self.translations.get('notifications.new_trainer_description', lang,
+                                                username=interaction.user.mention),
+                color=0xf39c12
+            )
             
-            if starter:
-                lang = server_config['language'] or 'en'
-                type_emoji = TypeEffectiveness.TYPE_EMOJIS.get(starter['type1'], '❓')
-                
-                embed = discord.Embed(
-                    title=self.translations.get('notifications.new_trainer_title', lang),
-                    description=self.translations.get('notifications.new_trainer_description', lang,
-                                                    username=interaction.user.mention),
-                    color=0xf39c12
-                )
-                
-                embed.add_field(
-                    name="🌟 Starter Choice",
-                    value=self.translations.get('notifications.chose_starter', lang,
-                                              starter_emoji=type_emoji,
-                                              nickname=starter['nickname'],
-                                              species=starter['species_name']),
-                    inline=False
-                )
-                
-                embed.add_field(
-                    name="📊 Trainer Info",
-                    value=self.translations.get('notifications.trainer_stats', lang),
-                    inline=False
-                )
-                
-                embed.set_thumbnail(url=interaction.user.display_avatar.url)
-                embed.set_footer(text=self.translations.get('notifications.welcome_message', lang))
-                
-                await updates_channel.send(embed=embed)
-                
-        except Exception as e:
-            print(f"Error sending notification: {e}")
+            embed.add_field(
+                name="🌟 Starter Choice",
+                value=self.translations.get('notifications.chose_starter', lang,
+                                          starter_emoji=type_emoji,
+                                          nickname=starter['nickname'],
+                                          species=starter['species_name']),
+                inline=False
+            )
+            
+            embed.add_field(
+                name="📊 Trainer Info",
+                value=self.translations.get('notifications.trainer_stats', lang),
+                inline=False
+            )
+            
+            embed.set_thumbnail(url=interaction.user.display_avatar.url)
+            embed.set_footer(text=self.translations.get('notifications.welcome_message', lang))
+            
+            interaction.client.outbound.enqueue(updates_channel, embed)
 
 class PersistentStarterView(discord.ui.View):
     """Persistent view for the starter button"""
@@ -876,20 +4271,22 @@ class PersistentStarterView(discord.ui.View):
         user_id = str(interaction.user.id)
         server_id = str(interaction.guild.id)
         
-        # Get server language
-        lang_query = "SELECT language FROM servers WHERE id = %s"
-        server_config = self.db.execute_fetchone(lang_query, (server_id,))
-        lang = server_config['language'] if server_config else 'en'
+        # Server language, trainer check and team in one round trip
+        ctx = await interaction.client.context_loader.load(interaction)
+        lang = ctx.lang
         
-        # Check if user already exists
-        user_query = "SELECT id FROM users WHERE id = %s"
-        if self.db.execute_fetchone(user_query, (user_id,)):
+        if ctx.user_exists and ctx.team:
             await interaction.response.send_message(
                 self.translations.get('starter.already_trainer', lang),
                 ephemeral=True
             )
             return
         
+        if ctx.user_exists:
+            # Onboarding was interrupted (e.g. by a restart) - pick up where it stopped
+            await self._resume_onboarding(interaction, user_id, server_id, lang)
+            return
+        
         # ✅ CREATE USER IMMEDIATELY (NEW CODE)
         create_user_query = """
         INSERT INTO users (id, username, discriminator, created_at)
@@ -911,6 +4308,107 @@ class PersistentStarterView(discord.ui.View):
         )
         
         await interaction.response.send_message(embed=embed, view=view, ephemeral=True)
+    
+    async def _resume_onboarding(self, interaction: discord.Interaction,
+                                 user_id: str, server_id: str, lang: str):
+        """Continue a trainer's unfinished starter selection"""
+        session = interaction.client.pending_starters.find_for_user(user_id, server_id)
+        
+        if session and session['step'] == 'NAMED':
+            pokemon_name = StarterSelectionView.STARTER_NAMES.get(session['selected_species_id'], 'Pokemon')
+            view = StarterConfirmationView(session['id'], session['pokemon_nickname'], pokemon_name,
+                                         self.db, self.translations, lang)
+            embed = discord.Embed(
+                title=self.translations.get('starter.confirm_title', lang),
+                description=self.translations.get('starter.confirm_description', lang,
+                                                nickname=session['pokemon_nickname'],
+                                                pokemon=pokemon_name),
+                color=0x2ecc71
+            )
+        else:
+            view = StarterSelectionView(user_id, server_id, self.db, self.translations, lang)
+            embed = discord.Embed(
+                title=self.translations.get('starter.choose_starter', lang),
+                description=self.translations.get('starter.starter_description', lang),
+                color=0x3498db
+            )
+        
+        await interaction.response.send_message(embed=embed, view=view, ephemeral=True)
+
+class PCBrowserView(discord.ui.View):
+    """Paginated PC storage browser; fetches the next page while the current one is on screen"""
+    
+    def __init__(self, storage: PCStorage, user_id: str, filters: Dict, title: str):
+        super().__init__(timeout=300)
+        self.storage = storage
+        self.user_id = user_id
+        self.filters = filters
+        self.title = title
+        self.cursors = [None]  # cursor used to fetch each page shown so far
+        self.rows = []
+        self.next_cursor = None
+        self.prefetched = None  # (cursor, rows, next_cursor)
+        self.prefetch_task = None
+    
+    def load_first_page(self):
+        self.rows, self.next_cursor = self.storage.fetch_page(self.user_id, self.filters)
+    
+    def build_embed(self) -> discord.Embed:
+        embed = discord.Embed(title=self.title, color=0x9b59b6)
+        if not self.rows:
+            embed.description = "No Pokemon found in storage."
+            return embed
+        
+        lines = []
+        for pokemon in self.rows:
+            species = self.storage.catalog.get(pokemon['species_id']) or {}
+            type_emoji = TypeEffectiveness.TYPE_EMOJIS.get(species.get('type1'), '❓')
+            name = pokemon['nickname'] or species.get('name', '???')
+            lines.append(f"{type_emoji} **{name}** (Lv.{pokemon['level']}) `#{short_id(pokemon['id'])}`")
+        embed.description = "\n".join(lines)
+        embed.set_footer(text=f"Page {len(self.cursors)}")
+        return embed
+    
+    def refresh_buttons(self):
+        self.previous_page.disabled = len(self.cursors) <= 1
+        self.next_page.disabled = self.next_cursor is None
+    
+    def schedule_prefetch(self):
+        """Load the following page in the background so Next is instant"""
+        self.prefetched = None
+        if self.next_cursor is None:
+            return
+        cursor = self.next_cursor
+        
+        async def prefetch():
+            rows, next_cursor = self.storage.fetch_page(self.user_id, self.filters, cursor)
+            self.prefetched = (cursor, rows, next_cursor)
+        
+        self.prefetch_task = asyncio.create_task(prefetch())
+    
+    async def show(self, interaction: discord.Interaction):
+        self.refresh_buttons()
+        await edit_response(interaction, embed=self.build_embed(), view=self)
+        self.schedule_prefetch()
+    
+    @discord.ui.button(label='◀ Previous', style=discord.ButtonStyle.secondary)
+    async def previous_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        self.cursors.pop()
+        cursor = self.cursors[-1]
+        self.rows, self.next_cursor = self.storage.fetch_page(self.user_id, self.filters, cursor)
+        await self.show(interaction)
+    
+    @discord.ui.button(label='Next ▶', style=discord.ButtonStyle.primary)
+    async def next_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        cursor = self.next_cursor
+        if self.prefetch_task and not self.prefetch_task.done():
+            await self.prefetch_task
+        if self.prefetched and self.prefetched[0] == cursor:
+            _, self.rows, self.next_cursor = self.prefetched
+        else:
+            self.rows, self.next_cursor = self.storage.fetch_page(self.user_id, self.filters, cursor)
+        self.cursors.append(cursor)
+        await self.show(interaction)
 
 class AdminSetupView(discord.ui.View):
     """Admin setup dashboard for server configuration"""
@@ -1034,6 +4532,7 @@ class ChannelSetupModal(discord.ui.Modal):
         # Update channel
         update_query = f"UPDATE servers SET {column} = %s WHERE id = %s"
         self.db.execute_query(update_query, (channel_id, server_id))
+        interaction.client.context_loader.invalidate_server(server_id)
         
         # If starter channel, create persistent button
         if self.channel_type == 'starter':
@@ -1066,7 +4565,7 @@ class ChannelSetupModal(discord.ui.Modal):
             view = PersistentStarterView(self.db, self.translations)
             
             # Send message
-            message = await channel.send(embed=embed, view=view)
+            message = await interaction.client.outbound.send(channel, embed=embed, view=view)
             
             # Store in database
             button_manager = PersistentButtonManager(self.db)
@@ -1107,6 +4606,7 @@ class LanguageSelectView(discord.ui.View):
         ON DUPLICATE KEY UPDATE language = VALUES(language)
         """
         self.db.execute_query(server_query, (server_id, interaction.guild.name, language))
+        interaction.client.context_loader.invalidate_server(server_id)
         
         lang_name = "English" if language == "en" else "Español"
         await interaction.response.send_message(
@@ -1114,46 +4614,161 @@ class LanguageSelectView(discord.ui.View):
             ephemeral=True
         )
 
-class PokemonBot(commands.Bot):
+# SHARD_MODE 'auto' runs every shard in this process; 'process' runs one shard per process
+BotBase = commands.AutoShardedBot if SHARD_MODE == 'auto' else commands.Bot
+
+class PokemonBot(BotBase):
     """Main Pokemon Battle Bot"""
     
     def __init__(self):
         intents = discord.Intents.default()
         intents.message_content = True
         intents.guilds = True
-        super().__init__(command_prefix='!', intents=intents)
+        self.outbound = OutboundScheduler()
+        
+        shard_options = {}
+        if SHARD_MODE == 'auto' and SHARD_COUNT > 1:
+            shard_options['shard_count'] = SHARD_COUNT
+        elif SHARD_MODE == 'process':
+            shard_options.update(shard_id=SHARD_ID, shard_count=SHARD_COUNT)
+        
+        super().__init__(command_prefix='!', intents=intents,
+                         http_trace=self.outbound.trace_config(), **shard_options)
         
         # Initialize systems
         self.db = DatabaseManager()
         self.translations = TranslationManager()
         self.button_manager = PersistentButtonManager(self.db)
         self.button_manager.set_bot(self)
-        self.battle_manager = BattleManager(self.db)
+        if SHARD_MODE == 'process':
+            self.battle_manager = BattleManager(self.db, SHARD_ID, SHARD_COUNT)
+            self.broker = BrokerClient(SHARD_ID)
+        else:
+            self.battle_manager = BattleManager(self.db)
+            self.broker = None
+        self.context_loader = ContextLoader(self.db, self.battle_manager.moves)
+        self.pipeline = InteractionPipeline()
+        self.loop_monitor = LoopMonitor()
+        self.work_queue = BackgroundWorkQueue()
+        self.pending_starters = PendingStarterStore(self.db)
+        self.species_catalog = SpeciesCatalog(self.db)
+        self.inventory = InventoryService(self.db)
+        self.counters = CounterBuffer(self.db)
+        self.achievements = AchievementEngine(self.db, self.counters)
+        self.battle_manager.add_listener(self.achievements.on_battle_event)
+        self.battle_manager.add_listener(self.counters.on_battle_event)
+        self.battle_archive = BattleArchive(self.db)
+        self.tournaments = TournamentManager(self.db, self.battle_manager, self.outbound, self.get_channel)
+        self.pc_storage = PCStorage(self.db, self.species_catalog)
+        self.trades = TradeManager(self.db, self.battle_manager, self.context_loader)
+        self.wild = WildSpawner(self.db, self.species_catalog, self.battle_manager.moves,
+                                self.outbound, self.get_channel)
         
         # Activity configuration
         self.activity_base_url = "https://monkepo.corebots.guru"  # Replace with your Activity URL
 
         # Store views for persistence
         self.persistent_views_added = False
+        self.startup_task = None
+        self.commands_synced = False
     
     async def setup_hook(self):
-        """Called when bot is starting up"""
-        # Connect to database
-        await self.db.connect()
+        """Called when bot is starting up.
+        
+        Only what interactions need is awaited here (the gateway connects
+        once this returns); independent steps run concurrently and anything
+        that needs the guild cache or the network continues in the background.
+        """
+        started = time.perf_counter()
+        
+        # Phase 1: connections
+        await self._startup_phase('connect', self.db.connect(), self._connect_broker())
+        
+        if LOOP_MONITOR_ENABLED:
+            self.loop_monitor.start()
+        
+        # Start background workers for side effects
+        # Table-wide sweeps (expired pending rows, archiving) only need one shard process
+        sweeps_tables = SHARD_MODE != 'process' or SHARD_ID == 0
+        self.work_queue.start()
+        self.pending_starters.start(sweep_table=sweeps_tables)
+        self.achievements.start()
+        self.counters.start()
+        self.battle_manager.timers.start()
+        if sweeps_tables:
+            self.battle_archive.start()
+        if FEATURES['WILD_POKEMON']:
+            self.wild.start()
         
         # Add persistent views
         if not self.persistent_views_added:
             self.add_view(PersistentStarterView(self.db, self.translations))
+            self.add_dynamic_items(ChallengeButton)
             self.persistent_views_added = True
         
-        # Restore persistent buttons
-        await self.button_manager.restore_buttons_on_startup()
+        # Phase 2: warm-ups that don't depend on each other
+        await self._startup_phase(
+            'warm-up',
+            asyncio.to_thread(self.translations.load_translations),
+            self._warm_catalogs()
+        )
+        
+        # Phase 3: needs the guild cache, so it waits for the gateway
+        self.startup_task = asyncio.create_task(self._after_ready())
         
-        print(f"🤖 {self.user} is ready!")
+        print(f"🤖 {self.user} is ready! (setup took {(time.perf_counter() - started) * 1000:.0f} ms)")
+    
+    async def _startup_phase(self, name: str, *steps):
+        """Run a startup phase's steps concurrently and log how long it took"""
+        started = time.perf_counter()
+        results = await asyncio.gather(*steps, return_exceptions=True)
+        for result in results:
+            if isinstance(result, Exception):
+                print(f"❌ Startup phase '{name}' step failed: {result}")
+        print(f"⏱️ Startup phase '{name}': {(time.perf_counter() - started) * 1000:.0f} ms")
+    
+    async def _connect_broker(self):
+        """Join the other shard processes"""
+        if self.broker and await self.broker.connect():
+            self.context_loader.attach_broker(self.broker)
+            self.inventory.attach_broker(self.broker)
+            self.broker.subscribe('battle.get', self.battle_manager.active_battles.get)
+    
+    async def _warm_catalogs(self):
+        self.species_catalog.ensure_loaded()
+        self.battle_manager.moves.ensure_loaded()
+    
+    async def _after_ready(self):
+        await self.wait_until_ready()
+        
+        async def resume_tournaments():
+            # Start any matches that became playable while offline
+            if FEATURES['TOURNAMENTS']:
+                for tournament, ready in self.tournaments.restore():
+                    await self.tournaments.launch(tournament, ready)
+        
+        await self._startup_phase(
+            'restore',
+            self.button_manager.restore_buttons_on_startup(),
+            resume_tournaments()
+        )
     
     async def close(self):
         """Called when bot is shutting down"""
+        if self.startup_task:
+            self.startup_task.cancel()
+        await self.pending_starters.stop()
+        await self.achievements.stop()
+        await self.counters.stop()  # after achievements, whose flush queues coin rewards
+        await self.battle_archive.stop()
+        await self.battle_manager.timers.stop()
+        await self.wild.stop()
+        await self.work_queue.stop()
+        await self.outbound.flush()
+        if self.broker:
+            await self.broker.close()
         await self.db.disconnect()
+        await self.loop_monitor.stop()
         await super().close()
 
 # Initialize bot
@@ -1187,7 +4802,72 @@ async def debug_commands(interaction: discord.Interaction):
     except Exception as e:
         await interaction.response.send_message(f"Error: {e}", ephemeral=True)
 
+@bot.tree.command(name="mkp-metrics")
+async def metrics_command(interaction: discord.Interaction):
+    """Admin: show handler latency and background queue health"""
+    if not interaction.user.guild_permissions.administrator:
+        await interaction.response.send_message("Admin only!", ephemeral=True)
+        return
+    
+    embed = discord.Embed(title="📈 Bot Metrics", color=0x3498db)
+    
+    queue = bot.work_queue.stats()
+    embed.add_field(
+        name="🧵 Work Queue",
+        value=(
+            f"**Depth:** {queue['depth']}/{queue['capacity']}\n"
+            f"**Processed:** {queue['processed']} • **Retried:** {queue['retried']}\n"
+            f"**Failed:** {queue['failed']} • **Dropped:** {queue['dropped']}"
+        ),
+        inline=False
+    )
+    
+    outbound = bot.outbound.stats()
+    embed.add_field(
+        name="📤 Outbound",
+        value=(
+            f"**Pending:** {outbound['pending']} • **Events:** {outbound['events']}\n"
+            f"**Messages:** {outbound['messages']} • **429s:** {outbound['rate_limited']}"
+        ),
+        inline=False
+    )
+    
+    embed.add_field(name="🗄️ Database", value=f"**Queries:** {bot.db.query_count}", inline=False)
+    
+    timers = bot.battle_manager.timers
+    embed.add_field(
+        name="⏱️ Battle Timers",
+        value=f"**Active battles:** {len(bot.battle_manager.active_battles)} • "
+              f"**Deadlines:** {len(timers)} • **Fired:** {timers.fired}",
+        inline=False
+    )
+
+    loop = bot.loop_monitor.stats()
+    embed.add_field(
+        name="🌀 Event Loop",
+        value=(
+            f"**Lag:** {loop['lag_p50_ms']}ms p50 • {loop['lag_p99_ms']}ms p99 • {loop['lag_max_ms']}ms max\n"
+            f"**Stalls:** {loop['stalls']} ({loop['stalled_s']}s blocked)"
+            if loop['enabled'] else "Monitor off (`/mkp-loop on`)"
+        ),
+        inline=False
+    )
+
+    handlers = bot.pipeline.stats()
+    handler_lines = [
+        f"`{name}` {data['avg_ms']}ms avg ({data['calls']} calls)"
+        for name, data in sorted(handlers.items())
+    ]
+    embed.add_field(
+        name="⏱️ Handlers",
+        value="\n".join(handler_lines) or "No interactions yet",
+        inline=False
+    )
+    
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
 @bot.tree.command(name="mkp-battle")
+@tracked('mkp-battle')
 async def battle_command(interaction: discord.Interaction, opponent: discord.Member = None):
     """
     Start a Pokemon battle or open practice arena
@@ -1196,27 +4876,25 @@ async def battle_command(interaction: discord.Interaction, opponent: discord.Mem
     opponent: Another trainer to battle (optional - if none, opens practice mode)
     """
     user_id = str(interaction.user.id)
-    server_id = str(interaction.guild.id)
+    await bot.pipeline.maybe_defer(interaction, 'mkp-battle', ephemeral=opponent is None)
     
-    # Get server language
-    lang_query = "SELECT language FROM servers WHERE id = %s"
-    server_config = bot.db.execute_fetchone(lang_query, (server_id,))
-    lang = server_config['language'] if server_config else 'en'
+    # Server language, trainer check and team in one round trip
+    ctx = await bot.context_loader.load(interaction)
+    lang = ctx.lang
     
-    # Check if user exists and has Pokemon
-    user_query = "SELECT id FROM users WHERE id = %s"
-    if not bot.db.execute_fetchone(user_query, (user_id,)):
-        await interaction.response.send_message(
-            bot.translations.get('errors.user_not_found', lang),
+    if not ctx.user_exists:
+        await send_response(
+            interaction,
+            content=bot.translations.get('errors.user_not_found', lang),
             ephemeral=True
         )
         return
     
-    # Get user's team
-    team = await bot.battle_manager.get_user_team(user_id)
+    team = ctx.team
     if len(team) < 3:
-        await interaction.response.send_message(
-            "❌ You need at least 3 Pokemon to battle! Complete your starter journey first.",
+        await send_response(
+            interaction,
+            content="❌ You need at least 3 Pokemon to battle! Complete your starter journey first.",
             ephemeral=True
         )
         return
@@ -1224,11 +4902,12 @@ async def battle_command(interaction: discord.Interaction, opponent: discord.Mem
     if opponent:
         # PvP Battle (future implementation)
         opponent_id = str(opponent.id)
-        opponent_team = await bot.battle_manager.get_user_team(opponent_id)
+        opponent_team = await bot.context_loader.get_team(opponent_id, bot.battle_manager)
         
         if len(opponent_team) < 3:
-            await interaction.response.send_message(
-                f"❌ {opponent.display_name} doesn't have enough Pokemon to battle!",
+            await send_response(
+                interaction,
+                content=f"❌ {opponent.display_name} doesn't have enough Pokemon to battle!",
                 ephemeral=True
             )
             return
@@ -1248,7 +4927,7 @@ async def battle_command(interaction: discord.Interaction, opponent: discord.Mem
         
         embed.add_field(
             name="⏱️ Time Limit",
-            value="60 seconds per turn\n30 minute battle limit",
+            value=f"{TURN_TIMEOUT} seconds per turn\n{BATTLE_TIMEOUT} minute battle limit",
             inline=True
         )
         
@@ -1281,22 +4960,16 @@ async def battle_command(interaction: discord.Interaction, opponent: discord.Mem
             inline=True
         )
         
-        # Battle acceptance view (implement later)
-        view = discord.ui.View()
-        accept_button = discord.ui.Button(
-            label="✅ Accept Challenge",
-            style=discord.ButtonStyle.success,
-            custom_id=f"accept_battle_{user_id}"
-        )
-        decline_button = discord.ui.Button(
-            label="❌ Decline",
-            style=discord.ButtonStyle.danger,
-            custom_id="decline_battle"
-        )
-        view.add_item(accept_button)
-        view.add_item(decline_button)
+        expires_at = int(time.time()) + CHALLENGE_TIMEOUT
+        embed.set_footer(text=f"⌛ Challenge expires in {CHALLENGE_TIMEOUT // 60} minutes")
         
-        await interaction.response.send_message(
+        # Stateless buttons: the challenge lives in their custom_ids, not in the view store
+        view = discord.ui.View(timeout=None)
+        view.add_item(ChallengeButton('accept', user_id, opponent_id, expires_at))
+        view.add_item(ChallengeButton('decline', user_id, opponent_id, expires_at))
+        
+        await send_response(
+            interaction,
             content=f"{opponent.mention}",
             embed=embed,
             view=view
@@ -1354,12 +5027,12 @@ async def battle_command(interaction: discord.Interaction, opponent: discord.Mem
             lang
         )
         
-        await interaction.response.send_message(embed=embed, view=view, ephemeral=True)
+        await send_response(interaction, embed=embed, view=view, ephemeral=True)
 
 @bot.tree.command(name="mkp-arena")
 async def arena_command(interaction: discord.Interaction):
     """Quick access to the Pokemon Battle Arena"""
-    await battle_command(interaction)
+    await battle_command.callback(interaction)
 
 # ========================================
 # BATTLE STATE API ENDPOINTS (for Activity)
@@ -1371,15 +5044,8 @@ async def battle_info(interaction: discord.Interaction, battle_id: str = None):
     user_id = str(interaction.user.id)
     
     if not battle_id:
-        # Show user's recent battles
-        battles_query = """
-        SELECT id, player1_id, player2_id, status, started_at
-        FROM battles 
-        WHERE player1_id = %s OR player2_id = %s
-        ORDER BY started_at DESC
-        LIMIT 5
-        """
-        battles = bot.db.execute_query(battles_query, (user_id, user_id), fetch=True) or []
+        # Show user's recent battles (from the per-trainer index, archived ones included)
+        battles = bot.battle_manager.history.recent(user_id, 5)
         
         if not battles:
             await interaction.response.send_message("No battles found.", ephemeral=True)
@@ -1387,53 +5053,176 @@ async def battle_info(interaction: discord.Interaction, battle_id: str = None):
         
         embed = discord.Embed(title="Your Recent Battles", color=0x3498db)
         for battle in battles:
-            opponent_id = battle['player2_id'] if battle['player1_id'] == user_id else battle['player1_id']
+            opponent_id = battle['opponent_id']
             opponent = "Practice Mode" if not opponent_id else f"<@{opponent_id}>"
             
             embed.add_field(
-                name=f"Battle {battle['id'][:8]}...",
-                value=f"**Status:** {battle['status']}\n**Opponent:** {opponent}\n**Started:** {battle['started_at']}",
+                name=f"Battle #{short_id(battle['battle_id'])}",
+                value=f"`{battle['battle_id']}`\n**Status:** {battle['status']}\n**Opponent:** {opponent}\n**Started:** {battle['started_at']}",
                 inline=True
             )
         
         await interaction.response.send_message(embed=embed, ephemeral=True)
     
     else:
-        # Show specific battle info
-        if battle_id in bot.battle_manager.active_battles:
-            battle_state = bot.battle_manager.active_battles[battle_id]
+        # Show specific battle info (asking the owning process if it isn't ours)
+        battle_state = bot.battle_manager.active_battles.get(battle_id)
+        if not battle_state and bot.broker and not bot.battle_manager.is_local(battle_id):
+            battle_state = await bot.broker.request(
+                bot.battle_manager.owner_of(battle_id), 'battle.get', battle_id
+            )
+        
+        if battle_state:
             embed = discord.Embed(
-                title=f"Battle {battle_id[:8]}...",
+                title=f"Battle #{short_id(battle_id)}",
                 description=f"**Status:** {battle_state['status']}\n**Turn:** {battle_state['turn']}",
                 color=0x2ecc71
             )
             await interaction.response.send_message(embed=embed, ephemeral=True)
-        else:
+            return
+        
+        # Finished battles come from the record, wherever it is stored
+        battle = bot.battle_archive.find(battle_id)
+        if not battle:
             await interaction.response.send_message("Battle not found or inactive.", ephemeral=True)
+            return
+        
+        winner = f"<@{battle['winner_id']}>" if battle['winner_id'] else "None"
+        embed = discord.Embed(
+            title=f"Battle #{short_id(battle_id)}",
+            description=f"**Status:** {battle['status']}\n**Turns:** {battle['turn_count']}\n**Winner:** {winner}",
+            color=0x95a5a6
+        )
+        for player_id, (team_data, _, _) in battle['participants'].items():
+            team = json.loads(team_data) if isinstance(team_data, str) else team_data
+            members = [dict(zip(BattleManager.SNAPSHOT_FIELDS, entry)) for entry in team['team']]
+            embed.add_field(
+                name="Team",
+                value=f"<@{player_id}>\n" + "\n".join(f"{m['nickname']} (Lv. {m['level']})" for m in members),
+                inline=True
+            )
+        if battle['archived']:
+            embed.set_footer(text="🗄️ Archived")
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+@bot.tree.command(name="mkp-loop")
+async def loop_command(interaction: discord.Interaction, action: str = 'status'):
+    """Admin: event-loop lag and slowest stalls (status, on, off, reset)"""
+    if not interaction.user.guild_permissions.administrator:
+        await interaction.response.send_message("Admin only!", ephemeral=True)
+        return
+    
+    monitor = bot.loop_monitor
+    action = action.lower()
+    if action == 'on':
+        monitor.start()
+    elif action == 'off':
+        await monitor.stop()
+    elif action == 'reset':
+        monitor.reset()
+    elif action != 'status':
+        await interaction.response.send_message("❌ Use status, on, off or reset.", ephemeral=True)
+        return
+    
+    loop = monitor.stats()
+    embed = discord.Embed(
+        title="🌀 Event Loop Health",
+        description=f"Monitor is **{'on' if loop['enabled'] else 'off'}** • "
+                    f"stalls over {monitor.threshold * 1000:.0f} ms are recorded",
+        color=0x2ecc71 if loop['enabled'] else 0x95a5a6
+    )
+    embed.add_field(
+        name="⏱️ Scheduling Lag",
+        value=f"**p50:** {loop['lag_p50_ms']}ms • **p99:** {loop['lag_p99_ms']}ms • **max:** {loop['lag_max_ms']}ms",
+        inline=False
+    )
+    
+    culprit_lines = [
+        f"`{name}` {count}× • {total_ms}ms"
+        for name, count, total_ms in loop['culprits'][:10]
+    ]
+    embed.add_field(
+        name=f"🐢 Stalls ({loop['stalls']}, {loop['stalled_s']}s blocked)",
+        value="\n".join(culprit_lines) or "None recorded",
+        inline=False
+    )
+    
+    # The slowest stall's innermost frames show what was blocking
+    if loop['slowest']:
+        seconds, at, culprit, stack = loop['slowest'][0]
+        frames = "".join(stack.splitlines(keepends=True)[-8:])[-900:] or "(no stack captured)"
+        embed.add_field(
+            name=f"🔍 Slowest: {seconds * 1000:.0f}ms in {culprit} at {datetime.fromtimestamp(at):%H:%M:%S}",
+            value=f"```\n{frames}```",
+            inline=False
+        )
+    
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
+@bot.tree.command(name="mkp-stats")
+async def stats_command(interaction: discord.Interaction, opponent: discord.User = None):
+    """
+    Your battle record, or your head-to-head record against another trainer
+    
+    Parameters:
+    opponent: Show only battles against this trainer
+    """
+    user_id = str(interaction.user.id)
+    opponent_id = str(opponent.id) if opponent else None
+    history = bot.battle_manager.history
+    
+    record = history.record(user_id, opponent_id)
+    if not record['battles']:
+        await interaction.response.send_message("No battles found.", ephemeral=True)
+        return
+    
+    decided = record['wins'] + record['losses']
+    win_rate = f"{record['wins'] / decided:.0%}" if decided else "-"
+    title = f"⚔️ Head-to-head vs {opponent.display_name}" if opponent else f"📊 {interaction.user.display_name}'s Battle Record"
+    embed = discord.Embed(
+        title=title,
+        description=f"**Battles:** {record['battles']} • **Wins:** {record['wins']} • "
+                    f"**Losses:** {record['losses']} • **Win rate:** {win_rate}",
+        color=0x3498db
+    )
+    if not opponent:
+        trainer = bot.counters.read(user_id)  # includes changes not yet written
+        if trainer:
+            embed.add_field(
+                name="Trainer",
+                value=f"**Streak:** {trainer['current_streak']} (best {trainer['best_streak']})\n"
+                      f"**XP:** {trainer['trainer_xp']} • **Coins:** {trainer['coins']} • "
+                      f"**Battle points:** {trainer['battle_points']}",
+                inline=False
+            )
+    
+    results = {'W': '✅ Win', 'L': '❌ Loss'}
+    lines = []
+    for battle in history.recent(user_id, 10, opponent_id):
+        against = f" vs <@{battle['opponent_id']}>" if battle['opponent_id'] and not opponent else ""
+        outcome = results.get(battle['result'], battle['status'].title())
+        lines.append(f"`{battle['battle_id']}` {outcome}{against} • {battle['started_at']:%Y-%m-%d}")
+    embed.add_field(name="Recent Battles", value="\n".join(lines), inline=False)
+    
+    await interaction.response.send_message(embed=embed, ephemeral=True)
 
 # Admin Commands
 @bot.tree.command(name="mkp-admin")
 async def admin_setup(interaction: discord.Interaction):
     """Configure Pokemon bot settings for this server"""
     
+    ctx = await bot.context_loader.load(interaction, with_team=False)
+    server_config = ctx.server_config
+    lang = ctx.lang
+    
     # Check permissions
     if not interaction.user.guild_permissions.administrator:
-        lang_query = "SELECT language FROM servers WHERE id = %s"
-        server_config = bot.db.execute_fetchone(lang_query, (str(interaction.guild.id),))
-        lang = server_config['language'] if server_config else 'en'
-        
         await interaction.response.send_message(
             bot.translations.get('admin.no_permission', lang),
             ephemeral=True
         )
         return
     
-    # Get server language
-    server_id = str(interaction.guild.id)
-    lang_query = "SELECT language FROM servers WHERE id = %s"
-    server_config = bot.db.execute_fetchone(lang_query, (server_id,))
-    lang = server_config['language'] if server_config else 'en'
-    
     # Create setup embed
     embed = discord.Embed(
         title=bot.translations.get('admin.setup_title', lang),
@@ -1464,6 +5253,7 @@ async def admin_setup(interaction: discord.Interaction):
 
 # Basic Pokemon commands
 @bot.tree.command(name="monkepo")
+@tracked('monkepo')
 async def pokemon_command(interaction: discord.Interaction, action: str):
     """
     Pokemon management commands
@@ -1471,42 +5261,26 @@ async def pokemon_command(interaction: discord.Interaction, action: str):
     Parameters:
     action: Action to perform (list, stats, heal)
     """
-    user_id = str(interaction.user.id)
-    server_id = str(interaction.guild.id)
+    await bot.pipeline.maybe_defer(interaction, 'monkepo', ephemeral=False)
     
-    # Get server language
-    lang_query = "SELECT language FROM servers WHERE id = %s"
-    server_config = bot.db.execute_fetchone(lang_query, (server_id,))
-    lang = server_config['language'] if server_config else 'en'
+    # Server language, trainer check and team in one round trip
+    ctx = await bot.context_loader.load(interaction)
+    lang = ctx.lang
     
     if action.lower() == "list":
-        # Check if user exists
-        user_query = "SELECT id FROM users WHERE id = %s"
-        if not bot.db.execute_fetchone(user_query, (user_id,)):
-            await interaction.response.send_message(
-                bot.translations.get('errors.user_not_found', lang),
+        if not ctx.user_exists:
+            await send_response(
+                interaction,
+                content=bot.translations.get('errors.user_not_found', lang),
                 ephemeral=True
             )
             return
         
-        # Get user's Pokemon with calculated stats
-        pokemon_query = """
-        SELECT 
-            p.id, p.nickname, p.level, p.experience, p.is_starter, p.team_slot,
-            p.current_hp, p.status_condition, p.hp_iv, p.attack_iv, p.defense_iv,
-            p.sp_attack_iv, p.sp_defense_iv, p.speed_iv,
-            s.name as species_name, s.type1, s.type2, s.pokedex_number,
-            s.base_hp, s.base_attack, s.base_defense, s.base_sp_attack, s.base_sp_defense, s.base_speed
-        FROM pokemon p
-        JOIN pokemon_species s ON p.species_id = s.id
-        WHERE p.user_id = %s AND p.is_active = TRUE
-        ORDER BY p.team_slot
-        """
-        pokemon_list = bot.db.execute_query(pokemon_query, (user_id,), fetch=True) or []
-        
+        pokemon_list = ctx.team
         if not pokemon_list:
-            await interaction.response.send_message(
-                bot.translations.get('errors.pokemon_not_found', lang),
+            await send_response(
+                interaction,
+                content=bot.translations.get('errors.pokemon_not_found', lang),
                 ephemeral=True
             )
             return
@@ -1518,26 +5292,8 @@ async def pokemon_command(interaction: discord.Interaction, action: str):
         )
         
         for i, pokemon in enumerate(pokemon_list, 1):
-            # Calculate current stats
-            base_stats = {
-                'hp': pokemon['base_hp'],
-                'attack': pokemon['base_attack'], 
-                'defense': pokemon['base_defense'],
-                'sp_attack': pokemon['base_sp_attack'],
-                'sp_defense': pokemon['base_sp_defense'],
-                'speed': pokemon['base_speed']
-            }
-            
-            ivs = {
-                'hp': pokemon['hp_iv'],
-                'attack': pokemon['attack_iv'],
-                'defense': pokemon['defense_iv'], 
-                'sp_attack': pokemon['sp_attack_iv'],
-                'sp_defense': pokemon['sp_defense_iv'],
-                'speed': pokemon['speed_iv']
-            }
-            
-            final_stats = IVGenerator.calculate_stats(base_stats, ivs, pokemon['level'])
+            final_stats = pokemon['stats']
+            ivs = pokemon['ivs']
             
             # Get type emojis
             type1_emoji = TypeEffectiveness.TYPE_EMOJIS.get(pokemon['type1'], '❓')
@@ -1548,21 +5304,21 @@ async def pokemon_command(interaction: discord.Interaction, action: str):
                 type1_emoji += type2_emoji
             
             # Calculate current HP
-            current_hp = pokemon['current_hp'] or final_stats['hp']
+            current_hp = pokemon['current_hp']
             hp_percentage = current_hp / final_stats['hp']
             hp_bar = "█" * int(hp_percentage * 10)
             hp_bar += "░" * (10 - len(hp_bar))
             
             # Status indicator
             status = ""
-            if pokemon['status_condition'] != 'HEALTHY':
+            if pokemon['status'] != 'HEALTHY':
                 status_emojis = {
                     'BURN': '🔥', 'POISON': '🟣', 'PARALYSIS': '⚡', 'SLEEP': '💤'
                 }
-                status = f" {status_emojis.get(pokemon['status_condition'], '❓')}"
+                status = f" {status_emojis.get(pokemon['status'], '❓')}"
             
             starter_mark = " ⭐" if pokemon['is_starter'] else ""
-            nickname = pokemon['nickname'] or pokemon['species_name']
+            nickname = pokemon['nickname']
             
             # Get IV quality
             quality = IVGenerator.get_iv_quality(ivs)
@@ -1571,30 +5327,440 @@ async def pokemon_command(interaction: discord.Interaction, action: str):
             embed.add_field(
                 name=f"Slot {i}: {type1_emoji} {nickname}{starter_mark}",
                 value=(
-                    f"**{pokemon['species_name']}** • Level {pokemon['level']}\n"
+                    f"**{pokemon['species']}** • Level {pokemon['level']}\n"
                     f"HP: {hp_bar} {current_hp}/{final_stats['hp']}{status}\n"
                     f"Type: {type_display} • Quality: {quality_text}\n"
-                    f"XP: {pokemon['experience']}"
+                    f"XP: {pokemon['experience']}\n"
+                    f"Moves: {', '.join(move['name'] for move in pokemon.get('moves', [])) or '—'}"
                 ),
                 inline=True
             )
         
+        await send_response(interaction, embed=embed)
+    
+    elif action.lower() == "heal":
+        if not ctx.user_exists:
+            await send_response(
+                interaction,
+                content=bot.translations.get('errors.user_not_found', lang),
+                ephemeral=True
+            )
+            return
+        
+        # Spend as many potions as each damaged Pokemon needs, while they last
+        potions = bot.inventory.get_inventory(ctx.user_id).get('POTION', 0)
+        heal_amount = InventoryService.ITEMS['POTION'][1]['heal']
+        uses = []
+        for pokemon in ctx.team:
+            missing = pokemon['max_hp'] - pokemon['current_hp']
+            while missing > 0 and potions > 0:
+                uses.append(('POTION', pokemon))
+                missing -= heal_amount
+                potions -= 1
+        
+        if not uses:
+            await send_response(interaction, content="✅ Your team doesn't need healing (or you're out of Potions).",
+                                ephemeral=True)
+            return
+        
+        healed = bot.inventory.apply_items(ctx.user_id, uses)
+        if healed is None:
+            await send_response(interaction, content="❌ You don't have enough Potions.", ephemeral=True)
+            return
+        bot.context_loader.invalidate_user(ctx.user_id)
+        
+        lines = [f"💚 **{pokemon['nickname']}** {pokemon['current_hp']}/{pokemon['max_hp']} HP" for pokemon in healed]
+        await send_response(
+            interaction,
+            content=f"Used {len(uses)} Potion(s):\n" + "\n".join(lines),
+            ephemeral=True
+        )
+    
+    else:
+        await send_response(
+            interaction,
+            content=bot.translations.get('errors.invalid_command', lang),
+            ephemeral=True
+        )
+
+@bot.tree.command(name="mkp-pc")
+@app_commands.rename(pokemon_type='type')
+@tracked('mkp-pc')
+async def pc_command(interaction: discord.Interaction, action: str = 'view',
+                     pokemon_type: str = None, level: int = None, name: str = None):
+    """
+    Browse your PC storage
+    
+    Parameters:
+    action: view or search
+    pokemon_type: Only show Pokemon of this type (search)
+    level: Only show Pokemon of this level (search)
+    name: Species name or exact nickname (search)
+    """
+    ctx = await bot.context_loader.load(interaction, with_team=False)
+    lang = ctx.lang
+    
+    if not ctx.user_exists:
+        await interaction.response.send_message(
+            bot.translations.get('errors.user_not_found', lang),
+            ephemeral=True
+        )
+        return
+    
+    action = action.lower()
+    if action not in ('view', 'search'):
+        await interaction.response.send_message(
+            bot.translations.get('errors.invalid_command', lang),
+            ephemeral=True
+        )
+        return
+    
+    filters = {}
+    if action == 'search':
+        filters = {'type': pokemon_type, 'level': level, 'name': name}
+    
+    title = f"💻 {interaction.user.display_name}'s PC"
+    if any(filters.values()):
+        title += " • " + ", ".join(f"{key}: {value}" for key, value in filters.items() if value)
+    
+    view = PCBrowserView(bot.pc_storage, ctx.user_id, filters, title)
+    view.load_first_page()
+    view.refresh_buttons()
+    await interaction.response.send_message(embed=view.build_embed(), view=view, ephemeral=True)
+    view.schedule_prefetch()
+
+@bot.tree.command(name="mkp-tournament")
+@tracked('mkp-tournament')
+async def tournament_command(interaction: discord.Interaction, action: str,
+                             name: str = None, format: str = 'single'):
+    """
+    Create, join and follow server tournaments
+    
+    Parameters:
+    action: create, join, start or status
+    name: Tournament name (create)
+    format: single, double or swiss (create)
+    """
+    ctx = await bot.context_loader.load(interaction, with_team=False)
+    lang = ctx.lang
+    
+    if not FEATURES['TOURNAMENTS']:
+        await interaction.response.send_message("🚧 Tournaments are not available yet!", ephemeral=True)
+        return
+    
+    if not ctx.user_exists:
+        await interaction.response.send_message(
+            bot.translations.get('errors.user_not_found', lang),
+            ephemeral=True
+        )
+        return
+    
+    manager = bot.tournaments
+    tournament = manager.for_server(ctx.server_id)
+    action = action.lower()
+    
+    if action == 'create':
+        if not interaction.user.guild_permissions.administrator:
+            await interaction.response.send_message("Admin only!", ephemeral=True)
+            return
+        if tournament:
+            await interaction.response.send_message(
+                f"❌ **{tournament.name}** is already running on this server!", ephemeral=True
+            )
+            return
+        format = format.lower()
+        if format not in Tournament.FORMATS:
+            await interaction.response.send_message(
+                f"❌ Format must be one of: {', '.join(Tournament.FORMATS)}", ephemeral=True
+            )
+            return
+        
+        tournament = manager.create(
+            ctx.server_id, str(interaction.channel_id), name or f"{interaction.guild.name} Cup",
+            format, ctx.user_id
+        )
+        embed = discord.Embed(
+            title=f"🏟️ {tournament.name}",
+            description=f"A **{format}** tournament is open!\nUse `/mkp-tournament join` to enter.",
+            color=0xe67e22
+        )
         await interaction.response.send_message(embed=embed)
     
+    elif action == 'join':
+        if not tournament or tournament.status != 'OPEN':
+            await interaction.response.send_message("❌ No tournament is open for entries.", ephemeral=True)
+            return
+        team = await bot.context_loader.get_team(ctx.user_id, bot.battle_manager)
+        if len(team) < 3:
+            await interaction.response.send_message(
+                "❌ You need at least 3 Pokemon to enter a tournament!", ephemeral=True
+            )
+            return
+        if not manager.join(tournament, ctx.user_id):
+            await interaction.response.send_message("❌ You're already entered!", ephemeral=True)
+            return
+        await interaction.response.send_message(
+            f"✅ Entered **{tournament.name}** ({len(tournament.players)} trainers)", ephemeral=True
+        )
+    
+    elif action == 'start':
+        if not tournament:
+            await interaction.response.send_message("❌ No tournament on this server.", ephemeral=True)
+            return
+        if ctx.user_id != tournament.created_by and not interaction.user.guild_permissions.administrator:
+            await interaction.response.send_message("Admin only!", ephemeral=True)
+            return
+        await interaction.response.defer()
+        if not await manager.start(tournament):
+            await interaction.followup.send(
+                f"❌ Need at least {TournamentManager.MIN_PLAYERS} trainers to start.", ephemeral=True
+            )
+            return
+        await interaction.followup.send(
+            f"🔔 **{tournament.name}** has started with {len(tournament.players)} trainers!"
+        )
+    
+    elif action == 'status':
+        if not tournament:
+            await interaction.response.send_message("❌ No tournament on this server.", ephemeral=True)
+            return
+        embed = discord.Embed(title=f"🏟️ {tournament.name}", color=0xe67e22)
+        embed.add_field(name="Format", value=tournament.format, inline=True)
+        embed.add_field(name="Status", value=tournament.status, inline=True)
+        embed.add_field(name="Trainers", value=str(len(tournament.players)), inline=True)
+        if tournament.status == 'RUNNING':
+            played = sum(1 for match in tournament.matches if match.result in '12')
+            embed.add_field(
+                name="Progress",
+                value=f"**Live matches:** {len(tournament.battles)}\n**Played:** {played}",
+                inline=False
+            )
+            if tournament.format == 'swiss':
+                scores = tournament.scores()
+                top = sorted(tournament.players, key=lambda p: -scores[p])[:10]
+                embed.add_field(
+                    name=f"Standings (round {tournament.swiss_rounds}/{tournament.total_swiss_rounds()})",
+                    value="\n".join(f"<@{player}> — {scores[player]}" for player in top),
+                    inline=False
+                )
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+    
+    else:
+        await interaction.response.send_message(
+            bot.translations.get('errors.invalid_command', lang),
+            ephemeral=True
+        )
+
+@bot.tree.command(name="mkp-trade")
+@tracked('mkp-trade')
+async def trade_command(interaction: discord.Interaction, action: str, trainer: discord.Member = None,
+                        give: str = None, receive: str = None, offer_id: str = None):
+    """
+    Trade Pokemon with another trainer
+    
+    Parameters:
+    action: offer, accept, decline or list
+    trainer: Who to trade with (offer)
+    give: ID of your Pokemon from /mkp-pc (offer)
+    receive: ID of their Pokemon from /mkp-pc (offer)
+    offer_id: Trade offer to accept or decline
+    """
+    ctx = await bot.context_loader.load(interaction, with_team=False)
+    lang = ctx.lang
+    
+    if not FEATURES['TRADING']:
+        await interaction.response.send_message("🚧 Trading is not available yet!", ephemeral=True)
+        return
+    
+    if not ctx.user_exists:
+        await interaction.response.send_message(
+            bot.translations.get('errors.user_not_found', lang),
+            ephemeral=True
+        )
+        return
+    
+    trades = bot.trades
+    action = action.lower()
+    
+    if action == 'offer':
+        if not trainer or not give or not receive:
+            await interaction.response.send_message(
+                "❌ Choose a trainer, the Pokemon you give and the Pokemon you want.", ephemeral=True
+            )
+            return
+        
+        offered, error = trades.find_pokemon(ctx.user_id, give)
+        requested, other_error = trades.find_pokemon(str(trainer.id), receive)
+        if not offered or not requested:
+            await interaction.response.send_message(f"❌ {error or other_error}", ephemeral=True)
+            return
+        
+        offer, error = trades.propose(ctx.user_id, str(trainer.id), offered, requested)
+        if not offer:
+            await interaction.response.send_message(f"❌ {error}", ephemeral=True)
+            return
+        
+        embed = discord.Embed(
+            title="🔁 Trade Offer",
+            description=(
+                f"**{interaction.user.display_name}** offers "
+                f"**{offered['nickname'] or offered['species_name']}** (Lv.{offered['level']})\n"
+                f"for **{requested['nickname'] or requested['species_name']}** (Lv.{requested['level']})"
+            ),
+            color=0x1abc9c
+        )
+        embed.set_footer(text=f"Accept with /mkp-trade accept offer_id:{offer['id']}")
+        await interaction.response.send_message(content=trainer.mention, embed=embed)
+    
+    elif action in ('accept', 'decline'):
+        offer = trades.offers.get(offer_id or '')
+        if not offer or ctx.user_id not in (offer['from_user'], offer['to_user']):
+            await interaction.response.send_message(
+                "❌ That trade offer doesn't exist or has expired.", ephemeral=True
+            )
+            return
+        
+        if action == 'decline':
+            trades.discard(offer['id'])
+            await interaction.response.send_message("🚫 Trade offer cancelled.", ephemeral=True)
+            return
+        
+        completed, error = trades.accept(offer['id'], ctx.user_id)
+        if not completed:
+            await interaction.response.send_message(f"❌ {error}", ephemeral=True)
+            return
+        trades.discard(offer['id'])
+        await interaction.response.send_message(
+            f"✅ Trade complete! <@{offer['from_user']}> and <@{offer['to_user']}> swapped Pokemon. "
+            f"Check your PC!"
+        )
+    
+    elif action == 'list':
+        offers = trades.offers_for(ctx.user_id)
+        lines = [
+            f"`{offer['id']}` {'➡️' if offer['from_user'] == ctx.user_id else '⬅️'} "
+            f"{offer['offered']['nickname'] or offer['offered']['species_name']} for "
+            f"{offer['requested']['nickname'] or offer['requested']['species_name']}"
+            for offer in offers
+        ]
+        embed = discord.Embed(
+            title="🔁 Your Trade Offers",
+            description="\n".join(lines) or "No pending offers.",
+            color=0x1abc9c
+        )
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+    
     else:
         await interaction.response.send_message(
             bot.translations.get('errors.invalid_command', lang),
             ephemeral=True
         )
 
+@bot.tree.command(name="mkp-catch")
+@tracked('mkp-catch')
+async def catch_command(interaction: discord.Interaction):
+    """Throw a Pokeball at the wild Pokemon in this channel"""
+    ctx = await bot.context_loader.load(interaction, with_team=False)
+    lang = ctx.lang
+    
+    if not FEATURES['WILD_POKEMON']:
+        await interaction.response.send_message("🚧 Wild Pokemon are not available yet!", ephemeral=True)
+        return
+    
+    if not ctx.user_exists:
+        await interaction.response.send_message(
+            bot.translations.get('errors.user_not_found', lang),
+            ephemeral=True
+        )
+        return
+    
+    channel_id = str(interaction.channel_id)
+    if channel_id not in bot.wild.encounters:
+        await interaction.response.send_message("🌿 There's no wild Pokemon here right now.", ephemeral=True)
+        return
+    
+    if not bot.inventory.consume(ctx.user_id, 'POKEBALL'):
+        await interaction.response.send_message("❌ You're out of Pokeballs!", ephemeral=True)
+        return
+    
+    encounter = bot.wild.claim(channel_id)
+    if not encounter:
+        # Someone else got there first; the ball wasn't really thrown
+        bot.inventory.grant(ctx.user_id, [('POKEBALL', 1)])
+        await interaction.response.send_message("💨 The wild Pokemon is gone!", ephemeral=True)
+        return
+    
+    species = bot.species_catalog.get(encounter['species_id'])
+    if bot.wild.catch(ctx.user_id, encounter):
+        await interaction.response.send_message(
+            f"🎉 {interaction.user.mention} caught a wild **{species['name']}** (Lv.{encounter['level']})! "
+            f"It was sent to the PC."
+        )
+    else:
+        await interaction.response.send_message(f"💨 The wild **{species['name']}** broke free and fled!")
+
+@bot.tree.command(name="mkp-spawns")
+async def spawns_command(interaction: discord.Interaction, channel: discord.TextChannel = None,
+                         common: int = None, uncommon: int = None, rare: int = None):
+    """
+    Admin: choose where wild Pokemon spawn (leave channel empty to turn spawns off)
+    
+    Parameters:
+    channel: Channel for wild encounters
+    common: Relative weight of common Pokemon
+    uncommon: Relative weight of uncommon Pokemon
+    rare: Relative weight of rare Pokemon
+    """
+    if not interaction.user.guild_permissions.administrator:
+        await interaction.response.send_message("Admin only!", ephemeral=True)
+        return
+    
+    weights = None
+    if common is not None or uncommon is not None or rare is not None:
+        weights = dict(WILD_RARITY_WEIGHTS)
+        for rarity, weight in (('COMMON', common), ('UNCOMMON', uncommon), ('RARE', rare)):
+            if weight is not None:
+                weights[rarity] = max(0, weight)
+        if not any(weights.values()):
+            await interaction.response.send_message("❌ At least one weight must be above 0.", ephemeral=True)
+            return
+    
+    bot.wild.configure(str(interaction.guild.id), str(channel.id) if channel else None, weights)
+    if channel:
+        shown = weights or WILD_RARITY_WEIGHTS
+        await interaction.response.send_message(
+            f"🌿 Wild Pokemon will appear in {channel.mention} "
+            f"({', '.join(f'{rarity.title()} {weight}' for rarity, weight in shown.items())})",
+            ephemeral=True
+        )
+    else:
+        await interaction.response.send_message("🌿 Wild spawns turned off.", ephemeral=True)
+
 @bot.event
 async def on_ready():
-    """Bot startup event"""
-    await safe_sync_commands()
+    """Bot startup event (also fires after every reconnect)"""
+    if bot.commands_synced:
+        return
+    # Only a sync that went through counts; otherwise the next reconnect tries again
+    bot.commands_synced = await safe_sync_commands()
+
+def command_tree_hash() -> str:
+    """Fingerprint of the local command tree, to tell whether Discord already has it"""
+    payload = [command.to_dict(bot.tree) for command in sorted(bot.tree.get_commands(), key=lambda c: c.name)]
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
 
-async def safe_sync_commands():
-    """Safely sync commands without affecting Entry Point commands"""
+async def safe_sync_commands() -> bool:
+    """Safely sync commands without affecting Entry Point commands; True once Discord has the tree"""
     try:
+        started = time.perf_counter()
+        tree_hash = command_tree_hash()
+        last_sync = bot.db.execute_fetchone(
+            "SELECT value FROM bot_state WHERE name = 'command_tree_hash'"
+        )
+        if last_sync and last_sync['value'] == tree_hash:
+            print("✅ Command tree unchanged since last sync, skipping")
+            return True
+        
         print("🔄 Starting command sync...")
         
         # Get existing commands first
@@ -1617,15 +5783,11 @@ async def safe_sync_commands():
                 # Alternative: Try to sync without clearing
                 try:
                     # Force sync by clearing local tree and re-adding
-                    await bot.tree.clear_commands(guild=None)
-                    
-                    # Re-add our commands
-                    bot.tree.add_command(battle_command)
-                    bot.tree.add_command(arena_command)
-                    bot.tree.add_command(battle_info)
-                    bot.tree.add_command(admin_setup)
-                    bot.tree.add_command(pokemon_command)
-                    bot.tree.add_command(debug_commands)  # Add the debug command
+                    # (from a snapshot, so every registered command comes back)
+                    local_tree = bot.tree.get_commands()
+                    bot.tree.clear_commands(guild=None)
+                    for command in local_tree:
+                        bot.tree.add_command(command)
                     
                     synced = await bot.tree.sync()
                     print(f"✅ Alternative sync successful: {len(synced)} command(s)")
@@ -1633,15 +5795,23 @@ async def safe_sync_commands():
                 except Exception as alt_error:
                     print(f"❌ Alternative sync failed: {alt_error}")
                     print("📝 Bot will still run but commands may not update")
+                    return False
             else:
                 print(f"❌ Other sync error: {e}")
                 raise e
         
+        bot.db.execute_query("""
+        INSERT INTO bot_state (name, value, updated_at) VALUES ('command_tree_hash', %s, %s)
+        ON DUPLICATE KEY UPDATE value = VALUES(value), updated_at = VALUES(updated_at)
+        """, (tree_hash, datetime.now()))
+        print(f"⏱️ Command sync: {(time.perf_counter() - started) * 1000:.0f} ms")
         print("🤖 Bot is ready to battle!")
+        return True
         
     except Exception as e:
         print(f"❌ Command sync failed: {e}")
         print("💡 Bot will still function, but commands may not be available")
+        return False
 
 @bot.event
 async def on_guild_join(guild):
@@ -1653,6 +5823,7 @@ async def on_guild_join(guild):
     ON DUPLICATE KEY UPDATE name = VALUES(name)
     """
     bot.db.execute_query(server_query, (str(guild.id), guild.name, datetime.now()))
+    bot.context_loader.invalidate_server(guild.id)
     print(f"Joined server: {guild.name}")
 
 # Error handling
@@ -1662,8 +5833,36 @@ async def on_command_error(ctx, error):
         return
     print(f"Command error: {error}")
 
+async def run_shard_processes(count: int):
+    """Run the state broker here and one bot process per shard"""
+    broker = StateBroker()
+    await broker.start()
+    
+    processes = []
+    for shard_id in range(count):
+        env = dict(os.environ, SHARD_MODE='process', SHARD_ID=str(shard_id), SHARD_COUNT=str(count))
+        processes.append(await asyncio.create_subprocess_exec(sys.executable, __file__, env=env))
+        print(f"🚀 Started shard {shard_id}/{count} (pid {processes[-1].pid})")
+    
+    try:
+        codes = await asyncio.gather(*(process.wait() for process in processes))
+        print(f"Shard processes exited with codes {codes}")
+    finally:
+        for process in processes:
+            if process.returncode is None:
+                process.terminate()
+        await broker.stop()
+
 if __name__ == "__main__":
     if DISCORD_BOT_TOKEN == 'your_bot_token_here':
         print("❌ Please set your Discord bot token in config.py!")
+    elif '--materialize-hp' in sys.argv:
+        async def materialize_hp():
+            if await bot.db.connect():
+                print(f"💚 Materialized regenerated HP for {HPRegeneration.materialize(bot.db)} Pokemon")
+                await bot.db.disconnect()
+        asyncio.run(materialize_hp())
+    elif '--shards' in sys.argv:
+        asyncio.run(run_shard_processes(int(sys.argv[sys.argv.index('--shards') + 1])))
     else:
         bot.run(DISCORD_BOT_TOKEN)
\ No newline at end of file
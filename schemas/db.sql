@@ -11,6 +11,12 @@ COLLATE utf8mb4_unicode_ci;
 USE pokemon_battle_bot;
 
 -- Drop existing tables in correct order (foreign keys first)
+DROP TABLE IF EXISTS user_battles;
+DROP TABLE IF EXISTS battle_archive;
+DROP TABLE IF EXISTS bot_state;
+DROP TABLE IF EXISTS tournaments;
+DROP TABLE IF EXISTS user_achievements;
+DROP TABLE IF EXISTS achievement_progress;
 DROP TABLE IF EXISTS pokemon_moves;
 DROP TABLE IF EXISTS pokemon;
 DROP TABLE IF EXISTS pokemon_movesets;
@@ -655,6 +661,217 @@ SET GLOBAL event_scheduler = ON;
 -- Success message
 SELECT 'Database updated successfully for persistent buttons and server configuration!' as status;
 
+-- =====================================================
+-- DATABASE UPDATES FOR PC STORAGE BROWSING
+-- Keyset pagination over (caught_at, id) per trainer, plus one index per
+-- /mkp-pc search filter so every page is an ordered index seek
+-- =====================================================
+
+CREATE INDEX idx_pc_browse ON pokemon (user_id, is_active, caught_at, id);
+CREATE INDEX idx_pc_species ON pokemon (user_id, is_active, species_id, caught_at, id);
+CREATE INDEX idx_pc_level ON pokemon (user_id, is_active, level, caught_at, id);
+CREATE INDEX idx_pc_nickname ON pokemon (user_id, is_active, nickname, caught_at, id);
+
+-- idx_pc_browse has the same leading columns
+DROP INDEX idx_user_active ON pokemon;
+
+-- =====================================================
+-- DATABASE UPDATES FOR ACHIEVEMENTS
+-- Achievement definitions live in code (AchievementEngine.ACHIEVEMENTS);
+-- these tables hold per-trainer counters and unlocks
+-- =====================================================
+
+CREATE TABLE achievement_progress (
+    user_id VARCHAR(20) NOT NULL,
+    counter VARCHAR(30) NOT NULL,  -- battles, wins, streak, starters
+    value INT NOT NULL DEFAULT 0,
+    
+    PRIMARY KEY (user_id, counter),
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+);
+
+CREATE TABLE user_achievements (
+    user_id VARCHAR(20) NOT NULL,
+    achievement_id VARCHAR(50) NOT NULL,
+    unlocked_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    
+    PRIMARY KEY (user_id, achievement_id),
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+);
+
+-- =====================================================
+-- DATABASE UPDATES FOR TOURNAMENTS
+-- The bracket is rebuilt from the seeded player list, so only the
+-- results string and the live battle map need to be stored
+-- =====================================================
+
+CREATE TABLE tournaments (
+    id VARCHAR(8) PRIMARY KEY,
+    server_id VARCHAR(20) NOT NULL,
+    channel_id VARCHAR(20) NULL,  -- Where pairings and results are announced
+    name VARCHAR(100) NOT NULL,
+    format VARCHAR(10) NOT NULL,  -- single, double, swiss
+    status VARCHAR(20) DEFAULT 'OPEN',  -- OPEN, RUNNING, COMPLETED
+    players JSON NOT NULL,  -- User IDs in seed order
+    results TEXT NOT NULL,  -- One char per match: - pending, 1/2 winning slot, b walkover
+    battle_map JSON DEFAULT NULL,  -- Live battle ID -> match index
+    winner_id VARCHAR(20) NULL,
+    created_by VARCHAR(20) NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    
+    FOREIGN KEY (server_id) REFERENCES servers(id) ON DELETE CASCADE,
+    INDEX idx_tournaments_status (status, server_id)
+);
+
+-- =====================================================
+-- DATABASE UPDATES FOR WILD ENCOUNTERS
+-- =====================================================
+
+ALTER TABLE servers
+ADD COLUMN spawn_channel_id VARCHAR(20) NULL,  -- NULL = wild spawns off
+ADD COLUMN spawn_weights JSON DEFAULT NULL;  -- {"COMMON": 80, ...}, NULL = defaults
+
+-- =====================================================
+-- DATABASE UPDATES FOR STARTUP
+-- Small key/value store for bot bookkeeping (e.g. the hash of the
+-- last synced command tree, so restarts can skip the sync)
+-- =====================================================
+
+CREATE TABLE bot_state (
+    name VARCHAR(50) PRIMARY KEY,
+    value TEXT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- =====================================================
+-- DATABASE UPDATES FOR BINARY UUID KEYS
+-- Pokemon, battle and pending keys are time-ordered UUIDs (version 7,
+-- generated by the bot) stored as 16 bytes, so inserts append to the end
+-- of the clustered index and secondary indexes and foreign keys carry
+-- 16 bytes instead of 36. The bot converts to and from the string form
+-- in DatabaseManager. Databases that already hold data: run
+-- migrate_uuid_keys.py instead of this section.
+-- =====================================================
+
+SET FOREIGN_KEY_CHECKS = 0;
+
+ALTER TABLE pokemon MODIFY id BINARY(16) NOT NULL;
+ALTER TABLE pokemon_moves MODIFY pokemon_id BINARY(16) NOT NULL;
+ALTER TABLE battles MODIFY id BINARY(16) NOT NULL;
+ALTER TABLE battle_participants MODIFY battle_id BINARY(16) NOT NULL;
+ALTER TABLE pending_choices MODIFY id BINARY(16) NOT NULL, MODIFY pokemon_id BINARY(16) NOT NULL;
+ALTER TABLE pending_starters MODIFY id BINARY(16) NOT NULL;
+
+SET FOREIGN_KEY_CHECKS = 1;
+
+DROP PROCEDURE IF EXISTS CalculatePokemonStats;
+DELIMITER //
+CREATE PROCEDURE CalculatePokemonStats(
+    IN pokemon_uuid CHAR(36)  -- the string form; packed below
+)
+BEGIN
+    DECLARE poke_level INT;
+    DECLARE species_hp, species_att, species_def, species_spa, species_spd, species_spe INT;
+    DECLARE iv_hp, iv_att, iv_def, iv_spa, iv_spd, iv_spe INT;
+    DECLARE calc_hp, calc_att, calc_def, calc_spa, calc_spd, calc_spe INT;
+    
+    -- Get Pokemon data
+    SELECT p.level, s.base_hp, s.base_attack, s.base_defense, s.base_sp_attack, s.base_sp_defense, s.base_speed,
+           p.hp_iv, p.attack_iv, p.defense_iv, p.sp_attack_iv, p.sp_defense_iv, p.speed_iv
+    INTO poke_level, species_hp, species_att, species_def, species_spa, species_spd, species_spe,
+         iv_hp, iv_att, iv_def, iv_spa, iv_spd, iv_spe
+    FROM pokemon p
+    JOIN pokemon_species s ON p.species_id = s.id
+    WHERE p.id = UUID_TO_BIN(pokemon_uuid);
+    
+    -- Calculate stats using Pokemon formula
+    SET calc_hp = FLOOR(((2 * species_hp + iv_hp) * poke_level / 100) + poke_level + 10);
+    SET calc_att = FLOOR(((2 * species_att + iv_att) * poke_level / 100) + 5);
+    SET calc_def = FLOOR(((2 * species_def + iv_def) * poke_level / 100) + 5);
+    SET calc_spa = FLOOR(((2 * species_spa + iv_spa) * poke_level / 100) + 5);
+    SET calc_spd = FLOOR(((2 * species_spd + iv_spd) * poke_level / 100) + 5);
+    SET calc_spe = FLOOR(((2 * species_spe + iv_spe) * poke_level / 100) + 5);
+    
+    -- Return calculated stats
+    SELECT calc_hp as hp, calc_att as attack, calc_def as defense, 
+           calc_spa as sp_attack, calc_spd as sp_defense, calc_spe as speed;
+END //
+DELIMITER ;
+
+-- =====================================================
+-- DATABASE UPDATES FOR BATTLE ARCHIVE
+-- Finished battles older than ARCHIVE_AFTER_DAYS move here in small
+-- chunks (BattleArchive), keeping battles small enough for the buffer
+-- pool. Logs and participant snapshots are zlib-compressed JSON.
+-- Partitioned by start month: the bot splits p_future into monthly
+-- partitions as it archives, and old months can be dropped whole.
+-- =====================================================
+
+CREATE INDEX idx_battles_ended ON battles (ended_at);
+
+CREATE TABLE battle_archive (
+    id BINARY(16) NOT NULL,
+    player1_id VARCHAR(20) NOT NULL,
+    player2_id VARCHAR(20) NULL,
+    winner_id VARCHAR(20) NULL,
+    battle_format VARCHAR(20),
+    battle_type VARCHAR(20),
+    turn_count INT,
+    weather VARCHAR(20),
+    status VARCHAR(20),
+    started_at DATETIME NOT NULL,
+    ended_at DATETIME NULL,
+    participants MEDIUMBLOB NOT NULL,  -- {user_id: [team_data, final_xp_gained, performance_data]}
+    battle_log MEDIUMBLOB NULL,  -- battles.battle_data
+    spectator_log MEDIUMBLOB NULL,  -- battles.spectator_data
+    
+    PRIMARY KEY (id, started_at),  -- the partition column must be in every unique key
+    INDEX idx_archive_player1 (player1_id, started_at),
+    INDEX idx_archive_player2 (player2_id, started_at)
+)
+PARTITION BY RANGE COLUMNS (started_at) (
+    PARTITION p_future VALUES LESS THAN (MAXVALUE)
+);
+
+-- =====================================================
+-- DATABASE UPDATES FOR BATTLE HISTORY
+-- One row per participant so a trainer's history is a single index
+-- range (no OR across player1_id/player2_id). Written by BattleHistory
+-- at battle creation and completion; rows outlive archiving.
+-- =====================================================
+
+CREATE TABLE user_battles (
+    user_id VARCHAR(20) NOT NULL,
+    started_at TIMESTAMP NOT NULL,
+    battle_id BINARY(16) NOT NULL,
+    opponent_id VARCHAR(20) NULL,  -- NULL for practice battles
+    status VARCHAR(20) NOT NULL,
+    result CHAR(1) NULL,  -- W or L once decided
+    
+    PRIMARY KEY (user_id, started_at DESC, battle_id),
+    
+    INDEX idx_user_opponent (user_id, opponent_id, started_at),
+    INDEX idx_user_battles_battle (battle_id)
+);
+
+-- Backfill from live and archived battles
+INSERT INTO user_battles (user_id, started_at, battle_id, opponent_id, status, result)
+SELECT player1_id, started_at, id, player2_id, status,
+       CASE WHEN winner_id IS NULL THEN NULL WHEN winner_id = player1_id THEN 'W' ELSE 'L' END
+FROM battles
+UNION ALL
+SELECT player2_id, started_at, id, player1_id, status,
+       CASE WHEN winner_id IS NULL THEN NULL WHEN winner_id = player2_id THEN 'W' ELSE 'L' END
+FROM battles WHERE player2_id IS NOT NULL
+UNION ALL
+SELECT player1_id, started_at, id, player2_id, status,
+       CASE WHEN winner_id IS NULL THEN NULL WHEN winner_id = player1_id THEN 'W' ELSE 'L' END
+FROM battle_archive
+UNION ALL
+SELECT player2_id, started_at, id, player1_id, status,
+       CASE WHEN winner_id IS NULL THEN NULL WHEN winner_id = player2_id THEN 'W' ELSE 'L' END
+FROM battle_archive WHERE player2_id IS NOT NULL;
+
 -- =====================================================
 -- SUCCESS MESSAGE
 -- =====================================================
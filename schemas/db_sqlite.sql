@@ -0,0 +1,667 @@
+-- =====================================================
+-- POKEMON BATTLE BOT - SQLITE SCHEMA
+-- schemas/db.sql (including its later updates) translated for the
+-- single-file SQLite backend (DB_BACKEND=sqlite). The bot applies this
+-- automatically when it opens an empty database file.
+--
+-- Differences from MySQL:
+-- * Timestamps default to local time, as MySQL's CURRENT_TIMESTAMP does
+-- * ON UPDATE CURRENT_TIMESTAMP columns are maintained by triggers
+-- * Indexes are separate CREATE INDEX statements (names are global)
+-- * UUID keys are BLOBs (BINARY(16) in MySQL)
+-- * battle_archive is a single table (MySQL partitions it by month)
+-- * JSON columns are TEXT; the stored functions, procedure and cleanup
+--   event are omitted (the bot computes stats and sweeps expired
+--   onboarding sessions itself)
+-- =====================================================
+
+PRAGMA foreign_keys = OFF;
+
+DROP VIEW IF EXISTS server_config_status;
+DROP VIEW IF EXISTS active_teams;
+DROP VIEW IF EXISTS pokemon_full;
+DROP TABLE IF EXISTS user_battles;
+DROP TABLE IF EXISTS battle_archive;
+DROP TABLE IF EXISTS bot_state;
+DROP TABLE IF EXISTS tournaments;
+DROP TABLE IF EXISTS user_achievements;
+DROP TABLE IF EXISTS achievement_progress;
+DROP TABLE IF EXISTS pending_starters;
+DROP TABLE IF EXISTS persistent_buttons;
+DROP TABLE IF EXISTS pokemon_moves;
+DROP TABLE IF EXISTS pokemon;
+DROP TABLE IF EXISTS pokemon_movesets;
+DROP TABLE IF EXISTS battle_participants;
+DROP TABLE IF EXISTS battles;
+DROP TABLE IF EXISTS pending_choices;
+DROP TABLE IF EXISTS user_items;
+DROP TABLE IF EXISTS moves;
+DROP TABLE IF EXISTS pokemon_species;
+DROP TABLE IF EXISTS servers;
+DROP TABLE IF EXISTS users;
+
+PRAGMA foreign_keys = ON;
+
+-- =====================================================
+-- USERS TABLE - Core user management
+-- =====================================================
+CREATE TABLE users (
+    id VARCHAR(20) PRIMARY KEY,  -- Discord user ID
+    username VARCHAR(50) NOT NULL,
+    discriminator VARCHAR(4),
+    avatar_url VARCHAR(255),
+    trainer_level INT DEFAULT 1,
+    trainer_xp INT DEFAULT 0,
+    coins INT DEFAULT 500,  -- Pokedollars
+    battle_points INT DEFAULT 0,
+    battles_won INT DEFAULT 0,
+    battles_lost INT DEFAULT 0,
+    current_streak INT DEFAULT 0,
+    best_streak INT DEFAULT 0,
+    last_battle TIMESTAMP NULL,
+    settings TEXT DEFAULT NULL,
+    created_at TIMESTAMP DEFAULT (datetime('now', 'localtime')),
+    updated_at TIMESTAMP DEFAULT (datetime('now', 'localtime'))
+);
+
+CREATE INDEX idx_username ON users (username);
+CREATE INDEX idx_battles_won ON users (battles_won);
+CREATE INDEX idx_trainer_level ON users (trainer_level);
+
+-- =====================================================
+-- POKEMON SPECIES TABLE - Static Pokemon data
+-- =====================================================
+CREATE TABLE pokemon_species (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name VARCHAR(50) NOT NULL,
+    type1 VARCHAR(20) NOT NULL,
+    type2 VARCHAR(20) NULL,
+    base_hp INT NOT NULL,
+    base_attack INT NOT NULL,
+    base_defense INT NOT NULL,
+    base_sp_attack INT NOT NULL,
+    base_sp_defense INT NOT NULL,
+    base_speed INT NOT NULL,
+    evolution_level INT NULL,
+    evolution_into INT NULL REFERENCES pokemon_species(id) ON DELETE SET NULL,
+    evolution_method VARCHAR(20) DEFAULT 'LEVEL',
+    evolution_requirement VARCHAR(50) NULL,
+    sprite_url VARCHAR(255) NULL,
+    pokedex_number INT UNIQUE NOT NULL,
+    generation INT DEFAULT 1,
+    rarity VARCHAR(20) DEFAULT 'COMMON'
+);
+
+CREATE INDEX idx_type1 ON pokemon_species (type1);
+CREATE INDEX idx_evolution_level ON pokemon_species (evolution_level);
+
+-- =====================================================
+-- MOVES TABLE - All available moves
+-- =====================================================
+CREATE TABLE moves (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name VARCHAR(50) NOT NULL,
+    type VARCHAR(20) NOT NULL,
+    category VARCHAR(20) NOT NULL,  -- PHYSICAL, SPECIAL, STATUS
+    power INT NULL,
+    accuracy INT NOT NULL,
+    base_pp INT NOT NULL,
+    priority INT DEFAULT 0,
+    effect_description TEXT NULL,
+    effect_data TEXT DEFAULT NULL,
+    is_signature BOOLEAN DEFAULT FALSE
+);
+
+CREATE INDEX idx_name ON moves (name);
+CREATE INDEX idx_type ON moves (type);
+CREATE INDEX idx_category ON moves (category);
+
+-- =====================================================
+-- POKEMON MOVESETS - What moves each species can learn
+-- =====================================================
+CREATE TABLE pokemon_movesets (
+    species_id INT REFERENCES pokemon_species(id) ON DELETE CASCADE,
+    move_id INT REFERENCES moves(id) ON DELETE CASCADE,
+    learn_method VARCHAR(20) NOT NULL,  -- LEVEL, TM, EGG, TUTOR
+    learn_level INT NULL,
+    
+    PRIMARY KEY (species_id, move_id, learn_method)
+);
+
+CREATE INDEX idx_species_level ON pokemon_movesets (species_id, learn_level);
+
+-- =====================================================
+-- POKEMON TABLE - User's Pokemon instances
+-- =====================================================
+CREATE TABLE pokemon (
+    id BLOB PRIMARY KEY,  -- UUIDv7 bytes, generated by the bot
+    user_id VARCHAR(20) NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    species_id INT NOT NULL REFERENCES pokemon_species(id),
+    nickname VARCHAR(50) NULL,
+    level INT DEFAULT 5 CHECK (level BETWEEN 1 AND 50),  -- MVP cap at 50
+    experience INT DEFAULT 0,
+    is_starter BOOLEAN DEFAULT FALSE,
+    is_active BOOLEAN DEFAULT TRUE,  -- In active team vs storage
+    team_slot INT NULL CHECK (team_slot BETWEEN 1 AND 3),  -- MVP: 3v3 battles
+    friendship INT DEFAULT 50 CHECK (friendship BETWEEN 0 AND 255),
+    nature VARCHAR(20) NOT NULL DEFAULT 'HARDY',
+    gender VARCHAR(10) DEFAULT 'UNKNOWN',
+    
+    -- Individual Values (0-31) - Pokemon genetics
+    hp_iv INT DEFAULT 0 CHECK (hp_iv BETWEEN 0 AND 31),
+    attack_iv INT DEFAULT 0 CHECK (attack_iv BETWEEN 0 AND 31),
+    defense_iv INT DEFAULT 0 CHECK (defense_iv BETWEEN 0 AND 31),
+    sp_attack_iv INT DEFAULT 0 CHECK (sp_attack_iv BETWEEN 0 AND 31),
+    sp_defense_iv INT DEFAULT 0 CHECK (sp_defense_iv BETWEEN 0 AND 31),
+    speed_iv INT DEFAULT 0 CHECK (speed_iv BETWEEN 0 AND 31),
+    
+    -- Current battle status
+    current_hp INT NULL,  -- NULL means full HP
+    status_condition VARCHAR(20) DEFAULT 'HEALTHY',
+    status_turns INT DEFAULT 0,
+    
+    -- Metadata
+    original_trainer VARCHAR(20) NOT NULL REFERENCES users(id),
+    caught_at TIMESTAMP DEFAULT (datetime('now', 'localtime')),
+    caught_location VARCHAR(50) DEFAULT 'STARTER_LAB',
+    created_at TIMESTAMP DEFAULT (datetime('now', 'localtime')),
+    updated_at TIMESTAMP DEFAULT (datetime('now', 'localtime'))
+);
+
+CREATE INDEX idx_user_team ON pokemon (user_id, team_slot);
+CREATE INDEX idx_species ON pokemon (species_id);
+CREATE INDEX idx_level ON pokemon (level);
+CREATE INDEX idx_pc_browse ON pokemon (user_id, is_active, caught_at, id);
+CREATE INDEX idx_pc_species ON pokemon (user_id, is_active, species_id, caught_at, id);
+CREATE INDEX idx_pc_level ON pokemon (user_id, is_active, level, caught_at, id);
+CREATE INDEX idx_pc_nickname ON pokemon (user_id, is_active, nickname, caught_at, id);
+
+-- =====================================================
+-- POKEMON MOVES - Current moveset for each Pokemon
+-- =====================================================
+CREATE TABLE pokemon_moves (
+    pokemon_id BLOB REFERENCES pokemon(id) ON DELETE CASCADE,
+    move_id INT REFERENCES moves(id) ON DELETE CASCADE,
+    slot INT CHECK (slot BETWEEN 1 AND 4),
+    current_pp INT NOT NULL,
+    max_pp INT NOT NULL,
+    
+    PRIMARY KEY (pokemon_id, slot)
+);
+
+-- =====================================================
+-- BATTLES TABLE - Battle instances
+-- =====================================================
+CREATE TABLE battles (
+    id BLOB PRIMARY KEY,  -- UUIDv7 bytes, generated by the bot
+    player1_id VARCHAR(20) NOT NULL REFERENCES users(id),
+    player2_id VARCHAR(20) NOT NULL REFERENCES users(id),
+    winner_id VARCHAR(20) NULL REFERENCES users(id),
+    battle_format VARCHAR(20) DEFAULT '3v3',
+    battle_type VARCHAR(20) DEFAULT 'SINGLES',
+    turn_count INT DEFAULT 0,
+    weather VARCHAR(20) DEFAULT 'NONE',
+    battle_data TEXT DEFAULT NULL,  -- Complete battle log for replays
+    spectator_data TEXT DEFAULT NULL,  -- Chat, predictions, reactions
+    started_at TIMESTAMP DEFAULT (datetime('now', 'localtime')),
+    ended_at TIMESTAMP NULL,
+    status VARCHAR(20) DEFAULT 'WAITING'  -- WAITING, ACTIVE, COMPLETED, ABANDONED
+);
+
+CREATE INDEX idx_battles_participants ON battles (player1_id, player2_id);
+CREATE INDEX idx_battles_status ON battles (status);
+CREATE INDEX idx_battles_date ON battles (started_at);
+CREATE INDEX idx_battles_ended ON battles (ended_at);
+
+-- =====================================================
+-- BATTLE PARTICIPANTS - Team snapshots for battles
+-- =====================================================
+CREATE TABLE battle_participants (
+    battle_id BLOB REFERENCES battles(id) ON DELETE CASCADE,
+    user_id VARCHAR(20) REFERENCES users(id),
+    team_data TEXT NOT NULL,  -- Snapshot of team at battle start
+    final_xp_gained INT DEFAULT 0,
+    performance_data TEXT DEFAULT NULL,  -- Damage dealt, KOs, etc.
+    
+    PRIMARY KEY (battle_id, user_id)
+);
+
+-- =====================================================
+-- USER ITEMS - Inventory system
+-- =====================================================
+CREATE TABLE user_items (
+    user_id VARCHAR(20) REFERENCES users(id) ON DELETE CASCADE,
+    item_type VARCHAR(50) NOT NULL,
+    item_id VARCHAR(50) NOT NULL,
+    quantity INT DEFAULT 1,
+    acquired_at TIMESTAMP DEFAULT (datetime('now', 'localtime')),
+    
+    PRIMARY KEY (user_id, item_type, item_id)
+);
+
+CREATE INDEX idx_user_items ON user_items (user_id, item_type);
+
+-- =====================================================
+-- PENDING CHOICES - Player decisions (move learning, evolution, etc.)
+-- =====================================================
+CREATE TABLE pending_choices (
+    id BLOB PRIMARY KEY,  -- UUIDv7 bytes, generated by the bot
+    pokemon_id BLOB NOT NULL REFERENCES pokemon(id) ON DELETE CASCADE,
+    choice_type VARCHAR(20) NOT NULL,  -- MOVE_LEARN, EVOLUTION, NICKNAME
+    choice_data TEXT NOT NULL,
+    created_at TIMESTAMP DEFAULT (datetime('now', 'localtime')),
+    expires_at TIMESTAMP NOT NULL
+);
+
+CREATE INDEX idx_pending_pokemon ON pending_choices (pokemon_id);
+CREATE INDEX idx_pending_expires ON pending_choices (expires_at);
+
+-- =====================================================
+-- SERVERS TABLE - Discord server settings
+-- =====================================================
+CREATE TABLE servers (
+    id VARCHAR(20) PRIMARY KEY,  -- Discord server ID
+    name VARCHAR(100) NOT NULL,
+    settings TEXT DEFAULT NULL,
+    battle_channel VARCHAR(20) NULL,
+    announcement_channel VARCHAR(20) NULL,
+    is_premium BOOLEAN DEFAULT FALSE,
+    created_at TIMESTAMP DEFAULT (datetime('now', 'localtime')),
+    language VARCHAR(5) DEFAULT 'en',
+    starter_channel_id VARCHAR(20) NULL,
+    starter_message_id VARCHAR(20) NULL,
+    updates_channel_id VARCHAR(20) NULL,
+    last_updated TIMESTAMP DEFAULT (datetime('now', 'localtime')),
+    spawn_channel_id VARCHAR(20) NULL,  -- NULL = wild spawns off
+    spawn_weights TEXT DEFAULT NULL  -- {"COMMON": 80, ...}, NULL = defaults
+);
+
+CREATE INDEX idx_server_name ON servers (name);
+CREATE INDEX idx_servers_language ON servers (language);
+
+-- =====================================================
+-- PERSISTENT BUTTONS & ONBOARDING
+-- =====================================================
+CREATE TABLE persistent_buttons (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    server_id VARCHAR(20) NOT NULL REFERENCES servers(id),
+    channel_id VARCHAR(20) NOT NULL,
+    message_id VARCHAR(20) NOT NULL,
+    button_type VARCHAR(50) NOT NULL, -- 'STARTER_SELECTION', 'ADMIN_SETUP', etc.
+    button_data TEXT DEFAULT NULL,
+    created_at TIMESTAMP DEFAULT (datetime('now', 'localtime')),
+    is_active BOOLEAN DEFAULT TRUE,
+    
+    UNIQUE (server_id, button_type)
+);
+
+CREATE INDEX idx_message ON persistent_buttons (channel_id, message_id);
+
+CREATE TABLE pending_starters (
+    id BLOB PRIMARY KEY,  -- UUIDv7 bytes, generated by the bot
+    user_id VARCHAR(20) NOT NULL REFERENCES users(id),
+    server_id VARCHAR(20) NOT NULL REFERENCES servers(id),
+    selected_species_id INT NOT NULL REFERENCES pokemon_species(id),
+    pokemon_nickname VARCHAR(50) NULL,
+    generated_ivs TEXT NOT NULL, -- Store the specific IVs generated for this Pokemon
+    step VARCHAR(20) DEFAULT 'SPECIES_SELECTED', -- SPECIES_SELECTED, NAMED, CONFIRMED
+    expires_at TIMESTAMP NOT NULL,
+    created_at TIMESTAMP DEFAULT (datetime('now', 'localtime'))
+);
+
+CREATE INDEX idx_user_server ON pending_starters (user_id, server_id);
+CREATE INDEX idx_expires ON pending_starters (expires_at);
+
+-- =====================================================
+-- ACHIEVEMENTS
+-- =====================================================
+CREATE TABLE achievement_progress (
+    user_id VARCHAR(20) NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    counter VARCHAR(30) NOT NULL,  -- battles, wins, streak, starters
+    value INT NOT NULL DEFAULT 0,
+    
+    PRIMARY KEY (user_id, counter)
+);
+
+CREATE TABLE user_achievements (
+    user_id VARCHAR(20) NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    achievement_id VARCHAR(50) NOT NULL,
+    unlocked_at TIMESTAMP DEFAULT (datetime('now', 'localtime')),
+    
+    PRIMARY KEY (user_id, achievement_id)
+);
+
+-- =====================================================
+-- TOURNAMENTS
+-- =====================================================
+CREATE TABLE tournaments (
+    id VARCHAR(8) PRIMARY KEY,
+    server_id VARCHAR(20) NOT NULL REFERENCES servers(id) ON DELETE CASCADE,
+    channel_id VARCHAR(20) NULL,  -- Where pairings and results are announced
+    name VARCHAR(100) NOT NULL,
+    format VARCHAR(10) NOT NULL,  -- single, double, swiss
+    status VARCHAR(20) DEFAULT 'OPEN',  -- OPEN, RUNNING, COMPLETED
+    players TEXT NOT NULL,  -- User IDs in seed order
+    results TEXT NOT NULL,  -- One char per match: - pending, 1/2 winning slot, b walkover
+    battle_map TEXT DEFAULT NULL,  -- Live battle ID -> match index
+    winner_id VARCHAR(20) NULL,
+    created_by VARCHAR(20) NOT NULL,
+    created_at TIMESTAMP DEFAULT (datetime('now', 'localtime'))
+);
+
+CREATE INDEX idx_tournaments_status ON tournaments (status, server_id);
+
+-- =====================================================
+-- BOT STATE
+-- =====================================================
+CREATE TABLE bot_state (
+    name VARCHAR(50) PRIMARY KEY,
+    value TEXT NULL,
+    updated_at TIMESTAMP DEFAULT (datetime('now', 'localtime'))
+);
+
+-- =====================================================
+-- BATTLE ARCHIVE
+-- =====================================================
+CREATE TABLE battle_archive (
+    id BLOB NOT NULL,
+    player1_id VARCHAR(20) NOT NULL,
+    player2_id VARCHAR(20) NULL,
+    winner_id VARCHAR(20) NULL,
+    battle_format VARCHAR(20),
+    battle_type VARCHAR(20),
+    turn_count INT,
+    weather VARCHAR(20),
+    status VARCHAR(20),
+    started_at TIMESTAMP NOT NULL,
+    ended_at TIMESTAMP NULL,
+    participants BLOB NOT NULL,  -- zlib-compressed JSON
+    battle_log BLOB NULL,
+    spectator_log BLOB NULL,
+    PRIMARY KEY (id, started_at)
+);
+
+CREATE INDEX idx_archive_player1 ON battle_archive (player1_id, started_at);
+CREATE INDEX idx_archive_player2 ON battle_archive (player2_id, started_at);
+
+-- =====================================================
+-- BATTLE HISTORY
+-- =====================================================
+CREATE TABLE user_battles (
+    user_id VARCHAR(20) NOT NULL,
+    started_at TIMESTAMP NOT NULL,
+    battle_id BLOB NOT NULL,
+    opponent_id VARCHAR(20) NULL,  -- NULL for practice battles
+    status VARCHAR(20) NOT NULL,
+    result CHAR(1) NULL,  -- W or L once decided
+    
+    PRIMARY KEY (user_id, started_at DESC, battle_id)
+);
+
+CREATE INDEX idx_user_opponent ON user_battles (user_id, opponent_id, started_at);
+CREATE INDEX idx_user_battles_battle ON user_battles (battle_id);
+
+-- =====================================================
+-- ON UPDATE CURRENT_TIMESTAMP
+-- (only when the statement didn't set the column itself)
+-- =====================================================
+CREATE TRIGGER users_updated_at AFTER UPDATE ON users
+WHEN NEW.updated_at IS OLD.updated_at
+BEGIN
+    UPDATE users SET updated_at = datetime('now', 'localtime') WHERE id = NEW.id;
+END;
+
+CREATE TRIGGER pokemon_updated_at AFTER UPDATE ON pokemon
+WHEN NEW.updated_at IS OLD.updated_at
+BEGIN
+    UPDATE pokemon SET updated_at = datetime('now', 'localtime') WHERE id = NEW.id;
+END;
+
+CREATE TRIGGER servers_last_updated AFTER UPDATE ON servers
+WHEN NEW.last_updated IS OLD.last_updated
+BEGIN
+    UPDATE servers SET last_updated = datetime('now', 'localtime') WHERE id = NEW.id;
+END;
+
+-- =====================================================
+-- INITIAL DATA SEEDING - POKEMON SPECIES
+-- =====================================================
+INSERT INTO pokemon_species (name, type1, type2, base_hp, base_attack, base_defense, base_sp_attack, base_sp_defense, base_speed, evolution_level, pokedex_number, rarity) VALUES
+-- Starter Line 1: Charmander
+('Charmander', 'FIRE', NULL, 39, 52, 43, 60, 50, 65, 16, 4, 'STARTER'),
+('Charmeleon', 'FIRE', NULL, 58, 64, 58, 80, 65, 80, 36, 5, 'STARTER'),
+('Charizard', 'FIRE', 'FLYING', 78, 84, 78, 109, 85, 100, NULL, 6, 'STARTER'),
+
+-- Starter Line 2: Squirtle  
+('Squirtle', 'WATER', NULL, 44, 48, 65, 50, 64, 43, 16, 7, 'STARTER'),
+('Wartortle', 'WATER', NULL, 59, 63, 80, 65, 80, 58, 36, 8, 'STARTER'),
+('Blastoise', 'WATER', NULL, 79, 83, 100, 85, 105, 78, NULL, 9, 'STARTER'),
+
+-- Starter Line 3: Bulbasaur
+('Bulbasaur', 'GRASS', 'POISON', 45, 49, 49, 65, 65, 45, 16, 1, 'STARTER'),
+('Ivysaur', 'GRASS', 'POISON', 60, 62, 63, 80, 80, 60, 32, 2, 'STARTER'),
+('Venusaur', 'GRASS', 'POISON', 80, 82, 83, 100, 100, 80, NULL, 3, 'STARTER'),
+
+-- Common Pokemon Lines
+('Caterpie', 'BUG', NULL, 45, 30, 35, 20, 20, 45, 7, 10, 'COMMON'),
+('Metapod', 'BUG', NULL, 50, 20, 55, 25, 25, 30, 10, 11, 'COMMON'),
+('Butterfree', 'BUG', 'FLYING', 60, 45, 50, 90, 80, 70, NULL, 12, 'COMMON'),
+
+('Weedle', 'BUG', 'POISON', 40, 35, 30, 20, 20, 50, 7, 13, 'COMMON'),
+('Kakuna', 'BUG', 'POISON', 45, 25, 50, 25, 25, 35, 10, 14, 'COMMON'),
+('Beedrill', 'BUG', 'POISON', 65, 90, 40, 45, 80, 75, NULL, 15, 'COMMON'),
+
+('Pidgey', 'NORMAL', 'FLYING', 40, 45, 40, 35, 35, 56, 18, 16, 'COMMON'),
+('Pidgeotto', 'NORMAL', 'FLYING', 63, 60, 55, 50, 50, 71, 36, 17, 'COMMON'),
+('Pidgeot', 'NORMAL', 'FLYING', 83, 80, 75, 70, 70, 101, NULL, 18, 'COMMON'),
+
+('Rattata', 'NORMAL', NULL, 30, 56, 35, 25, 35, 72, 20, 19, 'COMMON'),
+('Raticate', 'NORMAL', NULL, 55, 81, 60, 50, 70, 97, NULL, 20, 'COMMON'),
+
+('Pikachu', 'ELECTRIC', NULL, 35, 55, 40, 50, 50, 90, NULL, 25, 'UNCOMMON'),
+('Raichu', 'ELECTRIC', NULL, 60, 90, 55, 90, 80, 110, NULL, 26, 'UNCOMMON');
+
+-- Evolution chains
+UPDATE pokemon_species SET evolution_into = (
+    SELECT evolved.id FROM pokemon_species evolved
+    WHERE evolved.name = CASE pokemon_species.name
+        WHEN 'Charmander' THEN 'Charmeleon'
+        WHEN 'Charmeleon' THEN 'Charizard'
+        WHEN 'Squirtle' THEN 'Wartortle'
+        WHEN 'Wartortle' THEN 'Blastoise'
+        WHEN 'Bulbasaur' THEN 'Ivysaur'
+        WHEN 'Ivysaur' THEN 'Venusaur'
+        WHEN 'Caterpie' THEN 'Metapod'
+        WHEN 'Metapod' THEN 'Butterfree'
+        WHEN 'Weedle' THEN 'Kakuna'
+        WHEN 'Kakuna' THEN 'Beedrill'
+        WHEN 'Pidgey' THEN 'Pidgeotto'
+        WHEN 'Pidgeotto' THEN 'Pidgeot'
+        WHEN 'Rattata' THEN 'Raticate'
+    END
+);
+
+-- =====================================================
+-- INITIAL DATA SEEDING - MOVES
+-- =====================================================
+INSERT INTO moves (name, type, category, power, accuracy, base_pp, priority, effect_description) VALUES
+-- Normal moves
+('Tackle', 'NORMAL', 'PHYSICAL', 40, 100, 35, 0, 'A physical attack with no additional effects.'),
+('Scratch', 'NORMAL', 'PHYSICAL', 40, 100, 35, 0, 'A physical attack with sharp claws.'),
+('Quick Attack', 'NORMAL', 'PHYSICAL', 40, 100, 30, 1, 'A priority move that always goes first.'),
+('Hyper Beam', 'NORMAL', 'SPECIAL', 150, 90, 5, 0, 'Powerful attack that requires recharging.'),
+
+-- Fire moves  
+('Ember', 'FIRE', 'SPECIAL', 40, 100, 25, 0, 'May burn the target.'),
+('Flamethrower', 'FIRE', 'SPECIAL', 90, 100, 15, 0, 'May burn the target.'),
+('Fire Blast', 'FIRE', 'SPECIAL', 110, 85, 5, 0, 'High chance to burn the target.'),
+
+-- Water moves
+('Water Gun', 'WATER', 'SPECIAL', 40, 100, 25, 0, 'A basic water attack.'),
+('Bubble Beam', 'WATER', 'SPECIAL', 65, 100, 20, 0, 'May lower target Speed.'),
+('Surf', 'WATER', 'SPECIAL', 90, 100, 15, 0, 'A powerful water attack.'),
+('Hydro Pump', 'WATER', 'SPECIAL', 110, 80, 5, 0, 'A very powerful water attack.'),
+
+-- Grass moves
+('Vine Whip', 'GRASS', 'PHYSICAL', 45, 100, 25, 0, 'A basic grass attack.'),
+('Razor Leaf', 'GRASS', 'PHYSICAL', 55, 95, 25, 0, 'High critical hit ratio.'),
+('Solar Beam', 'GRASS', 'SPECIAL', 120, 100, 10, 0, 'Charges first turn, attacks second.'),
+
+-- Electric moves
+('Thunder Shock', 'ELECTRIC', 'SPECIAL', 40, 100, 30, 0, 'May paralyze the target.'),
+('Thunderbolt', 'ELECTRIC', 'SPECIAL', 90, 100, 15, 0, 'May paralyze the target.'),
+('Thunder', 'ELECTRIC', 'SPECIAL', 110, 70, 10, 0, 'High chance to paralyze.'),
+
+-- Bug moves
+('String Shot', 'BUG', 'STATUS', 0, 95, 40, 0, 'Lowers target Speed.'),
+('Bug Bite', 'BUG', 'PHYSICAL', 60, 100, 20, 0, 'A basic bug attack.'),
+
+-- Flying moves
+('Gust', 'FLYING', 'SPECIAL', 40, 100, 35, 0, 'A basic flying attack.'),
+('Wing Attack', 'FLYING', 'PHYSICAL', 60, 100, 35, 0, 'A basic flying attack.'),
+('Air Slash', 'FLYING', 'SPECIAL', 75, 95, 15, 0, 'May cause flinching.'),
+
+-- Poison moves
+('Poison Sting', 'POISON', 'PHYSICAL', 15, 100, 35, 0, 'May poison the target.'),
+('Sludge Bomb', 'POISON', 'SPECIAL', 90, 100, 10, 0, 'May poison the target.'),
+
+-- Status moves
+('Growl', 'NORMAL', 'STATUS', 0, 100, 40, 0, 'Lowers target Attack.'),
+('Tail Whip', 'NORMAL', 'STATUS', 0, 100, 30, 0, 'Lowers target Defense.'),
+('Leer', 'NORMAL', 'STATUS', 0, 100, 30, 0, 'Lowers target Defense.'),
+('Sleep Powder', 'GRASS', 'STATUS', 0, 75, 15, 0, 'Puts target to sleep.'),
+('Stun Spore', 'GRASS', 'STATUS', 0, 75, 30, 0, 'Paralyzes the target.'),
+('Poison Powder', 'GRASS', 'STATUS', 0, 75, 35, 0, 'Poisons the target.');
+
+-- =====================================================
+-- POKEMON MOVESETS - Basic movesets for MVP
+-- =====================================================
+INSERT INTO pokemon_movesets (species_id, move_id, learn_method, learn_level) VALUES
+-- Charmander movesets
+(1, 2, 'LEVEL', 1),   -- Scratch
+(1, 23, 'LEVEL', 1),  -- Growl  
+(1, 5, 'LEVEL', 7),   -- Ember
+(1, 6, 'LEVEL', 13),  -- Flamethrower
+
+-- Squirtle movesets
+(4, 1, 'LEVEL', 1),   -- Tackle
+(4, 24, 'LEVEL', 1),  -- Tail Whip
+(4, 8, 'LEVEL', 7),   -- Water Gun
+(4, 9, 'LEVEL', 13),  -- Bubble Beam
+
+-- Bulbasaur movesets  
+(7, 1, 'LEVEL', 1),   -- Tackle
+(7, 23, 'LEVEL', 1),  -- Growl
+(7, 12, 'LEVEL', 7),  -- Vine Whip
+(7, 13, 'LEVEL', 13), -- Razor Leaf
+
+-- Basic moves for common Pokemon
+(10, 1, 'LEVEL', 1),  -- Caterpie: Tackle
+(10, 17, 'LEVEL', 1), -- Caterpie: String Shot
+(13, 1, 'LEVEL', 1),  -- Weedle: Tackle  
+(13, 21, 'LEVEL', 1), -- Weedle: Poison Sting
+(16, 1, 'LEVEL', 1),  -- Pidgey: Tackle
+(16, 19, 'LEVEL', 1), -- Pidgey: Gust
+(19, 1, 'LEVEL', 1),  -- Rattata: Tackle
+(19, 3, 'LEVEL', 1),  -- Rattata: Quick Attack
+(21, 15, 'LEVEL', 1), -- Pikachu: Thunder Shock
+(21, 16, 'LEVEL', 15); -- Pikachu: Thunderbolt
+
+-- =====================================================
+-- USEFUL VIEWS
+-- =====================================================
+
+-- View for complete Pokemon data with calculated stats
+CREATE VIEW pokemon_full AS
+SELECT 
+    p.id as pokemon_id,
+    p.user_id,
+    p.species_id,
+    p.nickname,
+    p.level,
+    p.experience,
+    p.is_starter,
+    p.is_active,
+    p.team_slot,
+    p.friendship,
+    p.nature,
+    p.gender,
+    p.hp_iv,
+    p.attack_iv,
+    p.defense_iv,
+    p.sp_attack_iv,
+    p.sp_defense_iv,
+    p.speed_iv,
+    p.current_hp,
+    p.status_condition,
+    p.status_turns,
+    p.original_trainer,
+    p.caught_at,
+    p.caught_location,
+    p.created_at,
+    p.updated_at,
+    s.name as species_name,
+    s.type1,
+    s.type2,
+    s.pokedex_number,
+    s.evolution_level,
+    s.evolution_into,
+    -- Calculate stats on the fly (integer division already rounds down)
+    (((2 * s.base_hp + p.hp_iv) * p.level / 100) + p.level + 10) as max_hp_calculated,
+    (((2 * s.base_attack + p.attack_iv) * p.level / 100) + 5) as attack_calculated,
+    (((2 * s.base_defense + p.defense_iv) * p.level / 100) + 5) as defense_calculated,
+    (((2 * s.base_sp_attack + p.sp_attack_iv) * p.level / 100) + 5) as sp_attack_calculated,
+    (((2 * s.base_sp_defense + p.sp_defense_iv) * p.level / 100) + 5) as sp_defense_calculated,
+    (((2 * s.base_speed + p.speed_iv) * p.level / 100) + 5) as speed_calculated
+FROM pokemon p
+JOIN pokemon_species s ON p.species_id = s.id;
+
+-- View for active teams
+CREATE VIEW active_teams AS
+SELECT 
+    u.username,
+    u.id as user_id,
+    p.id as pokemon_id,
+    p.species_id,
+    p.nickname,
+    p.level,
+    p.experience,
+    p.is_starter,
+    p.team_slot,
+    p.friendship,
+    p.nature,
+    p.gender,
+    p.hp_iv,
+    p.attack_iv,
+    p.defense_iv,
+    p.sp_attack_iv,
+    p.sp_defense_iv,
+    p.speed_iv,
+    p.current_hp,
+    p.status_condition,
+    p.status_turns,
+    s.name as species_name,
+    s.type1,
+    s.type2
+FROM users u
+JOIN pokemon p ON u.id = p.user_id
+JOIN pokemon_species s ON p.species_id = s.id
+WHERE p.is_active = TRUE
+ORDER BY u.id, p.team_slot;
+
+CREATE VIEW server_config_status AS
+SELECT 
+    s.id as server_id,
+    s.name as server_name,
+    s.language,
+    s.starter_channel_id,
+    s.updates_channel_id,
+    CASE 
+        WHEN s.starter_channel_id IS NOT NULL AND s.updates_channel_id IS NOT NULL THEN 'COMPLETE'
+        WHEN s.starter_channel_id IS NOT NULL OR s.updates_channel_id IS NOT NULL THEN 'PARTIAL'
+        ELSE 'NOT_CONFIGURED'
+    END as config_status,
+    pb.message_id as starter_button_message_id,
+    pb.is_active as starter_button_active
+FROM servers s
+LEFT JOIN persistent_buttons pb ON s.id = pb.server_id AND pb.button_type = 'STARTER_SELECTION';